@@ -0,0 +1,277 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import threading
+import time
+import weakref
+from typing import Callable, Iterable
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import models, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date, parse_http_date_safe
+from rest_framework.response import Response
+
+from api.models import CacheVersion
+
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+def model_label(model: type[models.Model] | str) -> str:
+    return model if isinstance(model, str) else model._meta.label_lower
+
+
+def _seed() -> int:
+    # A new counter starts from the clock, so it never comes back at a value
+    # some key still in a shared cache was built with (e.g. after a database reset).
+    return int(time.time() * 1000)
+
+
+def _check_interval() -> float:
+    return getattr(settings, "CACHE_VERSION_CHECK_INTERVAL", 1)
+
+
+# Versions read from CacheVersion, reused for CACHE_VERSION_CHECK_INTERVAL
+# seconds: label -> (read at, version, modified timestamp).
+_read: dict[str, tuple[float, int, float]] = {}
+_read_lock = threading.Lock()
+
+
+def _fetch(labels: list[str]) -> dict[str, tuple[int, float]]:
+    rows = {
+        name: (version, modified.timestamp())
+        for name, version, modified in CacheVersion.objects.filter(name__in=labels).values_list("name", "version", "modified")
+    }
+    missing = [label for label in labels if label not in rows]
+    if missing:
+        CacheVersion.objects.bulk_create(
+            [CacheVersion(name=label, version=_seed()) for label in missing], ignore_conflicts=True
+        )
+        for name, version, modified in CacheVersion.objects.filter(name__in=missing).values_list("name", "version", "modified"):
+            rows[name] = (version, modified.timestamp())
+    return rows
+
+
+def _lookup(model_list: Iterable) -> list[tuple[int, float]]:
+    """``(version, modified)`` of each model, at most CACHE_VERSION_CHECK_INTERVAL seconds old."""
+    labels = [model_label(model) for model in model_list]
+    now = time.monotonic()
+    interval = _check_interval()
+    with _read_lock:
+        known = {label: _read[label] for label in labels if label in _read and now - _read[label][0] < interval}
+    stale = [label for label in dict.fromkeys(labels) if label not in known]
+    if stale:
+        fetched = _fetch(stale)
+        with _read_lock:
+            for label, (version, modified) in fetched.items():
+                known[label] = _read[label] = (now, version, modified)
+    return [known[label][1:] for label in labels]
+
+
+def get_versions(model_list: Iterable) -> list[int]:
+    return [version for version, _ in _lookup(model_list)]
+
+
+def last_modified(model_list: Iterable) -> float:
+    """Latest bump time of any of ``model_list`` (first use counts as a change)."""
+    return max((modified for _, modified in _lookup(model_list)), default=0.0)
+
+
+def incr_versions(model_list: Iterable) -> dict[str, int]:
+    """Bump the versions of ``model_list`` now; returns the new versions by label.
+
+    Rows are locked in name order, so concurrent bumps of overlapping models queue
+    instead of deadlocking.
+    """
+    labels = sorted({model_label(model) for model in model_list})
+    if not labels:
+        return {}
+    now = timezone.now()
+    with transaction.atomic():
+        CacheVersion.objects.bulk_create(
+            [CacheVersion(name=label, version=_seed(), modified=now) for label in labels], ignore_conflicts=True
+        )
+        versions = dict(
+            CacheVersion.objects.select_for_update().filter(name__in=labels).order_by("name").values_list("name", "version")
+        )
+        CacheVersion.objects.filter(name__in=labels).update(version=F("version") + 1, modified=now)
+    with _read_lock:
+        for label in labels:
+            _read.pop(label, None)
+    return {label: version + 1 for label, version in versions.items()}
+
+
+_pending = threading.local()
+
+
+def _flush_pending() -> None:
+    labels = getattr(_pending, "labels", None)
+    if not labels:
+        return
+    _pending.labels = set()
+    try:
+        incr_versions(labels)
+    except Exception:
+        logger.exception("Cache version bump failed")
+
+
+def bump_version(*model_list) -> None:
+    """Retire every key built from ``model_list`` once the current transaction commits.
+
+    Bumps made in one transaction are written together, by the first of its
+    commit callbacks; labels left over from a rolled back transaction go out
+    with the next commit, which only costs a spurious cache miss.
+    """
+    labels = getattr(_pending, "labels", None)
+    if labels is None:
+        labels = _pending.labels = set()
+    labels.update(model_label(model) for model in model_list)
+    transaction.on_commit(_flush_pending)
+
+
+def versioned_key(name: str, depends_on: Iterable, *parts) -> str:
+    """``name`` qualified by the current versions of ``depends_on`` and hashed ``parts``."""
+    versions = ".".join(str(v) for v in get_versions(depends_on))
+    suffix = ""
+    if parts:
+        suffix = ":" + hashlib.sha1("\x1f".join(str(p) for p in parts).encode("utf-8")).hexdigest()
+    return f"{name}:{versions}{suffix}"
+
+
+class _KeyLock:
+    __slots__ = ("lock", "__weakref__")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+
+
+_key_locks: "weakref.WeakValueDictionary[str, _KeyLock]" = weakref.WeakValueDictionary()
+_key_locks_guard = threading.Lock()
+
+
+def _lock_for(key: str) -> _KeyLock:
+    with _key_locks_guard:
+        key_lock = _key_locks.get(key)
+        if key_lock is None:
+            key_lock = _KeyLock()
+            _key_locks[key] = key_lock
+        return key_lock
+
+
+def get_or_compute(
+    key: str,
+    compute: Callable[[], object],
+    timeout: int,
+    lock_timeout: int = 10,
+    wait: float = 5.0,
+    poll: float = 0.05,
+):
+    """Return ``key`` from the cache, computing it at most once at a time on a miss.
+
+    Threads of one process queue on a per-key lock; other processes see the
+    ``<key>:lock`` entry and poll for the value instead of recomputing it. A
+    waiter gives up after ``wait`` seconds and computes the value itself, so a
+    crashed holder only costs one lock timeout.
+    """
+    value = cache.get(key, _MISSING)
+    if value is not _MISSING:
+        return value
+
+    key_lock = _lock_for(key)
+    with key_lock.lock:
+        value = cache.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        lock_key = f"{key}:lock"
+        if not cache.add(lock_key, 1, timeout=lock_timeout):
+            deadline = time.monotonic() + wait
+            while time.monotonic() < deadline:
+                time.sleep(poll)
+                value = cache.get(key, _MISSING)
+                if value is not _MISSING:
+                    return value
+
+        try:
+            value = compute()
+            cache.set(key, value, timeout)
+        finally:
+            cache.delete(lock_key)
+        return value
+
+
+class CachedResponseMixin:
+    """Serve a list/retrieve view's body from the cache and answer conditional GETs.
+
+    The key is built from ``cache_name``, the versions of the ``cache_depends_on``
+    models, the request's host and full path and the current cache window, so
+    a save or delete of any of those models (see ``bump_version``) retires every
+    cached page at once. The strong ETag is a hash of that key and is known
+    before anything is serialized; as the versions live in the database, every
+    worker sends the same ETag for the same page. ``If-None-Match`` /
+    ``If-Modified-Since`` hits get a bodiless 304.
+
+    Bodies embed presigned image URLs, so the key also rolls over every
+    ``CATALOG_CACHE_TIMEOUT`` seconds. The ETag changes with it, and a client
+    never keeps a body whose URLs are about to expire.
+    """
+
+    cache_name: str = ""
+    cache_depends_on: tuple = ()
+    cache_control = "public, max-age=60"
+    vary = ("Accept", "Accept-Encoding")
+
+    def _window(self) -> tuple[int, int]:
+        timeout = max(1, settings.CATALOG_CACHE_TIMEOUT)
+        window = int(time.time() // timeout)
+        return window, window * timeout
+
+    def get_cache_key(self) -> str:
+        request = self.request
+        window, _ = self._window()
+        return versioned_key(
+            self.cache_name, self.cache_depends_on, request.get_host(), request.get_full_path(), window
+        )
+
+    def cached_data(self, key: str, compute: Callable[[], object]):
+        return get_or_compute(key, compute, timeout=settings.CATALOG_CACHE_TIMEOUT)
+
+    def _not_modified(self, etag: str, modified: int) -> bool:
+        if_none_match = self.request.META.get("HTTP_IF_NONE_MATCH")
+        if if_none_match is not None:
+            tags = {tag.strip() for tag in if_none_match.split(",")}
+            return "*" in tags or etag in tags or f"W/{etag}" in tags
+        if_modified_since = parse_http_date_safe(self.request.META.get("HTTP_IF_MODIFIED_SINCE") or "")
+        return if_modified_since is not None and modified <= if_modified_since
+
+    def _conditional_response(self, compute: Callable[[], object]) -> Response:
+        key = self.get_cache_key()
+        etag = '"%s"' % hashlib.sha1(key.encode("utf-8")).hexdigest()
+        _, window_start = self._window()
+        modified = int(max(last_modified(self.cache_depends_on), window_start))
+
+        if self._not_modified(etag, modified):
+            response = Response(status=304)
+        else:
+            response = Response(self.cached_data(key, compute))
+
+        response["ETag"] = etag
+        response["Last-Modified"] = http_date(modified)
+        response["Cache-Control"] = self.cache_control
+        patch_vary_headers(response, self.vary)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        parent = super()
+        return self._conditional_response(lambda: parent.list(request, *args, **kwargs).data)
+
+    def retrieve(self, request, *args, **kwargs):
+        parent = super()
+        return self._conditional_response(lambda: parent.retrieve(request, *args, **kwargs).data)
@@ -0,0 +1,24 @@
+from __future__ import annotations
+
+import hashlib
+
+from django.db import connection
+
+
+def _key(name: str) -> int:
+    return int.from_bytes(hashlib.sha1(name.encode("utf-8")).digest()[:8], "big", signed=True)
+
+
+def advisory_lock(name: str, shared: bool = False) -> None:
+    """Hold the PostgreSQL advisory lock ``name`` until the current transaction ends.
+
+    Shared holders only wait for an exclusive one, so writers that may run side
+    by side take it shared and a job that must not overlap them takes it
+    exclusive. Call it inside ``transaction.atomic()``. Other databases have no
+    advisory locks and it does nothing there (SQLite runs one writer at a time).
+    """
+    if connection.vendor != "postgresql":
+        return
+    function = "pg_advisory_xact_lock_shared" if shared else "pg_advisory_xact_lock"
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT {function}(%s)", [_key(name)])
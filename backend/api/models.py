@@ -1,3 +1,16 @@
 from django.db import models
+from django.utils import timezone
 
-# Create your models here.
+
+# Version counter of a cached model (see api.cache). Kept in the database so
+# every worker agrees on it, and on the ETags built from it, whatever the
+# cache backend.
+class CacheVersion(models.Model):
+    # Model label ("store.product") or any other name bumped through api.cache
+    name = models.CharField(max_length=100, primary_key=True)
+    version = models.BigIntegerField(default=0)
+    # Time of the last bump, sent as Last-Modified
+    modified = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.name}@{self.version}"
@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+import base64
+import binascii
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, CursorPagination, _positive_int
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class DateCursorPagination(CursorPagination):
+    """Keyset pagination, newest first, over the ``date`` indexes (``id`` breaks ties).
+
+    Pages are fetched with ``WHERE date < <cursor> ORDER BY date DESC LIMIT n + 1``,
+    so there is no COUNT(*) and no OFFSET scan however large the table grows.
+    A view may set ``cursor_ordering`` (or assign it in ``get_queryset``) to page
+    over a different key.
+    """
+
+    page_size = 20
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    ordering = ("-date", "-id")
+
+    def get_ordering(self, request, queryset, view):
+        ordering = getattr(view, "cursor_ordering", None) or self.ordering
+        if isinstance(ordering, str):
+            return (ordering,)
+        return tuple(ordering)
+
+
+class IdCursorPagination(DateCursorPagination):
+    """Keyset pagination over the primary key, newest first."""
+
+    ordering = ("-id",)
+
+
+class KeysetCursorPagination(BasePagination):
+    """Forward-only keyset pagination over a composite ordering such as ``("-views", "-id")``.
+
+    DRF's CursorPagination positions on the first ordering key alone and steps
+    over ties with an offset it caps at 1000, so a long run of equal values
+    (every product with 0 views) can't be paged through. Here the cursor holds
+    the last row's value of every key and the next page is fetched with
+    ``WHERE (k1, k2) < (v1, v2)``, spelled out as ``k1 < v1 OR (k1 = v1 AND k2 < v2)``.
+    The keys must be non-null and the last one unique; a view sets
+    ``cursor_ordering`` (or assigns it in ``get_queryset``).
+    """
+
+    page_size = 20
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    cursor_query_param = "cursor"
+    ordering = ("-id",)
+    invalid_cursor_message = "Invalid cursor"
+
+    def get_ordering(self, view) -> tuple[str, ...]:
+        ordering = getattr(view, "cursor_ordering", None) or self.ordering
+        if isinstance(ordering, str):
+            return (ordering,)
+        return tuple(ordering)
+
+    def get_page_size(self, request) -> int:
+        try:
+            return _positive_int(
+                request.query_params[self.page_size_query_param], strict=True, cutoff=self.max_page_size
+            )
+        except (KeyError, ValueError):
+            return self.page_size
+
+    @staticmethod
+    def _field(queryset, name: str):
+        annotation = queryset.query.annotations.get(name)
+        if annotation is not None:
+            return annotation.output_field
+        return queryset.model._meta.get_field(name)
+
+    def encode_cursor(self, values: list) -> str:
+        raw = json.dumps(values, cls=DjangoJSONEncoder, separators=(",", ":")).encode()
+        return base64.urlsafe_b64encode(raw).decode()
+
+    def decode_cursor(self, cursor: str, queryset) -> list:
+        try:
+            values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            if not isinstance(values, list) or len(values) != len(self.ordering):
+                raise ValueError
+            return [
+                self._field(queryset, key.lstrip("-")).to_python(value)
+                for key, value in zip(self.ordering, values)
+            ]
+        except (TypeError, ValueError, ValidationError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+
+    def after(self, values: list) -> Q:
+        """Rows that sort after ``values`` in ``self.ordering``."""
+        condition = Q()
+        equal = Q()
+        for key, value in zip(self.ordering, values):
+            name = key.lstrip("-")
+            lookup = "lt" if key.startswith("-") else "gt"
+            condition |= equal & Q(**{f"{name}__{lookup}": value})
+            equal &= Q(**{name: value})
+        return condition
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.ordering = self.get_ordering(view)
+        page_size = self.get_page_size(request)
+        queryset = queryset.order_by(*self.ordering)
+
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            queryset = queryset.filter(self.after(self.decode_cursor(cursor, queryset)))
+
+        rows = list(queryset[: page_size + 1])
+        self.page = rows[:page_size]
+        self.has_next = len(rows) > page_size
+        return self.page
+
+    def get_next_link(self) -> str | None:
+        if not self.has_next or not self.page:
+            return None
+        last = self.page[-1]
+        cursor = self.encode_cursor([getattr(last, key.lstrip("-")) for key in self.ordering])
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, cursor)
+
+    def get_first_link(self) -> str:
+        return remove_query_param(self.request.build_absolute_uri(), self.cursor_query_param)
+
+    def get_paginated_response(self, data):
+        return Response({"next": self.get_next_link(), "previous": None, "results": data})
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "properties": {
+                "next": {"type": "string", "nullable": True},
+                "previous": {"type": "string", "nullable": True},
+                "results": schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                "name": self.cursor_query_param,
+                "required": False,
+                "in": "query",
+                "description": "The pagination cursor value.",
+                "schema": {"type": "string"},
+            },
+            {
+                "name": self.page_size_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Number of results to return per page.",
+                "schema": {"type": "integer"},
+            },
+        ]
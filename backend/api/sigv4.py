@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import hashlib
+import hmac
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Iterable
+from urllib.parse import quote, urlsplit
+
+from django.conf import settings
+
+
+# Offline S3 SigV4 query-string presigning (the same URLs botocore's
+# generate_presigned_url builds, without going through a client).
+ALGORITHM = "AWS4-HMAC-SHA256"
+SERVICE = "s3"
+UNSIGNED_PAYLOAD = "UNSIGNED-PAYLOAD"
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+@lru_cache(maxsize=64)
+def signing_key(secret_access_key: str, date_stamp: str, region: str, service: str = SERVICE) -> bytes:
+    """Derived SigV4 key; it only changes once per day/region/service."""
+    key = ("AWS4" + secret_access_key).encode("utf-8")
+    for part in (date_stamp, region, service, "aws4_request"):
+        key = hmac.new(key, part.encode("utf-8"), hashlib.sha256).digest()
+    return key
+
+
+def _quote(value: str, safe: str) -> str:
+    return quote(value.encode("utf-8"), safe=safe)
+
+
+@dataclass(frozen=True)
+class S3Presigner:
+    """Presigns path-style GET URLs for one bucket on an S3-compatible endpoint."""
+
+    endpoint_url: str
+    bucket: str
+    region: str
+    access_key_id: str
+    secret_access_key: str
+
+    @classmethod
+    def from_settings(cls) -> "S3Presigner | None":
+        """Build a presigner from the AWS_* settings, or ``None`` if any is missing."""
+        values = (
+            getattr(settings, "AWS_S3_ENDPOINT_URL", None),
+            getattr(settings, "AWS_STORAGE_BUCKET_NAME", None),
+            getattr(settings, "AWS_S3_REGION_NAME", None),
+            getattr(settings, "AWS_ACCESS_KEY_ID", None),
+            getattr(settings, "AWS_SECRET_ACCESS_KEY", None),
+        )
+        if not all(values):
+            return None
+        return _cached_presigner(*values)
+
+    def _base(self) -> tuple[str, str, str]:
+        """Return the URL prefix, the signed ``host`` value (default port dropped) and the bucket path."""
+        parts = urlsplit(self.endpoint_url)
+        host = parts.hostname or ""
+        if parts.port and parts.port != DEFAULT_PORTS.get(parts.scheme):
+            host = f"{host}:{parts.port}"
+        path = parts.path.rstrip("/") + "/" + _quote(self.bucket, safe="~") + "/"
+        return f"{parts.scheme}://{parts.netloc}", host, path
+
+    def presign_get_many(self, keys: Iterable[str], expires_in: int = 600, now: datetime | None = None) -> list[str]:
+        """Presign every key with one timestamp and one derived signing key."""
+        now = now or datetime.now(timezone.utc)
+        amz_date = now.strftime("%Y%m%dT%H%M%SZ")
+        date_stamp = amz_date[:8]
+        scope = f"{date_stamp}/{self.region}/{SERVICE}/aws4_request"
+        key = signing_key(self.secret_access_key, date_stamp, self.region)
+
+        origin, host, base_path = self._base()
+        query = (
+            f"X-Amz-Algorithm={ALGORITHM}"
+            f"&X-Amz-Credential={_quote(f'{self.access_key_id}/{scope}', safe='-_.~')}"
+            f"&X-Amz-Date={amz_date}"
+            f"&X-Amz-Expires={int(expires_in)}"
+            f"&X-Amz-SignedHeaders=host"
+        )
+        # Everything but the path and its hash is shared by the whole batch.
+        request_tail = f"\n{query}\nhost:{host}\n\nhost\n{UNSIGNED_PAYLOAD}"
+        sign_prefix = f"{ALGORITHM}\n{amz_date}\n{scope}\n"
+
+        urls = []
+        for object_key in keys:
+            path = base_path + _quote(object_key, safe="/~")
+            canonical_request = "GET\n" + path + request_tail
+            string_to_sign = sign_prefix + hashlib.sha256(canonical_request.encode("utf-8")).hexdigest()
+            signature = hmac.new(key, string_to_sign.encode("utf-8"), hashlib.sha256).hexdigest()
+            urls.append(f"{origin}{path}?{query}&X-Amz-Signature={signature}")
+        return urls
+
+    def presign_get(self, key: str, expires_in: int = 600, now: datetime | None = None) -> str:
+        return self.presign_get_many([key], expires_in=expires_in, now=now)[0]
+
+
+@lru_cache(maxsize=4)
+def _cached_presigner(endpoint_url, bucket, region, access_key_id, secret_access_key) -> S3Presigner:
+    return S3Presigner(endpoint_url, bucket, region, access_key_id, secret_access_key)
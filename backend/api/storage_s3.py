@@ -1,11 +1,17 @@
 import mimetypes
 import posixpath
+import threading
+import time
+from collections import OrderedDict
 from dataclasses import dataclass
+from functools import lru_cache
 
 import boto3
 from botocore.config import Config
 from django.conf import settings
 
+from api.sigv4 import S3Presigner
+
 
 @dataclass(frozen=True)
 class PresignedUrl:
@@ -13,17 +19,87 @@ class PresignedUrl:
     key: str
 
 
-def _s3_client():
+@lru_cache(maxsize=4)
+def _build_s3_client(region_name, endpoint_url, access_key_id, secret_access_key):
+    # boto3 clients are thread-safe; building one is the expensive part.
     return boto3.client(
         "s3",
         config=Config(signature_version="s3v4", s3={"addressing_style": "path"}),
-        region_name=getattr(settings, "AWS_S3_REGION_NAME", None),
-        endpoint_url=getattr(settings, "AWS_S3_ENDPOINT_URL", None),
-        aws_access_key_id=getattr(settings, "AWS_ACCESS_KEY_ID", None),
-        aws_secret_access_key=getattr(settings, "AWS_SECRET_ACCESS_KEY", None),
+        region_name=region_name,
+        endpoint_url=endpoint_url,
+        aws_access_key_id=access_key_id,
+        aws_secret_access_key=secret_access_key,
+    )
+
+
+def s3_client():
+    """Process-wide S3 client, rebuilt only when the storage settings change."""
+    return _build_s3_client(
+        getattr(settings, "AWS_S3_REGION_NAME", None),
+        getattr(settings, "AWS_S3_ENDPOINT_URL", None),
+        getattr(settings, "AWS_ACCESS_KEY_ID", None),
+        getattr(settings, "AWS_SECRET_ACCESS_KEY", None),
     )
 
 
+class PresignCache:
+    """LRU of presigned GET URLs, each reused until ``margin`` seconds before it expires."""
+
+    def __init__(self, maxsize: int = 4096, margin: int = 60):
+        self.maxsize = maxsize
+        self.margin = margin
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: OrderedDict[tuple, tuple[str, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, cache_key: tuple) -> str | None:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if entry is not None and entry[1] > now:
+                self._entries.move_to_end(cache_key)
+                self.hits += 1
+                return entry[0]
+            if entry is not None:
+                del self._entries[cache_key]
+            self.misses += 1
+            return None
+
+    def put(self, cache_key: tuple, url: str, expires_in: int) -> None:
+        reuse_until = time.time() + expires_in - self.margin
+        if self.maxsize <= 0 or reuse_until <= time.time():
+            return
+        with self._lock:
+            self._entries[cache_key] = (url, reuse_until)
+            self._entries.move_to_end(cache_key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+presign_cache = PresignCache(
+    maxsize=getattr(settings, "AWS_PRESIGN_CACHE_SIZE", 4096),
+    margin=getattr(settings, "AWS_PRESIGN_CACHE_MARGIN", 60),
+)
+
+
 def guess_content_type(filename_or_path: str) -> str:
     content_type, _ = mimetypes.guess_type(filename_or_path)
     return content_type or "application/octet-stream"
@@ -38,7 +114,7 @@ def normalize_key(key: str) -> str:
 def presign_put(key: str, content_type: str | None = None, expires_in: int = 60 * 10) -> PresignedUrl:
     key = normalize_key(key)
     bucket = settings.AWS_STORAGE_BUCKET_NAME
-    client = _s3_client()
+    client = s3_client()
 
     params = {"Bucket": bucket, "Key": key}
     # IMPORTANT: Do not include ContentType in Params.
@@ -54,16 +130,49 @@ def presign_put(key: str, content_type: str | None = None, expires_in: int = 60
     return PresignedUrl(url=url, key=key)
 
 
+def _sign_get_many(bucket: str, keys: list[str], expires_in: int) -> list[str]:
+    # Signing locally is pure hashing; the boto client is only the fallback
+    # for setups that leave an endpoint or credential to botocore's defaults.
+    presigner = S3Presigner.from_settings()
+    if presigner is not None and presigner.bucket == bucket:
+        return presigner.presign_get_many(keys, expires_in=expires_in)
+    client = s3_client()
+    return [
+        client.generate_presigned_url(
+            ClientMethod="get_object",
+            Params={"Bucket": bucket, "Key": key},
+            ExpiresIn=expires_in,
+            HttpMethod="GET",
+        )
+        for key in keys
+    ]
+
+
 def presign_get(key: str, expires_in: int = 60 * 10) -> str:
     if not key:
         return ""
-    key = normalize_key(key)
-    bucket = settings.AWS_STORAGE_BUCKET_NAME
-    client = _s3_client()
+    return presign_get_many([key], expires_in=expires_in)[0]
 
-    return client.generate_presigned_url(
-        ClientMethod="get_object",
-        Params={"Bucket": bucket, "Key": key},
-        ExpiresIn=expires_in,
-        HttpMethod="GET",
-    )
+
+def presign_get_many(keys, expires_in: int = 60 * 10) -> list[str]:
+    """Presign several keys, signing every cache miss in one batch."""
+    bucket = settings.AWS_STORAGE_BUCKET_NAME
+    urls: list[str] = []
+    missing: dict[str, list[int]] = {}
+    for i, key in enumerate(keys):
+        if not key:
+            urls.append("")
+            continue
+        key = normalize_key(key)
+        url = presign_cache.get((bucket, key, expires_in))
+        urls.append(url)
+        if url is None:
+            missing.setdefault(key, []).append(i)
+
+    if missing:
+        signed = _sign_get_many(bucket, list(missing), expires_in)
+        for (key, positions), url in zip(missing.items(), signed):
+            presign_cache.put((bucket, key, expires_in), url, expires_in)
+            for i in positions:
+                urls[i] = url
+    return urls
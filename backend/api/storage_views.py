@@ -7,13 +7,10 @@ from rest_framework import permissions, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from api.storage_s3 import PresignedUrl, guess_content_type, presign_get, presign_put
+from api.storage_s3 import PresignedUrl, guess_content_type, presign_cache, presign_get, presign_put, s3_client
 
 from drf_spectacular.utils import extend_schema, inline_serializer
 
-import boto3
-from botocore.config import Config
-
 
 def _require_storage_settings():
     missing = []
@@ -152,14 +149,7 @@ class DebugS3View(APIView):
             )
 
         try:
-            client = boto3.client(
-                "s3",
-                config=Config(signature_version="s3v4", s3={"addressing_style": "path"}),
-                region_name=getattr(settings, "AWS_S3_REGION_NAME", None),
-                endpoint_url=getattr(settings, "AWS_S3_ENDPOINT_URL", None),
-                aws_access_key_id=getattr(settings, "AWS_ACCESS_KEY_ID", None),
-                aws_secret_access_key=getattr(settings, "AWS_SECRET_ACCESS_KEY", None),
-            )
+            client = s3_client()
 
             resp = client.list_objects_v2(Bucket=settings.AWS_STORAGE_BUCKET_NAME, MaxKeys=5)
             keys = [obj.get("Key") for obj in resp.get("Contents", [])]
@@ -170,6 +160,7 @@ class DebugS3View(APIView):
                     "endpoint": settings.AWS_S3_ENDPOINT_URL,
                     "region": settings.AWS_S3_REGION_NAME,
                     "sample_keys": keys,
+                    "presign_cache": presign_cache.stats(),
                 },
                 status=status.HTTP_200_OK,
             )
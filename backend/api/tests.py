@@ -1,3 +1,227 @@
-from django.test import TestCase
+import threading
+import time
+from datetime import datetime, timezone
+from unittest import mock
 
-# Create your tests here.
+import boto3
+import fakeredis
+import redis
+from botocore.config import Config
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from api.cache import bump_version, get_or_compute, get_versions, versioned_key
+from api.sigv4 import S3Presigner, signing_key
+from api.storage_s3 import presign_cache, presign_get, presign_get_many
+
+
+NOW = datetime(2024, 3, 9, 23, 59, 58, tzinfo=timezone.utc)
+
+ENDPOINTS = [
+    "https://abc.supabase.co/storage/v1/s3",
+    "https://s3.eu-central-1.amazonaws.com",
+    "http://localhost:9000",
+    "https://h.example.com:443",
+]
+REGIONS = ["us-east-1", "eu-central-1"]
+KEYS = [
+    "products/photo.jpg",
+    "products/with space & plus+.png",
+    "unicode/çafé-ß-日本.webp",
+    "nested/a/b/c/~tilde_(1).JPG",
+    "weird/!$'*,;=:@.txt",
+    "percent%20already/encoded?.jpg",
+]
+
+
+def botocore_url(endpoint, region, bucket, key, expires_in):
+    client = boto3.client(
+        "s3",
+        config=Config(signature_version="s3v4", s3={"addressing_style": "path"}),
+        region_name=region,
+        endpoint_url=endpoint,
+        aws_access_key_id="AKIDEXAMPLE",
+        aws_secret_access_key="wJalrXUtnFEMI/K7MDENG+bPxRfiCYEXAMPLEKEY",
+    )
+    with mock.patch("botocore.auth.get_current_datetime", return_value=NOW.replace(tzinfo=None)):
+        return client.generate_presigned_url(
+            ClientMethod="get_object",
+            Params={"Bucket": bucket, "Key": key},
+            ExpiresIn=expires_in,
+            HttpMethod="GET",
+        )
+
+
+class S3PresignerTests(SimpleTestCase):
+
+    def presigner(self, endpoint, region, bucket="media"):
+        return S3Presigner(endpoint, bucket, region, "AKIDEXAMPLE", "wJalrXUtnFEMI/K7MDENG+bPxRfiCYEXAMPLEKEY")
+
+    def test_matches_botocore_byte_for_byte(self):
+        for endpoint in ENDPOINTS:
+            for region in REGIONS:
+                presigner = self.presigner(endpoint, region)
+                for key in KEYS:
+                    with self.subTest(endpoint=endpoint, region=region, key=key):
+                        self.assertEqual(
+                            presigner.presign_get(key, expires_in=600, now=NOW),
+                            botocore_url(endpoint, region, "media", key, 600),
+                        )
+
+    def test_batch_matches_single(self):
+        presigner = self.presigner(ENDPOINTS[0], REGIONS[0])
+        self.assertEqual(
+            presigner.presign_get_many(KEYS, expires_in=3600, now=NOW),
+            [presigner.presign_get(key, expires_in=3600, now=NOW) for key in KEYS],
+        )
+
+    def test_signing_key_is_derived_once_per_day(self):
+        signing_key.cache_clear()
+        presigner = self.presigner(ENDPOINTS[0], REGIONS[0])
+        presigner.presign_get_many(KEYS, now=NOW)
+        presigner.presign_get(KEYS[0], now=NOW)
+        info = signing_key.cache_info()
+        self.assertEqual((info.misses, info.hits), (1, 1))
+
+
+@override_settings(
+    AWS_S3_ENDPOINT_URL="https://abc.supabase.co/storage/v1/s3",
+    AWS_STORAGE_BUCKET_NAME="media",
+    AWS_S3_REGION_NAME="us-east-1",
+    AWS_ACCESS_KEY_ID="AKIDEXAMPLE",
+    AWS_SECRET_ACCESS_KEY="wJalrXUtnFEMI/K7MDENG+bPxRfiCYEXAMPLEKEY",
+)
+class PresignGetTests(SimpleTestCase):
+
+    def setUp(self):
+        presign_cache.clear()
+
+    def test_uses_local_presigner(self):
+        with mock.patch("api.storage_s3.s3_client") as client:
+            url = presign_get("/products/photo.jpg")
+        client.assert_not_called()
+        self.assertTrue(url.startswith("https://abc.supabase.co/storage/v1/s3/media/products/photo.jpg?X-Amz-"))
+
+    def test_many_signs_each_missing_key_once(self):
+        presign_get("products/a.jpg")
+        with mock.patch.object(S3Presigner, "presign_get_many", autospec=True, side_effect=S3Presigner.presign_get_many) as sign:
+            urls = presign_get_many(["products/a.jpg", "products/b.jpg", "", "products/b.jpg"])
+        self.assertEqual(sign.call_count, 1)
+        self.assertEqual(sign.call_args.args[1], ["products/b.jpg"])
+        self.assertEqual(urls[2], "")
+        self.assertEqual(urls[1], urls[3])
+        self.assertEqual(urls[0], presign_get("products/a.jpg"))
+
+
+# One in-process server shared by every pool, so all cache clients see the same data.
+_fake_server = fakeredis.FakeServer()
+
+
+class FakeRedisConnectionPool(redis.ConnectionPool):
+    """Connection pool for Django's RedisCache backed by fakeredis (requirements-dev.txt).
+
+    Exercises the Redis code paths (serialization, incr, add, TTLs) without a Redis server.
+    """
+
+    def __init__(self, **kwargs):
+        kwargs["connection_class"] = fakeredis.FakeConnection
+        kwargs["server"] = _fake_server
+        super().__init__(**kwargs)
+
+
+FAKEREDIS_CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": "redis://fakeredis:6379/0",
+        "OPTIONS": {"pool_class": "api.tests.FakeRedisConnectionPool"},
+    }
+}
+
+
+@override_settings(CACHES=FAKEREDIS_CACHES, CACHE_VERSION_CHECK_INTERVAL=0)
+class VersionedCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_key_changes_when_the_bump_commits(self):
+        key = versioned_key("products", ["store.product"], "page", 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            bump_version("store.product")
+            self.assertEqual(versioned_key("products", ["store.product"], "page", 1), key)
+        self.assertNotEqual(versioned_key("products", ["store.product"], "page", 1), key)
+
+    def test_bumps_of_one_transaction_are_written_once(self):
+        before = get_versions(["store.product", "store.category"])
+        with self.captureOnCommitCallbacks(execute=True):
+            bump_version("store.product")
+            bump_version("store.product", "store.category")
+        self.assertEqual(get_versions(["store.product", "store.category"]), [v + 1 for v in before])
+
+    def test_rolled_back_bump_keeps_the_key(self):
+        key = versioned_key("products", ["store.product"])
+        with self.captureOnCommitCallbacks(execute=False):
+            bump_version("store.product")
+        self.assertEqual(versioned_key("products", ["store.product"]), key)
+
+    def test_bump_invalidates_cached_value(self):
+        calls = []
+
+        def compute():
+            calls.append(1)
+            return len(calls)
+
+        key = versioned_key("products", ["store.product"])
+        self.assertEqual(get_or_compute(key, compute, timeout=60), 1)
+        self.assertEqual(get_or_compute(key, compute, timeout=60), 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            bump_version("store.product")
+        self.assertEqual(get_or_compute(versioned_key("products", ["store.product"]), compute, timeout=60), 2)
+        self.assertEqual(len(calls), 2)
+
+
+@override_settings(CACHES=FAKEREDIS_CACHES)
+class SingleFlightTests(SimpleTestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_concurrent_misses_compute_once(self):
+        calls = []
+        results = []
+        start = threading.Barrier(8)
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.2)
+            return "value"
+
+        def worker():
+            start.wait()
+            results.append(get_or_compute("single-flight", compute, timeout=60))
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ["value"] * 8)
+
+    def test_waits_for_the_lock_holder_of_another_process(self):
+        cache.add("single-flight:lock", 1, timeout=10)
+        timer = threading.Timer(0.2, cache.set, args=("single-flight", "filled", 60))
+        timer.start()
+        compute = mock.Mock(return_value="recomputed")
+        self.assertEqual(get_or_compute("single-flight", compute, timeout=60), "filled")
+        timer.join()
+        compute.assert_not_called()
+
+    def test_gives_up_waiting_on_a_stale_lock(self):
+        cache.add("single-flight:lock", 1, timeout=10)
+        compute = mock.Mock(return_value="recomputed")
+        self.assertEqual(get_or_compute("single-flight", compute, timeout=60, wait=0.1), "recomputed")
+        compute.assert_called_once()
+        self.assertEqual(cache.get("single-flight"), "recomputed")
+        self.assertIsNone(cache.get("single-flight:lock"))
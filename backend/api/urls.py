@@ -39,6 +39,8 @@ urlpatterns = [
     path('products/', store_views.ProductListView.as_view(), name='products'),
     path('featured-products/', store_views.FeaturedProductListView.as_view(), name='featured-products'),
     path('products/<slug:slug>/', store_views.ProductDetailView.as_view(), name='brand'),
+    path('products/<slug:slug>/bought-together/', store_views.ProductBoughtTogetherView.as_view(), name='product-bought-together'),
+    path('products/<slug:slug>/similar/', store_views.ProductSimilarView.as_view(), name='product-similar'),
     path('cart-view/', store_views.CartApiView.as_view(), name='cart-view'),
     path('cart-list/<str:cart_id>/', store_views.CartListView.as_view(), name='cart-list'),
     path('cart-list/<str:cart_id>/<int:user_id>/', store_views.CartListView.as_view(), name='cart-list-with-user'),
@@ -46,12 +48,15 @@ urlpatterns = [
     path('cart-detail/<str:cart_id>/<int:user_id>/', store_views.CartDetailView.as_view(), name='cart-detail'),
     path('cart-delete/<str:cart_id>/<int:item_id>/', store_views.CartItemDeleteView.as_view(), name='cart-delete'),
     path('cart-delete/<str:cart_id>/<int:item_id>/<int:user_id>/', store_views.CartItemDeleteView.as_view(), name='cart-delete'),
+    path('cart-metrics/', store_views.CartMetricsView.as_view(), name='cart-metrics'),
     path('create-order/', store_views.CreateOrderView.as_view(), name='cart-delete'),
     path('checkout/<str:order_oid>/', store_views.CheckoutView.as_view(), name='checkout'),
     path('coupon/', store_views.CouponApiView.as_view(), name='coupon'),
     path('create-review/', store_views.ReviewRatingAPIView.as_view(), name='create-review'),
     path('reviews/<int:product_id>/', store_views.ReviewListView.as_view(), name='create-review'),
     path('search/', store_views.SearchProductsAPIView.as_view(), name='search'),
+    path('search/suggest/', store_views.SearchSuggestAPIView.as_view(), name='search-suggest'),
+    path('browse/', store_views.BrowseProductsAPIView.as_view(), name='browse'),
 
     # Payment
     path('stripe-checkout/<str:order_oid>/', store_views.StripeCheckoutView.as_view(), name='stripe-checkout'),
@@ -68,6 +73,8 @@ urlpatterns = [
 
     # Vendor API Endpoints
     path('vendor/stats/<int:vendor_id>/', vendor_views.DashboardStatsAPIView.as_view(), name='vendor-stats'),
+    path('vendor/dashboard/<int:vendor_id>/', vendor_views.VendorDashboardAPIView.as_view(), name='vendor-dashboard'),
+    path('vendor/export/<int:vendor_id>/<str:dataset>.<str:fmt>', vendor_views.VendorExportView.as_view(), name='vendor-export'),
     path('vendor/products/<int:vendor_id>/', vendor_views.ProductsAPIView.as_view(), name='vendor-prdoucts'),
     path('vendor/orders/<int:vendor_id>/', vendor_views.OrdersAPIView.as_view(), name='vendor-orders'),
     path('vendor/orders/<int:vendor_id>/<str:order_oid>/', vendor_views.OrderDetailAPIView.as_view(), name='vendor-order-detail'),
@@ -75,6 +82,7 @@ urlpatterns = [
     path('vendor-orders-report-chart/<int:vendor_id>/', vendor_views.MonthlyOrderChartAPIFBV, name='vendor-orders-report-chart'),
     path('vendor-products-report-chart/<int:vendor_id>/', vendor_views.MonthlyProductsChartAPIFBV, name='vendor-product-report-chart'),
     path('vendor-product-create/<int:vendor_id>/', vendor_views.ProductCreateView.as_view(), name='vendor-product-create'),
+    path('vendor-product-import/<int:vendor_id>/', vendor_views.ProductImportAPIView.as_view(), name='vendor-product-import'),
     path('vendor-product-edit/<int:vendor_id>/<str:product_pid>/', vendor_views.ProductUpdateAPIView.as_view(), name='vendor-product-edit'),
     path('vendor-product-delete/<int:vendor_id>/<str:product_pid>/', vendor_views.ProductDeleteAPIView.as_view(), name='vendor-product-delete'),
     path('vendor-product-filter/<int:vendor_id>/', vendor_views.FilterProductsAPIView.as_view(), name='vendor-product-filter'),
@@ -192,6 +192,12 @@ AWS_SECRET_ACCESS_KEY = os.environ.get("AWS_SECRET_ACCESS_KEY")
 AWS_STORAGE_BUCKET_NAME = os.environ.get("AWS_STORAGE_BUCKET_NAME")
 AWS_S3_ENDPOINT_URL = os.environ.get("AWS_S3_ENDPOINT_URL")
 AWS_S3_REGION_NAME = os.environ.get("AWS_S3_REGION_NAME", "eu-west-1")
+# Presigned GET URLs are cached per process (LRU) and reused until
+# AWS_PRESIGN_CACHE_MARGIN seconds before they expire. The margin covers the
+# catalog cache window (CATALOG_CACHE_TIMEOUT) plus the 60s clients may keep a
+# catalog response, so no served URL is close to expiry.
+AWS_PRESIGN_CACHE_SIZE = env.int("AWS_PRESIGN_CACHE_SIZE", default=4096)
+AWS_PRESIGN_CACHE_MARGIN = env.int("AWS_PRESIGN_CACHE_MARGIN", default=360)
 # AWS_SECRET_ACCESS_KEY = env("AWS_SECRET_ACCESS_KEY")
 
 # AWS_STORAGE_BUCKET_NAME = env("AWS_STORAGE_BUCKET_NAME")
@@ -273,6 +279,74 @@ DEFAULT_FROM_EMAIL = BREVO_SENDER_EMAIL
 FROM_EMAIL = DEFAULT_FROM_EMAIL
 SERVER_EMAIL = DEFAULT_FROM_EMAIL
 
+# Order emails are queued in store.EmailOutbox and sent by store.outbox, either
+# on a background thread after commit or by `manage.py drain_outbox --loop`.
+OUTBOX_DRAIN_ON_COMMIT = env.bool("OUTBOX_DRAIN_ON_COMMIT", default=True)
+OUTBOX_MAX_ATTEMPTS = env.int("OUTBOX_MAX_ATTEMPTS", default=8)
+OUTBOX_BACKOFF_BASE = env.int("OUTBOX_BACKOFF_BASE", default=30)
+
+# Cache backend: "locmem" (per process, the default) or "redis" (REDIS_URL).
+CACHE_BACKEND = env("CACHE_BACKEND", default="locmem")
+if CACHE_BACKEND == "redis":
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": env("REDIS_URL", default="redis://127.0.0.1:6379/0"),
+            "KEY_PREFIX": "mv",
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "multivendor",
+            "OPTIONS": {"MAX_ENTRIES": env.int("LOCMEM_CACHE_MAX_ENTRIES", default=10000)},
+        }
+    }
+
+# Seconds catalog responses (categories, brands, featured products, settings,
+# product detail) stay cached, and how long their ETags stay stable. The bodies
+# embed presigned image URLs: keep it at most AWS_PRESIGN_CACHE_MARGIN - 60.
+CATALOG_CACHE_TIMEOUT = env.int("CATALOG_CACHE_TIMEOUT", default=300)
+# Cache keys and ETags carry per-model versions kept in the database
+# (api.CacheVersion); each process rereads them at most this many seconds apart,
+# which bounds how long another worker's change can go unseen.
+CACHE_VERSION_CHECK_INTERVAL = env.float("CACHE_VERSION_CHECK_INTERVAL", default=1.0)
+
+# Seconds a cart's totals (store.carts.cart_summary) stay cached; 0 disables the cache.
+# Invalidation only reaches other workers through a shared cache, so it is off
+# unless CACHE_BACKEND is "redis".
+CART_SUMMARY_CACHE_TIMEOUT = env.int("CART_SUMMARY_CACHE_TIMEOUT", default=300 if CACHE_BACKEND == "redis" else 0)
+# Anonymous cart rows expire this many seconds after their last change and are
+# deleted by `manage.py purge_carts`; logging in merges them into the user's cart.
+CART_ANONYMOUS_TTL = env.int("CART_ANONYMOUS_TTL", default=30 * 24 * 60 * 60)
+
+# Seconds checkout holds stock for an unpaid order (store.inventory). Expired
+# holds are released by `manage.py release_reservations --loop`.
+INVENTORY_HOLD_TTL = env.int("INVENTORY_HOLD_TTL", default=15 * 60)
+
+# Product page and storefront views are counted in process memory and added to
+# Product.views / Vendor.views in one batched UPDATE this many seconds after the
+# first one is buffered, even on an idle worker (store.pageviews), or as soon as
+# VIEW_COUNTER_MAX_PENDING pages are waiting.
+VIEW_COUNTER_FLUSH_INTERVAL = env.int("VIEW_COUNTER_FLUSH_INTERVAL", default=10)
+VIEW_COUNTER_MAX_PENDING = env.int("VIEW_COUNTER_MAX_PENDING", default=5000)
+
+# Co-purchased products kept per product by `manage.py rebuild_copurchases`
+# (run it nightly); paid orders add to the counts in between.
+COPURCHASE_NEIGHBOURS = env.int("COPURCHASE_NEIGHBOURS", default=20)
+
+# Similar products (TF-IDF over title, tags, brand, category and description)
+# kept per product by `manage.py rebuild_similar_products`, which only
+# recomputes products whose text changed; SIMILAR_PRODUCTS_CHUNK_BYTES caps
+# the memory used for each block of scores.
+SIMILAR_PRODUCTS_NEIGHBOURS = env.int("SIMILAR_PRODUCTS_NEIGHBOURS", default=20)
+SIMILAR_PRODUCTS_CHUNK_BYTES = env.int("SIMILAR_PRODUCTS_CHUNK_BYTES", default=256 * 1024 * 1024)
+
+# Seconds the combined vendor dashboard (vendor.dashboard) stays cached per
+# vendor; its figures may lag new orders by this much. 0 disables the cache.
+VENDOR_DASHBOARD_CACHE_TIMEOUT = env.int("VENDOR_DASHBOARD_CACHE_TIMEOUT", default=30)
+
 CORS_ALLOW_ALL_ORIGINS = True
 
 # Allow Django admin CSRF checks to pass when /admin is accessed through the Vite dev server proxy.
@@ -22,7 +22,8 @@ from rest_framework import status
 
 # Serializers
 from userauths.serializer import MyTokenObtainPairSerializer, ProfileSerializer, RegisterSerializer
-from store.serializers import CancelledOrderSerializer, NotificationSerializer, CartSerializer, CartOrderItemSerializer, CouponUsersSerializer, ProductSerializer, TagSerializer ,CategorySerializer, DeliveryCouriersSerializer, CartOrderSerializer, GallerySerializer, BrandSerializer, ProductFaqSerializer, ReviewSerializer,  SpecificationSerializer, CouponSerializer, ColorSerializer, SizeSerializer, AddressSerializer, WishlistSerializer, ConfigSettingsSerializer
+from store.serializers import CancelledOrderSerializer, NotificationSerializer, CartSerializer, CartOrderItemSerializer, CouponUsersSerializer, ProductSerializer, TagSerializer ,CategorySerializer, DeliveryCouriersSerializer, CartOrderSerializer, GallerySerializer, BrandSerializer, ProductFaqSerializer, ReviewSerializer,  SpecificationSerializer, CouponSerializer, ColorSerializer, SizeSerializer, AddressSerializer, WishlistSerializer, ConfigSettingsSerializer, CartOrderListSerializer, WishlistListSerializer, NotificationListSerializer
+from api.pagination import DateCursorPagination, IdCursorPagination
 
 # Models
 from userauths.models import Profile, User 
@@ -37,8 +38,9 @@ import stripe
 import requests
 
 class OrdersAPIView(generics.ListAPIView):
-    serializer_class = CartOrderSerializer
+    serializer_class = CartOrderListSerializer
     permission_classes = (AllowAny,)
+    pagination_class = DateCursorPagination
 
     def get_queryset(self):
         user_id = self.kwargs['user_id']
@@ -89,24 +91,26 @@ class WishlistCreateAPIView(generics.CreateAPIView):
     
 
 class WishlistAPIView(generics.ListAPIView):
-    serializer_class = WishlistSerializer
+    serializer_class = WishlistListSerializer
     permission_classes = (AllowAny, )
+    pagination_class = IdCursorPagination
 
     def get_queryset(self):
         user_id = self.kwargs['user_id']
         user = User.objects.get(id=user_id)
-        wishlist = Wishlist.objects.filter(user=user,)
+        wishlist = Wishlist.objects.filter(user=user,).select_related('product')
         return wishlist
     
 
 class CustomerNotificationView(generics.ListAPIView):
-    serializer_class = NotificationSerializer
+    serializer_class = NotificationListSerializer
     permission_classes = (AllowAny, )
+    pagination_class = DateCursorPagination
 
     def get_queryset(self):
         user_id = self.kwargs['user_id']
         user = User.objects.get(id=user_id)
-        return Notification.objects.filter(user=user)
+        return Notification.objects.filter(user=user).select_related('order', 'order_item__product')
 
 
 class CustomerUpdateView(generics.RetrieveUpdateAPIView):
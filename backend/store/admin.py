@@ -2,7 +2,7 @@ from django.contrib import admin
 from store.models import CartOrderItem, CouponUsers, Notification, Product, Tag ,Category, Cart, DeliveryCouriers, CartOrder, Gallery, Brand, ProductFaq, Review,  Specification, Coupon, Color, Size, Address, Wishlist
 from django import forms
 from userauths.models import User
-from store.models import Vendor
+from store.models import Vendor, EmailOutbox, StockReservation
 
 try:
     from import_export.admin import ImportExportModelAdmin as BaseAdmin
@@ -56,6 +56,7 @@ class ProductAdmin(BaseAdmin):
     list_display = ['product_image', 'image', 'title',   'price', 'featured', 'shipping_amount', 'in_stock' ,'stock_qty', 'order_count', 'vendor' ,'status', 'featured', 'special_offer' ,'hot_deal']
     actions = [make_published, make_in_review, make_featured]
     list_per_page = 100
+    list_select_related = ['vendor', 'stats']
     prepopulated_fields = {"slug": ("title", )}
     form = ProductAdminForm
 
@@ -123,6 +124,17 @@ class NotificationAdmin(BaseAdmin):
     list_editable = ['seen']
     list_display = ['order', 'seen', 'user', 'vendor', 'date']
 
+class EmailOutboxAdmin(admin.ModelAdmin):
+    list_display = ['kind', 'to_email', 'order', 'status', 'attempts', 'next_attempt_at', 'sent_at']
+    list_filter = ['status', 'kind']
+    search_fields = ['to_email', 'order__oid']
+
+class StockReservationAdmin(admin.ModelAdmin):
+    list_display = ['order', 'product', 'qty', 'status', 'expires_at', 'date']
+    list_filter = ['status']
+    search_fields = ['order__oid', 'product__title']
+    raw_id_fields = ['order', 'product']
+
 
 admin.site.register(Review, ProductReviewAdmin)
 admin.site.register(Product, ProductAdmin)
@@ -137,6 +149,8 @@ admin.site.register(Coupon, CouponAdmin)
 admin.site.register(Address, AddressAdmin)
 admin.site.register(Wishlist)
 admin.site.register(Notification, NotificationAdmin)
+admin.site.register(EmailOutbox, EmailOutboxAdmin)
+admin.site.register(StockReservation, StockReservationAdmin)
 admin.site.register(DeliveryCouriers, DeliveryCouriersAdmin)
 # admin.site.register(Size )
 # admin.site.register(Color )
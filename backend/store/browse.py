@@ -0,0 +1,215 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.db.models import Count, Q
+from rest_framework.exceptions import ValidationError
+
+from api.cache import get_or_compute, versioned_key
+from store.models import PRODUCT_SORT_KEYS, Category, Product
+
+
+# Lower edges of the price facet's buckets; the last one is open-ended.
+PRICE_BUCKETS = tuple(Decimal(edge) for edge in ("0.00", "25.00", "50.00", "100.00", "250.00", "500.00", "1000.00"))
+# "N stars & up" buckets of the rating facet.
+RATING_BUCKETS = (4, 3, 2, 1)
+# Orderings a browse page can be sorted by; each ends with a unique key for the cursor.
+SORTS = {
+    "newest": ("-id",),
+    "price": ("sort_price", "id"),
+    "-price": ("-sort_price", "-id"),
+    "popular": ("-sort_views", "-id"),
+    "rating": ("-sort_rating", "-id"),
+}
+SORT_KEYS = PRODUCT_SORT_KEYS
+TRUE_VALUES = ("1", "true", "True", "yes")
+FALSE_VALUES = ("0", "false", "False", "no")
+
+
+def _list(params, name: str) -> list[str]:
+    """``?name=a&name=b`` and ``?name=a,b`` alike."""
+    values = []
+    for raw in params.getlist(name):
+        values.extend(value.strip() for value in raw.split(","))
+    return sorted({value for value in values if value})
+
+
+def _decimal(params, name: str) -> Decimal | None:
+    raw = params.get(name)
+    if raw in (None, ""):
+        return None
+    try:
+        value = Decimal(raw)
+    except InvalidOperation:
+        raise ValidationError({name: "A number is required."})
+    if not value.is_finite() or value < 0:
+        raise ValidationError({name: "Must be zero or more."})
+    return value
+
+
+@dataclass(frozen=True)
+class BrowseFilters:
+    categories: tuple[str, ...] = ()
+    brands: tuple[str, ...] = ()
+    min_price: Decimal | None = None
+    max_price: Decimal | None = None
+    min_rating: int | None = None
+    in_stock: bool | None = None
+    sort: str = "newest"
+
+    @classmethod
+    def from_query(cls, params) -> "BrowseFilters":
+        in_stock = params.get("in_stock")
+        if in_stock in (None, ""):
+            in_stock = None
+        elif in_stock in TRUE_VALUES or in_stock in FALSE_VALUES:
+            in_stock = in_stock in TRUE_VALUES
+        else:
+            raise ValidationError({"in_stock": "Use true or false."})
+
+        min_rating = params.get("min_rating")
+        if min_rating in (None, ""):
+            min_rating = None
+        elif min_rating.isdigit() and 1 <= int(min_rating) <= 5:
+            min_rating = int(min_rating)
+        else:
+            raise ValidationError({"min_rating": "Use a whole number from 1 to 5."})
+
+        sort = params.get("sort") or "newest"
+        if sort not in SORTS:
+            raise ValidationError({"sort": f"Use one of: {', '.join(SORTS)}."})
+
+        return cls(
+            categories=tuple(_list(params, "category")),
+            brands=tuple(_list(params, "brand")),
+            min_price=_decimal(params, "min_price"),
+            max_price=_decimal(params, "max_price"),
+            min_rating=min_rating,
+            in_stock=in_stock,
+            sort=sort,
+        )
+
+    def q(self, exclude: str | None = None) -> Q:
+        """Every filter as one ``Q``, leaving out the one of facet ``exclude``.
+
+        Each facet is counted without its own filter, so picking one brand
+        still shows how many products the other brands have.
+        """
+        q = Q()
+        if self.categories and exclude != "category":
+            q &= Q(category__slug__in=self.categories)
+        if self.brands and exclude != "brand":
+            q &= Q(brand__in=self.brands)
+        if exclude != "price":
+            if self.min_price is not None:
+                q &= Q(price__gte=self.min_price)
+            if self.max_price is not None:
+                q &= Q(price__lte=self.max_price)
+        if self.min_rating is not None and exclude != "rating":
+            q &= Q(rating__gte=self.min_rating)
+        if self.in_stock is not None and exclude != "in_stock":
+            q &= Q(in_stock=self.in_stock)
+        return q
+
+    def cache_parts(self) -> tuple:
+        return (self.categories, self.brands, self.min_price, self.max_price, self.min_rating, self.in_stock)
+
+
+def published():
+    return Product.objects.filter(status="published")
+
+
+def products(filters: BrowseFilters):
+    """Products matching ``filters``, annotated with the key of their sort."""
+    queryset = published().filter(filters.q())
+    key = SORTS[filters.sort][0].lstrip("-")
+    if key in SORT_KEYS:
+        queryset = queryset.annotate(**{key: SORT_KEYS[key]})
+    return queryset
+
+
+def _price_bucket(i: int) -> Q:
+    q = Q(price__gte=PRICE_BUCKETS[i])
+    if i + 1 < len(PRICE_BUCKETS):
+        q &= Q(price__lt=PRICE_BUCKETS[i + 1])
+    return q
+
+
+def scalar_facets(filters: BrowseFilters) -> dict:
+    """Total, price, rating and stock counts in one pass of conditional aggregates."""
+    aggregates = {"total": Count("id", filter=filters.q())}
+    without_price = filters.q("price")
+    for i in range(len(PRICE_BUCKETS)):
+        aggregates[f"price_{i}"] = Count("id", filter=without_price & _price_bucket(i))
+    without_rating = filters.q("rating")
+    for stars in RATING_BUCKETS:
+        aggregates[f"rating_{stars}"] = Count("id", filter=without_rating & Q(rating__gte=stars))
+    without_stock = filters.q("in_stock")
+    aggregates["stock_yes"] = Count("id", filter=without_stock & Q(in_stock=True))
+    aggregates["stock_no"] = Count("id", filter=without_stock & Q(in_stock=False))
+    return published().aggregate(**aggregates)
+
+
+def term_facets(filters: BrowseFilters) -> tuple[list[dict], list[dict]]:
+    """Category and brand counts from one query grouped by (category, brand).
+
+    Each group is counted twice, without the category filter and without the
+    brand filter, and the two facets are summed up from the groups.
+    """
+    without_category, without_brand = filters.q("category"), filters.q("brand")
+    groups = published()
+    # An empty Q matches everything, but ``Q(...) | Q()`` would drop it.
+    if without_category and without_brand:
+        groups = groups.filter(without_category | without_brand)
+    groups = (
+        groups.order_by()
+        .values("category__slug", "category__title", "brand")
+        .annotate(
+            in_category=Count("id", filter=without_category),
+            in_brand=Count("id", filter=without_brand),
+        )
+    )
+    categories: dict[str, dict] = {}
+    brands: dict[str, int] = {}
+    for group in groups:
+        slug = group["category__slug"]
+        if slug and group["in_category"]:
+            row = categories.setdefault(slug, {"slug": slug, "title": group["category__title"], "count": 0})
+            row["count"] += group["in_category"]
+        brand = group["brand"]
+        if brand and group["in_brand"]:
+            brands[brand] = brands.get(brand, 0) + group["in_brand"]
+
+    category_facet = sorted(categories.values(), key=lambda row: (-row["count"], row["title"] or ""))
+    brand_facet = [{"brand": brand, "count": count} for brand, count in brands.items()]
+    brand_facet.sort(key=lambda row: (-row["count"], row["brand"]))
+    return category_facet, brand_facet
+
+
+def build_facets(filters: BrowseFilters) -> dict:
+    """Every facet of the products matching ``filters``, in two queries."""
+    counts = scalar_facets(filters)
+    categories, brands = term_facets(filters)
+    return {
+        "total": counts["total"],
+        "categories": categories,
+        "brands": brands,
+        "price": [
+            {
+                "min": str(PRICE_BUCKETS[i]),
+                "max": str(PRICE_BUCKETS[i + 1]) if i + 1 < len(PRICE_BUCKETS) else None,
+                "count": counts[f"price_{i}"],
+            }
+            for i in range(len(PRICE_BUCKETS))
+        ],
+        "rating": [{"min": stars, "count": counts[f"rating_{stars}"]} for stars in RATING_BUCKETS],
+        "in_stock": {"true": counts["stock_yes"], "false": counts["stock_no"]},
+    }
+
+
+def facets(filters: BrowseFilters) -> dict:
+    """``build_facets``, cached per filter set (not per page or sort) with the catalog."""
+    key = versioned_key("catalog:facets", (Product, Category), *filters.cache_parts())
+    return get_or_compute(key, lambda: build_facets(filters), timeout=settings.CATALOG_CACHE_TIMEOUT)
@@ -0,0 +1,195 @@
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, DecimalField, Q, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from store.models import Cart, CartPurge
+
+
+# Response key -> Cart column, in the shape CartDetailView has always returned.
+SUMMARY_FIELDS = {
+    "shipping": "shipping_amount",
+    "tax": "tax_fee",
+    "service_fee": "service_fee",
+    "sub_total": "sub_total",
+    "total": "total",
+}
+MONEY = DecimalField(max_digits=14, decimal_places=2)
+
+
+def _summary_timeout() -> int:
+    return getattr(settings, "CART_SUMMARY_CACHE_TIMEOUT", 0)
+
+
+def _summary_key(cart_id: str, user_id: int | None) -> str:
+    return f"store:cart:summary:{cart_id}:{user_id or ''}"
+
+
+def cart_rows(cart_id: str, user_id: int | None = None):
+    rows = Cart.objects.filter(cart_id=cart_id)
+    if user_id is not None:
+        rows = rows.filter(user_id=user_id)
+    return rows
+
+
+def aggregate_summary(cart_id: str, user_id: int | None = None) -> dict:
+    """Sum the cart's money columns in one query, as exact Decimals."""
+    aggregates = {
+        key: Coalesce(Sum(column), Value(Decimal("0.00")), output_field=MONEY)
+        for key, column in SUMMARY_FIELDS.items()
+    }
+    return cart_rows(cart_id, user_id).aggregate(
+        item_count=Count("id"),
+        quantity=Coalesce(Sum("qty"), 0),
+        **aggregates,
+    )
+
+
+def cart_summary(cart_id: str, user_id: int | None = None) -> dict:
+    """``aggregate_summary``, cached per cart until one of its rows changes.
+
+    Cart signals keep the cache in step with saves and deletes; code that changes
+    rows with ``QuerySet.update()`` must call ``invalidate_cart`` itself. Only
+    cached with a shared cache (see CART_SUMMARY_CACHE_TIMEOUT), as invalidation
+    has to reach every worker.
+    """
+    timeout = _summary_timeout()
+    if timeout <= 0:
+        return aggregate_summary(cart_id, user_id)
+
+    key = _summary_key(cart_id, user_id)
+    summary = cache.get(key)
+    if summary is None:
+        summary = aggregate_summary(cart_id, user_id)
+        cache.set(key, summary, timeout)
+    return summary
+
+
+def invalidate_cart(cart_id: str | None, *user_ids: int | None) -> None:
+    """Drop the cached summaries of ``cart_id``: the anonymous one and those of ``user_ids``."""
+    if cart_id:
+        cache.delete_many([_summary_key(cart_id, user_id) for user_id in {None, *user_ids}])
+
+
+def merge_anonymous_cart(cart_id: str, user) -> int:
+    """Give ``user`` the anonymous rows of ``cart_id`` and fold their other carts into it.
+
+    Everything ends up under ``cart_id``, which is what checkout reads. When both
+    sides hold the same product, the anonymous row (the latest choice) wins.
+    Returns the number of rows the user owns afterwards.
+    """
+    if not cart_id or user is None:
+        return 0
+
+    with transaction.atomic():
+        anonymous = list(
+            Cart.objects.select_for_update().filter(cart_id=cart_id, user__isnull=True).values_list("pk", "product_id")
+        )
+        owned = list(
+            Cart.objects.select_for_update().filter(user=user).order_by("-date", "-pk").values_list("pk", "product_id", "cart_id")
+        )
+        if not anonymous and all(row_cart_id == cart_id for _, _, row_cart_id in owned):
+            return len(owned)
+
+        keep = {product_id: pk for pk, product_id in anonymous}
+        drop = []
+        # Newest first, so older duplicates of a product are the ones dropped.
+        for pk, product_id, _ in owned:
+            if product_id in keep:
+                drop.append(pk)
+            else:
+                keep[product_id] = pk
+
+        if drop:
+            Cart.objects.filter(pk__in=drop).delete()
+        Cart.objects.filter(pk__in=keep.values()).update(user=user, cart_id=cart_id, expires_at=None)
+
+    # update() skips the Cart signals, so drop every summary the move touched.
+    invalidate_cart(cart_id, user.pk)
+    for old_cart_id in {row_cart_id for _, _, row_cart_id in owned}:
+        invalidate_cart(old_cart_id, user.pk)
+    return len(keep)
+
+
+def expired_rows(now=None):
+    """Anonymous rows past their TTL; rows from before expires_at existed age out from ``date``."""
+    now = now or timezone.now()
+    ttl = timedelta(seconds=getattr(settings, "CART_ANONYMOUS_TTL", 30 * 24 * 60 * 60))
+    return Cart.objects.filter(user__isnull=True).filter(
+        Q(expires_at__lt=now) | Q(expires_at__isnull=True, date__lt=now - ttl)
+    )
+
+
+@dataclass
+class PurgeStats:
+    deleted: int = 0
+    batches: int = 0
+    seconds: float = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.deleted / self.seconds if self.seconds else 0.0
+
+    def as_dict(self, finished_at=None) -> dict:
+        return {
+            "deleted": self.deleted,
+            "batches": self.batches,
+            "seconds": round(self.seconds, 3),
+            "rows_per_second": round(self.rows_per_second, 1),
+            "finished_at": (finished_at or timezone.now()).isoformat(),
+        }
+
+
+def purge_expired(batch_size: int = 1000, max_batches: int | None = None, pause: float = 0.0, progress=None) -> PurgeStats:
+    """Delete expired anonymous rows by primary key, one short transaction per batch.
+
+    Each batch only locks the rows it deletes, so carts in use are never blocked
+    for longer than one batch. ``pause`` seconds between batches leave room for
+    other writers on busy databases.
+    """
+    stats = PurgeStats()
+    started = time.monotonic()
+    now = timezone.now()
+    last_pk = 0
+    while max_batches is None or stats.batches < max_batches:
+        ids = list(expired_rows(now).filter(pk__gt=last_pk).order_by("pk").values_list("pk", flat=True)[:batch_size])
+        if not ids:
+            break
+        last_pk = ids[-1]
+        with transaction.atomic():
+            deleted, _ = expired_rows(now).filter(pk__in=ids).delete()
+        stats.deleted += deleted
+        stats.batches += 1
+        if progress is not None:
+            progress(stats)
+        if pause:
+            time.sleep(pause)
+
+    stats.seconds = time.monotonic() - started
+    CartPurge.objects.create(deleted=stats.deleted, batches=stats.batches, seconds=stats.seconds)
+    return stats
+
+
+def cart_metrics() -> dict:
+    """Size of the cart table and the outcome of the last purge."""
+    now = timezone.now()
+    counts = Cart.objects.aggregate(
+        rows=Count("id"),
+        anonymous_rows=Count("id", filter=Q(user__isnull=True)),
+        carts=Count("cart_id", distinct=True),
+    )
+    counts["expired_rows"] = expired_rows(now).count()
+    last = CartPurge.objects.order_by("-finished_at").first()
+    counts["last_purge"] = (
+        PurgeStats(last.deleted, last.batches, last.seconds).as_dict(last.finished_at) if last else None
+    )
+    return counts
@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import logging
+import time
+from array import array
+from dataclasses import dataclass
+from typing import Iterable, Iterator
+
+import numpy as np
+from scipy import sparse
+
+from django.conf import settings
+from django.db import OperationalError, transaction
+from django.db.models import F
+
+from api.cache import bump_version
+from api.locks import advisory_lock
+from store.models import CartOrderItem, ProductCoPurchase
+
+
+logger = logging.getLogger(__name__)
+
+# Neighbours kept per product by a rebuild.
+NEIGHBOURS = getattr(settings, "COPURCHASE_NEIGHBOURS", 20)
+BATCH_SIZE = 5000
+# Products whose co-occurrence rows are multiplied out at once.
+BLOCK_SIZE = 1024
+# Taken shared by record_order and exclusive by rebuild.
+LOCK_NAME = "store.copurchase"
+# Attempts of record_order when PostgreSQL picks it as a deadlock victim.
+DEADLOCK_ATTEMPTS = 3
+DEADLOCK = "40P01"
+
+
+@dataclass
+class Incidence:
+    # Product id of each column, ascending
+    ids: np.ndarray
+    # 0/1 orders x products matrix, and its transpose (products x orders)
+    orders: sparse.csr_matrix
+    products: sparse.csr_matrix
+
+
+def paid_baskets() -> Iterator[list[int]]:
+    """Distinct product ids of each paid order with at least two products, one order at a time."""
+    rows = (
+        CartOrderItem.objects.filter(order__payment_status="paid", product__isnull=False)
+        .order_by("order_id", "product_id")
+        .values_list("order_id", "product_id")
+        .distinct()
+        .iterator(chunk_size=BATCH_SIZE)
+    )
+    current, basket = None, []
+    for order_id, product_id in rows:
+        if order_id != current:
+            if len(basket) > 1:
+                yield basket
+            current, basket = order_id, []
+        basket.append(product_id)
+    if len(basket) > 1:
+        yield basket
+
+
+def build_incidence(baskets: Iterable[list[int]]) -> Incidence:
+    """Orders x products incidence matrix of ``baskets``.
+
+    Columns are in product id order, so a lower column is a lower product id.
+    """
+    indptr, products = array("q", [0]), array("q")
+    for basket in baskets:
+        products.extend(basket)
+        indptr.append(len(products))
+    ids, columns = np.unique(np.array(products, dtype=np.int64), return_inverse=True)
+    orders = sparse.csr_matrix(
+        (np.ones(len(columns), dtype=np.int32), columns.astype(np.int64), np.array(indptr, dtype=np.int64)),
+        shape=(len(indptr) - 1, len(ids)),
+    )
+    return Incidence(ids=ids, orders=orders, products=orders.T.tocsr())
+
+
+def top_neighbours(incidence: Incidence, k: int) -> Iterator[tuple[int, int, int]]:
+    """``(product_id, other_id, count)`` of each product's ``k`` most co-purchased products.
+
+    Co-occurrence counts are ``productsᵀ·orders``, multiplied out BLOCK_SIZE
+    product rows at a time, so memory is bounded by one block of sparse counts.
+    Ties go to the lower product id.
+    """
+    ids = incidence.ids
+    for start in range(0, len(ids), BLOCK_SIZE):
+        counts = (incidence.products[start:start + BLOCK_SIZE] @ incidence.orders).tocsr()
+        for r in range(counts.shape[0]):
+            row = start + r
+            columns = counts.indices[counts.indptr[r]:counts.indptr[r + 1]]
+            values = counts.data[counts.indptr[r]:counts.indptr[r + 1]]
+            others = columns != row
+            columns, values = columns[others], values[others]
+            for position in np.lexsort((columns, -values))[:k]:
+                yield int(ids[row]), int(ids[columns[position]]), int(values[position])
+
+
+def rebuild(k: int = NEIGHBOURS, batch_size: int = BATCH_SIZE) -> int:
+    """Replace every ProductCoPurchase row with the top ``k`` from all paid orders; returns the row count.
+
+    The orders are read and the table is swapped in one transaction under the
+    exclusive LOCK_NAME lock. Payments recording their pairs wait for it, so
+    no order is missed between the read and the swap or counted twice, and
+    lookups see either the old or the new rankings.
+    """
+    created = 0
+    with transaction.atomic():
+        advisory_lock(LOCK_NAME)
+        incidence = build_incidence(paid_baskets())
+        ProductCoPurchase.objects.all().delete()
+        batch = []
+        for product_id, other_id, count in top_neighbours(incidence, k):
+            batch.append(ProductCoPurchase(product_id=product_id, other_id=other_id, count=count))
+            if len(batch) >= batch_size:
+                ProductCoPurchase.objects.bulk_create(batch)
+                created += len(batch)
+                batch = []
+        ProductCoPurchase.objects.bulk_create(batch)
+        created += len(batch)
+    bump_version(ProductCoPurchase)
+    return created
+
+
+def _add_pairs(ids: list[int]) -> None:
+    ProductCoPurchase.objects.bulk_create(
+        [ProductCoPurchase(product_id=a, other_id=b) for a in ids for b in ids if a != b],
+        ignore_conflicts=True,
+    )
+    locked = list(
+        ProductCoPurchase.objects.select_for_update()
+        .filter(product_id__in=ids, other_id__in=ids)
+        .order_by("product_id", "other_id")
+        .values_list("pk", flat=True)
+    )
+    ProductCoPurchase.objects.filter(pk__in=locked).update(count=F("count") + 1)
+
+
+def record_order(product_ids: Iterable[int]) -> None:
+    """Add one paid order to the pair counts of its products.
+
+    Call it in the transaction that marks the order paid. The shared LOCK_NAME
+    lock it holds until that commits keeps a rebuild from reading the orders
+    between the payment and its increments. Pairs are inserted and locked in
+    key order, so concurrent payments queue instead of deadlocking. A deadlock
+    with locks the caller already holds is retried from a savepoint. Pairs
+    beyond the top ``k`` are only trimmed by the next rebuild.
+    """
+    ids = sorted({pid for pid in product_ids if pid})
+    if len(ids) < 2:
+        return
+    for attempt in range(1, DEADLOCK_ATTEMPTS + 1):
+        try:
+            with transaction.atomic():
+                advisory_lock(LOCK_NAME, shared=True)
+                _add_pairs(ids)
+            return
+        except OperationalError as exc:
+            if getattr(exc.__cause__, "sqlstate", None) != DEADLOCK or attempt == DEADLOCK_ATTEMPTS:
+                raise
+            logger.warning("Co-purchase update deadlocked, retrying (attempt %s)", attempt)
+            time.sleep(0.05 * attempt)
+
+
+def record_paid_order(order_items) -> None:
+    """``record_order`` for a payment's items; a failure is logged and leaves the payment in place."""
+    try:
+        record_order(item.product_id for item in order_items)
+    except Exception:
+        logger.exception("Co-purchase update failed")
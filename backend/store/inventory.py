@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+from collections import Counter
+from datetime import timedelta
+from typing import Iterable
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from django.db.models.functions import Greatest
+from django.db.models.lookups import GreaterThan
+from django.utils import timezone
+
+from store.models import Product, StockReservation
+
+
+# Seconds a checkout holds its stock before the sweeper hands it back.
+HOLD_TTL = getattr(settings, "INVENTORY_HOLD_TTL", 15 * 60)
+
+
+def quantities(lines: Iterable) -> dict[int, int]:
+    """Units per product of ``lines`` (anything with ``product_id`` and ``qty``)."""
+    totals: Counter[int] = Counter()
+    for line in lines:
+        totals[line.product_id] += line.qty or 0
+    return {product_id: qty for product_id, qty in totals.items() if qty > 0}
+
+
+def _per_product(qtys: dict[int, int]) -> Case:
+    return Case(
+        *[When(pk=product_id, then=Value(qty)) for product_id, qty in qtys.items()],
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+
+
+def _lock(product_ids: Iterable[int]) -> dict[int, int]:
+    """Lock the products' rows in primary key order and return their unreserved stock.
+
+    Every writer of ``stock_qty``/``reserved_qty`` here locks in the same
+    order, so concurrent checkouts of overlapping carts queue instead of
+    deadlocking.
+    """
+    return dict(
+        Product.objects.select_for_update()
+        .filter(pk__in=product_ids)
+        .order_by("pk")
+        .values_list("pk", F("stock_qty") - F("reserved_qty"))
+    )
+
+
+def _apply(reserved: dict[int, int], sold: dict[int, int] | None = None) -> None:
+    """One UPDATE adding the signed ``reserved`` units to ``reserved_qty`` and taking ``sold`` out of ``stock_qty``.
+
+    ``in_stock`` is set in the same statement (the PostgreSQL trigger would agree).
+    """
+    sold = sold or {}
+    ids = set(reserved) | set(sold)
+    if not ids:
+        return
+    updates = {}
+    if reserved:
+        updates["reserved_qty"] = Greatest(F("reserved_qty") + _per_product(reserved), 0)
+    if sold:
+        remaining = Greatest(F("stock_qty") - _per_product(sold), 0)
+        updates["stock_qty"] = remaining
+        updates["in_stock"] = Case(When(GreaterThan(remaining, 0), then=Value(True)), default=Value(False))
+    Product.objects.filter(pk__in=ids).update(**updates)
+
+
+@transaction.atomic
+def reserve(order, lines) -> list[int]:
+    """Hold stock for every line of ``order`` for HOLD_TTL seconds.
+
+    Returns the ids of products without enough unreserved stock, in which case
+    nothing is held. The product rows stay locked until the caller's
+    transaction commits, so call this as the last write of the checkout.
+    """
+    qtys = quantities(lines)
+    available = _lock(qtys)
+    short = [product_id for product_id, qty in qtys.items() if available.get(product_id, 0) < qty]
+    if short:
+        return short
+
+    _apply(qtys)
+    expires_at = timezone.now() + timedelta(seconds=HOLD_TTL)
+    StockReservation.objects.bulk_create([
+        StockReservation(order=order, product_id=product_id, qty=qty, expires_at=expires_at)
+        for product_id, qty in qtys.items()
+    ])
+    return []
+
+
+@transaction.atomic
+def commit(order, order_items) -> None:
+    """Take the units of ``order_items`` out of stock and close the order's holds.
+
+    One UPDATE covers every line. Units sold are taken from stock even when the
+    hold already expired (or never existed, for orders placed before holds), as
+    the order is paid; only units still held are taken out of ``reserved_qty``.
+    """
+    sold = quantities(order_items)
+    holds = list(StockReservation.objects.select_for_update().filter(order=order, status="held"))
+    held = {hold.product_id: -hold.qty for hold in holds}
+
+    _lock(set(sold) | set(held))
+    _apply(held, sold)
+    StockReservation.objects.filter(order=order, status__in=("held", "released")).update(status="committed")
+
+
+def _release(holds: list[StockReservation]) -> int:
+    if not holds:
+        return 0
+    qtys: Counter[int] = Counter()
+    for hold in holds:
+        qtys[hold.product_id] -= hold.qty
+    _lock(qtys)
+    _apply(dict(qtys))
+    return StockReservation.objects.filter(pk__in=[hold.pk for hold in holds]).update(status="released")
+
+
+@transaction.atomic
+def release(order) -> int:
+    """Give back the stock ``order`` still holds, e.g. once its checkout session expired."""
+    return _release(list(StockReservation.objects.select_for_update().filter(order=order, status="held")))
+
+
+def release_expired(batch_size: int = 500) -> int:
+    """Release holds past their expiry, ``batch_size`` per transaction; returns how many.
+
+    Workers skip holds another transaction has locked, so the sweeper never
+    waits on a payment committing the same order.
+    """
+    released = 0
+    while True:
+        with transaction.atomic():
+            holds = list(
+                StockReservation.objects.select_for_update(skip_locked=True)
+                .filter(status="held", expires_at__lte=timezone.now())
+                .order_by("expires_at", "id")[:batch_size]
+            )
+            count = _release(holds)
+        released += count
+        if len(holds) < batch_size:
+            return released
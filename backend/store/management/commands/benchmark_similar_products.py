@@ -0,0 +1,75 @@
+import itertools
+import random
+import resource
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from store.similar import NEIGHBOURS, outranked, top_neighbours, vectorize
+
+
+class Command(BaseCommand):
+    help = "Time the similar products build on synthetic products (nothing is written to the database)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--products", type=int, default=100_000, help="Synthetic products to generate.")
+        parser.add_argument("--vocabulary", type=int, default=30_000, help="Distinct words to draw from.")
+        parser.add_argument("--neighbours", type=int, default=NEIGHBOURS, help="Similar products kept per product.")
+        parser.add_argument("--changed", type=float, default=0.01, help="Share of products edited for the incremental run.")
+        parser.add_argument("--seed", type=int, default=42)
+
+    def documents(self, count, words, rng):
+        # Zipf-like word frequencies, as in real catalog text.
+        weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(words))))
+        brands = words[:500]
+        categories = words[:40]
+        for product_id in range(1, count + 1):
+            yield product_id, {
+                "title": " ".join(rng.choices(words, cum_weights=weights, k=rng.randint(3, 8))),
+                "tags": " ".join(rng.choices(words, cum_weights=weights, k=3)),
+                "brand": rng.choice(brands),
+                "category": rng.choice(categories),
+                "description": " ".join(rng.choices(words, cum_weights=weights, k=rng.randint(20, 60))),
+            }
+
+    def timed(self, label, fn):
+        start = time.perf_counter()
+        result = fn()
+        self.stdout.write(f"{label}: {time.perf_counter() - start:.2f}s")
+        return result
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        words = [f"w{i}" for i in range(options["vocabulary"])]
+        documents = list(self.documents(options["products"], words, rng))
+        k = options["neighbours"]
+
+        index = self.timed("vectorize", lambda: vectorize(documents))
+        self.stdout.write(f"  {len(index)} products, {index.rows.shape[1]} terms, {index.rows.nnz} non-zeros")
+        # Every product's k-th best score, as the stored rows would give it.
+        floors = np.zeros(len(index), dtype=np.float32)
+        kept = np.zeros(len(index), dtype=np.int64)
+
+        def build():
+            count = 0
+            for product_id, _, score in top_neighbours(index, np.arange(len(index)), k):
+                row = product_id - 1
+                floors[row] = score
+                kept[row] += 1
+                count += 1
+            return count
+
+        rows = self.timed("top-k, all products", build)
+        floors[kept < k] = 0
+        self.stdout.write(f"  {rows} neighbour rows")
+
+        changed = np.array(sorted(rng.sample(range(len(index)), max(1, int(len(index) * options["changed"])))))
+        affected = self.timed("incremental: find affected products", lambda: outranked(index, changed, floors))
+        recompute = np.union1d(changed, affected)
+        self.timed(
+            f"incremental: top-k for {len(recompute)} products",
+            lambda: sum(1 for _ in top_neighbours(index, recompute, k)),
+        )
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        self.stdout.write(self.style.SUCCESS(f"Done. Peak memory {peak:.0f} MB."))
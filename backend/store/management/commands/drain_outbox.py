@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from store.outbox import drain
+
+
+class Command(BaseCommand):
+    help = "Send queued outbox emails, retrying failures with exponential backoff."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=50, help="Emails claimed per batch.")
+        parser.add_argument("--loop", action="store_true", help="Keep polling instead of exiting once the outbox is empty.")
+        parser.add_argument("--interval", type=float, default=5.0, help="Seconds between polls with --loop.")
+
+    def handle(self, *args, **options):
+        batch_size = max(1, options["batch_size"])
+
+        while True:
+            sent, failed = drain(batch_size=batch_size)
+            if sent or failed:
+                self.stdout.write(f"Sent {sent} emails, {failed} failed attempts")
+            if not options["loop"]:
+                break
+            time.sleep(options["interval"])
+
+        self.stdout.write(self.style.SUCCESS("Done."))
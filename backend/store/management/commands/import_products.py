@@ -0,0 +1,29 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from store.product_import import CHUNK_SIZE, detect_format, import_products
+from vendor.models import Vendor
+
+
+class Command(BaseCommand):
+    help = "Bulk-create a vendor's products from a CSV or JSON lines file and print the error report."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="File to import (.csv, .jsonl or .ndjson).")
+        parser.add_argument("--vendor", type=int, required=True, help="Vendor id the products belong to.")
+        parser.add_argument("--format", choices=["csv", "jsonl"], help="Override the format guessed from the file name.")
+        parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="Rows saved per transaction.")
+
+    def handle(self, *args, **options):
+        if not Vendor.objects.filter(pk=options["vendor"]).exists():
+            raise CommandError(f"Vendor {options['vendor']} does not exist.")
+        fmt = options["format"] or detect_format(options["path"])
+        if fmt is None:
+            raise CommandError("Cannot tell the file format; pass --format.")
+
+        with open(options["path"], "rb") as stream:
+            report = import_products(options["vendor"], stream, fmt, chunk_size=max(1, options["chunk_size"]))
+
+        self.stdout.write(json.dumps(report.as_dict(), indent=2, default=str))
+        self.stdout.write(self.style.SUCCESS(f"Done. {report.created} of {report.rows} rows imported."))
@@ -0,0 +1,29 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from store.carts import cart_metrics, purge_expired
+
+
+class Command(BaseCommand):
+    help = "Delete expired anonymous cart rows in small batches and report cart table metrics."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000, help="Rows deleted per transaction.")
+        parser.add_argument("--max-batches", type=int, default=None, help="Stop after this many batches.")
+        parser.add_argument("--pause", type=float, default=0.0, help="Seconds to sleep between batches.")
+        parser.add_argument("--stats", action="store_true", help="Only print cart table metrics.")
+
+    def handle(self, *args, **options):
+        if not options["stats"]:
+            stats = purge_expired(
+                batch_size=max(1, options["batch_size"]),
+                max_batches=options["max_batches"],
+                pause=max(0.0, options["pause"]),
+                progress=lambda s: self.stdout.write(f"Deleted {s.deleted} rows in {s.batches} batches"),
+            )
+            self.stdout.write(self.style.SUCCESS(
+                f"Done. {stats.deleted} rows in {stats.seconds:.2f}s ({stats.rows_per_second:.0f} rows/s)."
+            ))
+
+        self.stdout.write(json.dumps(cart_metrics(), indent=2, default=str))
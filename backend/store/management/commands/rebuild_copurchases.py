@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from store.copurchase import BATCH_SIZE, NEIGHBOURS, rebuild
+
+
+class Command(BaseCommand):
+    help = "Rebuild the frequently-bought-together rankings (ProductCoPurchase) from all paid orders."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--neighbours", type=int, default=NEIGHBOURS, help="Co-purchased products kept per product.")
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="Rows inserted per query.")
+
+    def handle(self, *args, **options):
+        rows = rebuild(k=max(1, options["neighbours"]), batch_size=max(1, options["batch_size"]))
+        self.stdout.write(self.style.SUCCESS(f"Done. {rows} co-purchase rows."))
@@ -0,0 +1,85 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from store.models import CartOrderItem, Product, ProductStats, Review, Wishlist
+
+
+class Command(BaseCommand):
+    help = "Rebuild the denormalized ProductStats table from reviews, paid orders and wishlists."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000, help="Products processed per transaction.")
+
+    def handle(self, *args, **options):
+        batch_size = max(1, options["batch_size"])
+        last_id = 0
+        total = 0
+
+        while True:
+            batch = list(
+                Product.objects.filter(pk__gt=last_id)
+                .order_by("pk")
+                .values_list("pk", "views")[:batch_size]
+            )
+            if not batch:
+                break
+            last_id = batch[-1][0]
+            self.rebuild_batch(batch)
+            total += len(batch)
+            self.stdout.write(f"Rebuilt stats for {total} products (last id {last_id})")
+
+        self.stdout.write(self.style.SUCCESS(f"Done. {total} products processed."))
+
+    @transaction.atomic
+    def rebuild_batch(self, batch):
+        ids = [pk for pk, _ in batch]
+
+        ratings = {
+            row["product_id"]: (row["rating_sum"] or 0, row["rating_count"])
+            for row in Review.objects.filter(product_id__in=ids)
+            .order_by()
+            .values("product_id")
+            .annotate(rating_sum=Sum("rating"), rating_count=Count("id"))
+        }
+        orders = dict(
+            CartOrderItem.objects.filter(product_id__in=ids, order__payment_status="paid")
+            .order_by()
+            .values("product_id")
+            .annotate(count=Count("id"))
+            .values_list("product_id", "count")
+        )
+        wishlists = dict(
+            Wishlist.objects.filter(product_id__in=ids)
+            .order_by()
+            .values("product_id")
+            .annotate(count=Count("id"))
+            .values_list("product_id", "count")
+        )
+
+        now = timezone.now()
+        rows = []
+        products = []
+        for pk, views in batch:
+            rating_sum, rating_count = ratings.get(pk, (0, 0))
+            row = ProductStats(
+                product_id=pk,
+                rating_sum=rating_sum,
+                rating_count=rating_count,
+                order_count=orders.get(pk, 0),
+                wishlist_count=wishlists.get(pk, 0),
+                view_count=views or 0,
+                updated_at=now,
+            )
+            rows.append(row)
+            products.append(Product(pk=pk, rating=int(row.rating_average())))
+
+        # view_count is not derivable from history, so existing rows keep theirs.
+        ProductStats.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=["product"],
+            update_fields=["rating_sum", "rating_count", "order_count", "wishlist_count", "updated_at"],
+        )
+        Product.objects.bulk_update(products, ["rating"])
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from store import search
+from store.models import Product, ProductSearchDocument
+
+
+class Command(BaseCommand):
+    help = "Rebuild the product full-text search documents from scratch."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500, help="Products indexed per transaction.")
+
+    def handle(self, *args, **options):
+        batch_size = max(1, options["batch_size"])
+        last_id = 0
+        total = 0
+
+        # Drop documents of products that no longer exist or are unpublished.
+        ProductSearchDocument.objects.exclude(product__status="published").delete()
+
+        while True:
+            batch = list(
+                Product.objects.filter(pk__gt=last_id)
+                .select_related("category")
+                .order_by("pk")[:batch_size]
+            )
+            if not batch:
+                break
+            last_id = batch[-1].pk
+            with transaction.atomic():
+                search.index_products(batch)
+            total += len(batch)
+            self.stdout.write(f"Indexed {total} products (last id {last_id})")
+
+        self.stdout.write(self.style.SUCCESS(f"Done. {total} products processed."))
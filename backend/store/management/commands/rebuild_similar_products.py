@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from store.similar import NEIGHBOURS, refresh
+
+
+class Command(BaseCommand):
+    help = "Recompute the similar products of every product whose text changed since the last run."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--neighbours", type=int, default=NEIGHBOURS, help="Similar products kept per product.")
+        parser.add_argument("--full", action="store_true", help="Rescore every product, not only the changed ones.")
+
+    def handle(self, *args, **options):
+        count, full = refresh(k=max(1, options["neighbours"]), full=options["full"])
+        kind = "Full rebuild" if full else "Incremental refresh"
+        self.stdout.write(self.style.SUCCESS(f"Done. {kind}: {count} products recomputed."))
@@ -0,0 +1,90 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, DecimalField, F, Sum, Value
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from api.locks import advisory_lock
+from store.models import CartOrderItem, VendorDailyStats
+from store.stats import VENDOR_AMOUNTS, VENDOR_COUNTERS, VENDOR_STATS_LOCK
+from vendor.models import Vendor
+
+
+MONEY = DecimalField(max_digits=14, decimal_places=2)
+
+
+def money_sum(expression):
+    return Coalesce(Sum(expression), Value(0), output_field=MONEY)
+
+
+class Command(BaseCommand):
+    help = "Rebuild the VendorDailyStats rollups from the history of paid orders."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=100, help="Vendors processed per transaction.")
+        parser.add_argument("--vendor", type=int, action="append", help="Only rebuild this vendor id (repeatable).")
+
+    def handle(self, *args, **options):
+        batch_size = max(1, options["batch_size"])
+        vendors = Vendor.objects.all()
+        if options["vendor"]:
+            vendors = vendors.filter(pk__in=options["vendor"])
+
+        last_id = 0
+        total = rows = 0
+        while True:
+            ids = list(vendors.filter(pk__gt=last_id).order_by("pk").values_list("pk", flat=True)[:batch_size])
+            if not ids:
+                break
+            last_id = ids[-1]
+            rows += self.rebuild_batch(ids)
+            total += len(ids)
+            self.stdout.write(f"Rebuilt rollups for {total} vendors (last id {last_id})")
+
+        self.stdout.write(self.style.SUCCESS(f"Done. {total} vendors, {rows} daily rows."))
+
+    @transaction.atomic
+    def rebuild_batch(self, ids):
+        # Payments wait while the batch is read and written, so none is lost or counted twice.
+        advisory_lock(VENDOR_STATS_LOCK)
+        days = (
+            CartOrderItem.objects.filter(vendor_id__in=ids, order__payment_status="paid")
+            .annotate(day=TruncDate("order__date"))
+            .order_by()
+            .values("vendor_id", "day")
+            .annotate(
+                order_count=Count("order", distinct=True),
+                item_count=Count("id"),
+                qty_sum=Coalesce(Sum("qty"), 0),
+                revenue_sum=money_sum(F("sub_total") + F("shipping_amount")),
+                shipping_sum=money_sum("shipping_amount"),
+                saved_sum=money_sum("saved"),
+            )
+        )
+
+        now = timezone.now()
+        rows = [
+            VendorDailyStats(
+                vendor_id=row["vendor_id"],
+                day=row["day"],
+                orders=row["order_count"],
+                items=row["item_count"],
+                qty=row["qty_sum"],
+                revenue=row["revenue_sum"],
+                shipping=row["shipping_sum"],
+                saved=row["saved_sum"],
+                updated_at=now,
+            )
+            for row in days
+        ]
+
+        VendorDailyStats.objects.bulk_create(
+            rows,
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=["vendor", "day"],
+            update_fields=[*VENDOR_COUNTERS, *VENDOR_AMOUNTS, "updated_at"],
+        )
+        # Days with no paid orders left (e.g. refunded since) must not keep stale rows.
+        VendorDailyStats.objects.filter(vendor_id__in=ids).exclude(updated_at=now).delete()
+        return len(rows)
@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from store.inventory import release_expired
+
+
+class Command(BaseCommand):
+    help = "Give back the stock of checkout holds that expired before the order was paid."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500, help="Holds released per transaction.")
+        parser.add_argument("--loop", action="store_true", help="Keep polling instead of exiting once no hold is due.")
+        parser.add_argument("--interval", type=float, default=30.0, help="Seconds between polls with --loop.")
+
+    def handle(self, *args, **options):
+        batch_size = max(1, options["batch_size"])
+
+        while True:
+            released = release_expired(batch_size=batch_size)
+            if released:
+                self.stdout.write(f"Released {released} expired holds")
+            if not options["loop"]:
+                break
+            time.sleep(options["interval"])
+
+        self.stdout.write(self.style.SUCCESS("Done."))
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.8 on 2026-10-18 14:23
+
+import django.contrib.postgres.search
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def create_vector_gin_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(
+        "CREATE INDEX IF NOT EXISTS st_search_doc_vec_gin "
+        "ON store_productsearchdocument USING gin (vector);"
+    )
+
+
+def drop_vector_gin_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS st_search_doc_vec_gin;")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0032_productstats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductSearchDocument',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_document', serialize=False, to='store.product')),
+                ('title', models.CharField(blank=True, default='', max_length=255)),
+                ('tags', models.TextField(blank=True, default='')),
+                ('brand', models.CharField(blank=True, default='', max_length=255)),
+                ('category', models.CharField(blank=True, default='', max_length=100)),
+                ('description', models.TextField(blank=True, default='')),
+                ('vector', django.contrib.postgres.search.SearchVectorField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name_plural': 'Product Search Documents',
+            },
+        ),
+        migrations.RunPython(create_vector_gin_index, drop_vector_gin_index),
+    ]
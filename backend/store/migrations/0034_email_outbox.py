@@ -0,0 +1,37 @@
+# Generated by Django 5.2.8 on 2026-10-18 14:38
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0033_product_search_document'),
+        ('vendor', '0003_alter_vendor_description'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmailOutbox',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('customer_order_confirmation', 'Customer Order Confirmation'), ('vendor_order_sale', 'Vendor Order Sale')], max_length=50)),
+                ('to_email', models.CharField(max_length=255)),
+                ('dedupe_key', models.CharField(max_length=255, unique=True)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('sent', 'Sent'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('last_error', models.TextField(blank=True, default='')),
+                ('date', models.DateTimeField(auto_now_add=True)),
+                ('sent_at', models.DateTimeField(blank=True, null=True)),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='outbox_emails', to='store.cartorder')),
+                ('vendor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='vendor.vendor')),
+            ],
+            options={
+                'verbose_name_plural': 'Email Outbox',
+                'indexes': [models.Index(fields=['status', 'next_attempt_at'], name='store_outbox_due_idx')],
+            },
+        ),
+    ]
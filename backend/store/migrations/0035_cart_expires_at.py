@@ -0,0 +1,24 @@
+# Generated by Django 5.2.8 on 2026-10-18 14:43
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0034_email_outbox'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cart',
+            name='expires_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='cart',
+            index=models.Index(fields=['expires_at'], name='store_cart_expires_idx'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.8 on 2026-10-18 14:48
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0035_cart_expires_at'),
+        ('vendor', '0003_alter_vendor_description'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VendorDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('orders', models.PositiveIntegerField(default=0)),
+                ('items', models.PositiveIntegerField(default=0)),
+                ('qty', models.PositiveIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0.0, max_digits=14)),
+                ('shipping', models.DecimalField(decimal_places=2, default=0.0, max_digits=14)),
+                ('saved', models.DecimalField(decimal_places=2, default=0.0, max_digits=14)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('vendor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='vendor.vendor')),
+            ],
+            options={
+                'verbose_name_plural': 'Vendor Daily Stats',
+                'constraints': [models.UniqueConstraint(fields=('vendor', 'day'), name='store_vendor_day_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.8 on 2026-10-18 15:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0037_stock_reservations'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductCoPurchase',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('other', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bought_with', to='store.product')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='copurchases', to='store.product')),
+            ],
+            options={
+                'verbose_name_plural': 'Product Co-purchases',
+                'indexes': [models.Index(fields=['product', '-count'], name='store_copurchase_rank_idx')],
+                'constraints': [models.UniqueConstraint(fields=('product', 'other'), name='store_copurchase_uniq')],
+            },
+        ),
+    ]
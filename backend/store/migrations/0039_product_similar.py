@@ -0,0 +1,38 @@
+# Generated by Django 5.2.8 on 2026-10-18 15:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0038_product_copurchase'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductSimilarState',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='similar_state', serialize=False, to='store.product')),
+                ('signature', models.CharField(max_length=40)),
+            ],
+            options={
+                'verbose_name_plural': 'Product Similarity States',
+            },
+        ),
+        migrations.CreateModel(
+            name='ProductSimilar',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField()),
+                ('other', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='similar_to', to='store.product')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='similar', to='store.product')),
+            ],
+            options={
+                'verbose_name_plural': 'Product Similarities',
+                'indexes': [models.Index(fields=['product', '-score'], name='store_similar_rank_idx')],
+                'constraints': [models.UniqueConstraint(fields=('product', 'other'), name='store_similar_uniq')],
+            },
+        ),
+    ]
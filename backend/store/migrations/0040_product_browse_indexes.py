@@ -0,0 +1,30 @@
+# Generated by Django 5.2.8 on 2026-10-18 15:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0039_product_similar'),
+        ('vendor', '0004_vendor_views'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['status', 'category', 'id'], name='st_prod_stat_cat_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['status', 'brand'], name='st_prod_stat_brand_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['status', 'price', 'id'], name='st_prod_stat_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['status', 'rating', 'id'], name='st_prod_stat_rating_idx'),
+        ),
+    ]
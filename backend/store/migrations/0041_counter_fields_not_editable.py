@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-18 15:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0040_product_browse_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='product',
+            name='reserved_qty',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AlterField(
+            model_name='product',
+            name='views',
+            field=models.PositiveIntegerField(blank=True, default=0, editable=False, null=True),
+        ),
+    ]
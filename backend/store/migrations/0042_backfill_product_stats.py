@@ -0,0 +1,86 @@
+from django.db import migrations
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+
+BATCH_SIZE = 1000
+
+
+def backfill_product_stats(apps, schema_editor):
+    """Fill ProductStats from reviews, paid orders, wishlists and Product.views.
+
+    Rows that increments created before this ran only hold the counts seen since
+    0032, so every product's row is overwritten with the totals from history.
+    """
+    Product = apps.get_model("store", "Product")
+    ProductStats = apps.get_model("store", "ProductStats")
+    Review = apps.get_model("store", "Review")
+    CartOrderItem = apps.get_model("store", "CartOrderItem")
+    Wishlist = apps.get_model("store", "Wishlist")
+
+    last_id = 0
+    while True:
+        batch = list(
+            Product.objects.filter(pk__gt=last_id)
+            .order_by("pk")
+            .values_list("pk", "views")[:BATCH_SIZE]
+        )
+        if not batch:
+            break
+        last_id = batch[-1][0]
+        ids = [pk for pk, _ in batch]
+
+        ratings = {
+            row["product_id"]: (row["rating_sum"] or 0, row["rating_count"])
+            for row in Review.objects.filter(product_id__in=ids)
+            .order_by()
+            .values("product_id")
+            .annotate(rating_sum=Sum("rating"), rating_count=Count("id"))
+        }
+        orders = dict(
+            CartOrderItem.objects.filter(product_id__in=ids, order__payment_status="paid")
+            .order_by()
+            .values("product_id")
+            .annotate(count=Count("id"))
+            .values_list("product_id", "count")
+        )
+        wishlists = dict(
+            Wishlist.objects.filter(product_id__in=ids)
+            .order_by()
+            .values("product_id")
+            .annotate(count=Count("id"))
+            .values_list("product_id", "count")
+        )
+
+        now = timezone.now()
+        rows = []
+        for pk, views in batch:
+            rating_sum, rating_count = ratings.get(pk, (0, 0))
+            rows.append(
+                ProductStats(
+                    product_id=pk,
+                    rating_sum=rating_sum,
+                    rating_count=rating_count,
+                    order_count=orders.get(pk, 0),
+                    wishlist_count=wishlists.get(pk, 0),
+                    view_count=views or 0,
+                    updated_at=now,
+                )
+            )
+        ProductStats.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=["product"],
+            update_fields=["rating_sum", "rating_count", "order_count", "wishlist_count", "view_count", "updated_at"],
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0041_counter_fields_not_editable'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_product_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,78 @@
+from django.db import migrations
+from django.db.models import Count, DecimalField, F, Sum, Value
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+
+BATCH_SIZE = 100
+MONEY = DecimalField(max_digits=14, decimal_places=2)
+
+
+def money_sum(expression):
+    return Coalesce(Sum(expression), Value(0), output_field=MONEY)
+
+
+def backfill_vendor_daily_stats(apps, schema_editor):
+    """Fill VendorDailyStats from the paid orders placed before 0036.
+
+    Rows that payments created since then only hold those payments, so every
+    vendor's days are overwritten with the totals from history.
+    """
+    Vendor = apps.get_model("vendor", "Vendor")
+    CartOrderItem = apps.get_model("store", "CartOrderItem")
+    VendorDailyStats = apps.get_model("store", "VendorDailyStats")
+
+    last_id = 0
+    while True:
+        ids = list(Vendor.objects.filter(pk__gt=last_id).order_by("pk").values_list("pk", flat=True)[:BATCH_SIZE])
+        if not ids:
+            break
+        last_id = ids[-1]
+
+        days = (
+            CartOrderItem.objects.filter(vendor_id__in=ids, order__payment_status="paid")
+            .annotate(day=TruncDate("order__date"))
+            .order_by()
+            .values("vendor_id", "day")
+            .annotate(
+                order_count=Count("order", distinct=True),
+                item_count=Count("id"),
+                qty_sum=Coalesce(Sum("qty"), 0),
+                revenue_sum=money_sum(F("sub_total") + F("shipping_amount")),
+                shipping_sum=money_sum("shipping_amount"),
+                saved_sum=money_sum("saved"),
+            )
+        )
+        now = timezone.now()
+        VendorDailyStats.objects.bulk_create(
+            [
+                VendorDailyStats(
+                    vendor_id=row["vendor_id"],
+                    day=row["day"],
+                    orders=row["order_count"],
+                    items=row["item_count"],
+                    qty=row["qty_sum"],
+                    revenue=row["revenue_sum"],
+                    shipping=row["shipping_sum"],
+                    saved=row["saved_sum"],
+                    updated_at=now,
+                )
+                for row in days
+            ],
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=["vendor", "day"],
+            update_fields=["orders", "items", "qty", "revenue", "shipping", "saved", "updated_at"],
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0042_backfill_product_stats'),
+        ('vendor', '0005_counter_fields_not_editable'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_vendor_daily_stats, migrations.RunPython.noop),
+    ]
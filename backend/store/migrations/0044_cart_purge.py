@@ -0,0 +1,28 @@
+# Generated by Django 5.2.8 on 2026-10-18 16:09
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0043_backfill_vendor_daily_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CartPurge',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('deleted', models.PositiveIntegerField(default=0)),
+                ('batches', models.PositiveIntegerField(default=0)),
+                ('seconds', models.FloatField(default=0)),
+                ('finished_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name_plural': 'Cart Purges',
+                'indexes': [models.Index(fields=['-finished_at'], name='store_cartpurge_finished_idx')],
+            },
+        ),
+    ]
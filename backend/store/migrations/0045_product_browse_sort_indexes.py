@@ -0,0 +1,36 @@
+# Generated by Django 5.2.8 on 2026-10-18 16:17
+
+import django.db.models.functions.comparison
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0044_cart_purge'),
+        ('vendor', '0005_counter_fields_not_editable'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='product',
+            name='st_prod_stat_price_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='product',
+            name='st_prod_stat_rating_idx',
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(models.F('status'), django.db.models.functions.comparison.Coalesce('price', models.Value(Decimal('0.00')), output_field=models.DecimalField(decimal_places=2, max_digits=12)), models.F('id'), name='st_prod_stat_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(models.F('status'), django.db.models.functions.comparison.Coalesce('rating', models.Value(0)), models.F('id'), name='st_prod_stat_rating_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(models.F('status'), django.db.models.functions.comparison.Coalesce('views', models.Value(0)), models.F('id'), name='st_prod_stat_views_idx'),
+        ),
+    ]
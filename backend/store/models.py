@@ -1,5 +1,8 @@
+from django.conf import settings
 from django.db import models
-from django.db.models.functions import Lower
+from django.db.models import F, Value
+from django.db.models.functions import Coalesce, Lower
+from django.contrib.postgres.search import SearchVectorField
 from shortuuid.django_fields import ShortUUIDField
 from django.utils.html import mark_safe
 from django.utils import timezone
@@ -18,6 +21,7 @@ from vendor.models import Vendor
 
 import shortuuid
 import datetime
+from decimal import Decimal
 import os 
 
 
@@ -215,6 +219,38 @@ class Brand(models.Model):
     def __str__(self):
         return self.title
 
+# Queryset helpers for Product listings
+class ProductQuerySet(models.QuerySet):
+    # Joins the denormalized ProductStats row (rating, rating count, paid order
+    # count) and prefetches the nested relations used by ProductSerializer, so a
+    # page of products costs a fixed number of queries.
+    def with_stats(self):
+        return (
+            self.select_related("category", "vendor__user", "stats")
+            .prefetch_related(
+                "gallery_set",
+                "specification_set",
+                "size_set",
+                "color_set",
+                "vendor__user__groups",
+                "vendor__user__user_permissions",
+            )
+        )
+
+    # Same for the lean ProductListSerializer used by the paginated list views.
+    def for_listing(self):
+        return self.select_related("category", "vendor", "stats").prefetch_related("size_set", "color_set")
+
+
+# Browse sort keys (see store.browse), with NULL read as 0 so a cursor can encode
+# every position. The browse indexes below are built on these exact expressions.
+PRODUCT_SORT_KEYS = {
+    "sort_price": Coalesce("price", Value(Decimal("0.00")), output_field=models.DecimalField(max_digits=12, decimal_places=2)),
+    "sort_views": Coalesce("views", Value(0)),
+    "sort_rating": Coalesce("rating", Value(0)),
+}
+
+
 # Model for Products
 class Product(models.Model):
     # Product title
@@ -239,6 +275,8 @@ class Product(models.Model):
     # Stock quantity and availability status
     stock_qty = models.PositiveIntegerField(default=0)
     in_stock = models.BooleanField(default=True)
+    # Units held for unpaid orders (see store.inventory); stock_qty - reserved_qty can be sold
+    reserved_qty = models.PositiveIntegerField(default=0, editable=False)
     
     # Product status and type
     status = models.CharField(choices=STATUS, max_length=50, default="published", null=True, blank=True)
@@ -251,7 +289,7 @@ class Product(models.Model):
     digital = models.BooleanField(default=False)
     
     # Product statistics (views, orders, saved, rating)
-    views = models.PositiveIntegerField(default=0, null=True, blank=True)
+    views = models.PositiveIntegerField(default=0, null=True, blank=True, editable=False)
     orders = models.PositiveIntegerField(default=0, null=True, blank=True)
     saved = models.PositiveIntegerField(default=0, null=True, blank=True)
     rating = models.IntegerField(default=0, null=True, blank=True)
@@ -269,6 +307,8 @@ class Product(models.Model):
     # Date of product creation
     date = models.DateTimeField(default=timezone.now)
 
+    objects = ProductQuerySet.as_manager()
+
     class Meta:
         ordering = ['-id']
         verbose_name_plural = "Products"
@@ -282,6 +322,14 @@ class Product(models.Model):
             models.Index(fields=["status", "special_offer"], name="st_prod_stat_offer_idx"),
             models.Index(fields=["status", "type"], name="store_product_status_type_idx"),
             models.Index(fields=["date"], name="store_product_date_idx"),
+            # Faceted browsing (store.browse): published products by category,
+            # brand, price range or rating
+            models.Index(fields=["status", "category", "id"], name="st_prod_stat_cat_idx"),
+            models.Index(fields=["status", "brand"], name="st_prod_stat_brand_idx"),
+            # Sorted browsing walks these instead of sorting the filtered set
+            models.Index(F("status"), PRODUCT_SORT_KEYS["sort_price"], F("id"), name="st_prod_stat_price_idx"),
+            models.Index(F("status"), PRODUCT_SORT_KEYS["sort_rating"], F("id"), name="st_prod_stat_rating_idx"),
+            models.Index(F("status"), PRODUCT_SORT_KEYS["sort_views"], F("id"), name="st_prod_stat_views_idx"),
         ]
 
     # Returns an HTML image tag for the product's image
@@ -309,47 +357,77 @@ class Product(models.Model):
         new_price = ((old_price - price) / old_price) * 100
         return round(new_price, 0)
     
+    # Returns the denormalized ProductStats row, or None when it has not been built yet
+    def get_stats(self):
+        if not self.pk:
+            return None
+        try:
+            return self.stats
+        except ProductStats.DoesNotExist:
+            return None
+
     # Calculates the average rating of the product
     def product_rating(self):
         if not self.pk:
             return 0
+        stats = self.get_stats()
+        if stats is not None:
+            return stats.rating_average()
         product_rating = Review.objects.filter(product=self).aggregate(avg_rating=models.Avg('rating'))
         return product_rating['avg_rating'] or 0
     
     # Returns the count of ratings for the product
     def rating_count(self):
+        stats = self.get_stats()
+        if stats is not None:
+            return stats.rating_count
         rating_count = Review.objects.filter(product=self).count()
         return rating_count
     
     # Returns the count of orders for the product with "paid" payment status
     def order_count(self):
+        stats = self.get_stats()
+        if stats is not None:
+            return stats.order_count
         order_count = CartOrderItem.objects.filter(product=self, order__payment_status="paid").count()
         return order_count
 
     # Returns the gallery images linked to this product
+    # (related managers, so prefetched rows from with_stats() are reused)
     def gallery(self):
-        gallery = Gallery.objects.filter(product=self)
-        return gallery
+        return self.gallery_set.all()
     
     # def specification(self):
     #     return Specification.objects.filter(product=self)
 
     def specification(self):
-        return Specification.objects.filter(product=self)
+        return self.specification_set.all()
 
 
     def color(self):
-        return Color.objects.filter(product=self)
+        return self.color_set.all()
     
     def size(self):
-        return Size.objects.filter(product=self)
-
-    # Returns a list of products frequently bought together with this product
-    def frequently_bought_together(self):
-        frequently_bought_together_products = Product.objects.filter(order_item__order__in=CartOrder.objects.filter(orderitem__product=self)).exclude(id=self.id).annotate(count=models.Count('id')).order_by('-id')[:3]
-        return frequently_bought_together_products
+        return self.size_set.all()
+
+    # Returns the published products most often bought together with this product,
+    # read from the precomputed ProductCoPurchase rows (see store.copurchase)
+    def frequently_bought_together(self, limit=3):
+        return (
+            Product.objects.filter(status="published", bought_with__product_id=self.pk)
+            .order_by("-bought_with__count", "id")[:limit]
+        )
+    
+    # Returns the published products whose text is most like this product's,
+    # read from the precomputed ProductSimilar rows (see store.similar)
+    def similar_products(self, limit=4):
+        return (
+            Product.objects.filter(status="published", similar_to__product_id=self.pk)
+            .order_by("-similar_to__score", "id")[:limit]
+        )
     
-    # Custom save method to generate a slug if it's empty, update in_stock, and calculate the product rating
+    # Custom save method to generate a slug if it's empty and update in_stock.
+    # The rating is maintained incrementally by store.stats, not recomputed here.
     def save(self, *args, **kwargs):
         if self.slug == "" or self.slug is None:
             uuid_key = shortuuid.uuid()
@@ -365,12 +443,143 @@ class Product(models.Model):
         else:
             self.stock_qty = 0
             self.in_stock = False
-        
-        self.rating = self.product_rating()
-            
+
         super(Product, self).save(*args, **kwargs) 
 
 
+# Denormalized per-product counters, updated with atomic F() increments by store.stats
+class ProductStats(models.Model):
+    # Product the counters belong to (also the primary key)
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, primary_key=True, related_name="stats")
+    # Sum and count of review ratings, the average is derived from both
+    rating_sum = models.PositiveIntegerField(default=0)
+    rating_count = models.PositiveIntegerField(default=0)
+    # Number of order items in paid orders
+    order_count = models.PositiveIntegerField(default=0)
+    # Number of wishlist entries
+    wishlist_count = models.PositiveIntegerField(default=0)
+    # Number of product page views
+    view_count = models.PositiveBigIntegerField(default=0)
+    # Last time any counter changed
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name_plural = "Product Stats"
+
+    def __str__(self):
+        return f"ProductStats({self.product_id})"
+
+    # Average rating, computed from the stored sum and count
+    def rating_average(self):
+        if not self.rating_count:
+            return 0
+        return self.rating_sum / self.rating_count
+
+
+# Sales of one vendor on one day, added to as orders are paid (see store.stats)
+class VendorDailyStats(models.Model):
+    vendor = models.ForeignKey(Vendor, on_delete=models.CASCADE, related_name="daily_stats")
+    # Day the orders were placed
+    day = models.DateField()
+    # Paid orders with at least one item from the vendor
+    orders = models.PositiveIntegerField(default=0)
+    # Order items and units sold
+    items = models.PositiveIntegerField(default=0)
+    qty = models.PositiveIntegerField(default=0)
+    # Item sub totals plus shipping, as the dashboards have always reported revenue
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0.00)
+    shipping = models.DecimalField(max_digits=14, decimal_places=2, default=0.00)
+    # Amount buyers saved with coupons
+    saved = models.DecimalField(max_digits=14, decimal_places=2, default=0.00)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name_plural = "Vendor Daily Stats"
+        constraints = [
+            models.UniqueConstraint(fields=["vendor", "day"], name="store_vendor_day_uniq"),
+        ]
+
+    def __str__(self):
+        return f"VendorDailyStats({self.vendor_id}, {self.day})"
+
+
+# A product's top co-purchased products: rebuilt by `manage.py rebuild_copurchases`
+# and added to as orders are paid (see store.copurchase)
+class ProductCoPurchase(models.Model):
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="copurchases")
+    # Product bought in the same orders
+    other = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="bought_with")
+    # Paid orders containing both products
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name_plural = "Product Co-purchases"
+        constraints = [
+            models.UniqueConstraint(fields=["product", "other"], name="store_copurchase_uniq"),
+        ]
+        indexes = [
+            models.Index(fields=["product", "-count"], name="store_copurchase_rank_idx"),
+        ]
+
+    def __str__(self):
+        return f"ProductCoPurchase({self.product_id}, {self.other_id}, {self.count})"
+
+
+# A product's most similar products by text (TF-IDF cosine), built by
+# `manage.py rebuild_similar_products` (see store.similar)
+class ProductSimilar(models.Model):
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="similar")
+    other = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="similar_to")
+    # Cosine similarity of the two products' vectors, 0 to 1
+    score = models.FloatField()
+
+    class Meta:
+        verbose_name_plural = "Product Similarities"
+        constraints = [
+            models.UniqueConstraint(fields=["product", "other"], name="store_similar_uniq"),
+        ]
+        indexes = [
+            models.Index(fields=["product", "-score"], name="store_similar_rank_idx"),
+        ]
+
+    def __str__(self):
+        return f"ProductSimilar({self.product_id}, {self.other_id}, {self.score:.3f})"
+
+
+# Fingerprint of the text a product's similar products were last computed from
+class ProductSimilarState(models.Model):
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, primary_key=True, related_name="similar_state")
+    signature = models.CharField(max_length=40)
+
+    class Meta:
+        verbose_name_plural = "Product Similarity States"
+
+    def __str__(self):
+        return f"ProductSimilarState({self.product_id})"
+
+
+# Weighted full-text search document for a published product, maintained by store.search
+class ProductSearchDocument(models.Model):
+    # Product the document describes (also the primary key)
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, primary_key=True, related_name="search_document")
+    # Searchable text, weighted A (title) to D (description)
+    title = models.CharField(max_length=255, blank=True, default="")
+    tags = models.TextField(blank=True, default="")
+    brand = models.CharField(max_length=255, blank=True, default="")
+    category = models.CharField(max_length=100, blank=True, default="")
+    description = models.TextField(blank=True, default="")
+    # Precomputed tsvector (Postgres only, GIN indexed); unused on other databases
+    vector = SearchVectorField(null=True, blank=True)
+    # Last time the document was rebuilt
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name_plural = "Product Search Documents"
+
+    def __str__(self):
+        return self.title
+
+
 # Model for Product Gallery
 class Gallery(models.Model):
     # Product associated with the gallery
@@ -461,6 +670,8 @@ class Cart(models.Model):
     color = models.CharField(max_length=100, null=True, blank=True)
     cart_id = models.CharField(max_length=1000, null=True, blank=True)
     date = models.DateTimeField(auto_now_add=True)
+    # When an anonymous row may be purged (null for rows that belong to a user)
+    expires_at = models.DateTimeField(null=True, blank=True)
 
     class Meta:
         indexes = [
@@ -468,11 +679,39 @@ class Cart(models.Model):
             models.Index(fields=["cart_id", "user"], name="store_cart_cartid_user_idx"),
             models.Index(fields=["user"], name="store_cart_user_idx"),
             models.Index(fields=["product"], name="store_cart_product_idx"),
+            models.Index(fields=["expires_at"], name="store_cart_expires_idx"),
         ]
 
     def __str__(self):
         return f'{self.cart_id} - {self.product.title}'
 
+    # Anonymous rows live for CART_ANONYMOUS_TTL seconds after their last change
+    def save(self, *args, **kwargs):
+        if self.user_id is None:
+            ttl = getattr(settings, "CART_ANONYMOUS_TTL", 30 * 24 * 60 * 60)
+            self.expires_at = timezone.now() + datetime.timedelta(seconds=ttl)
+        else:
+            self.expires_at = None
+        super().save(*args, **kwargs)
+
+
+# Outcome of one `manage.py purge_carts` run, kept in the database so every
+# worker reports the same last purge (see store.carts.cart_metrics)
+class CartPurge(models.Model):
+    deleted = models.PositiveIntegerField(default=0)
+    batches = models.PositiveIntegerField(default=0)
+    seconds = models.FloatField(default=0)
+    finished_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name_plural = "Cart Purges"
+        indexes = [
+            models.Index(fields=["-finished_at"], name="store_cartpurge_finished_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.deleted} rows at {self.finished_at}"
+
 
 
 # Model for Cart Orders
@@ -652,14 +891,9 @@ class Review(models.Model):
         return self.rating
     
     def profile(self):
-        return Profile.objects.get(user=self.user)
+        # Goes through the reverse one-to-one so select_related("user__profile") is reused.
+        return self.user.profile
     
-# Signal handler to update the product rating when a review is saved
-@receiver(post_save, sender=Review)
-def update_product_rating(sender, instance, **kwargs):
-    if instance.product:
-        instance.product.save()
-
 # Define a model for Wishlist
 class Wishlist(models.Model):
     # A foreign key relationship to the User model with CASCADE deletion
@@ -709,6 +943,79 @@ class Notification(models.Model):
         else:
             return "Notification"
 
+
+OUTBOX_KIND = (
+    ("customer_order_confirmation", "Customer Order Confirmation"),
+    ("vendor_order_sale", "Vendor Order Sale"),
+)
+
+OUTBOX_STATUS = (
+    ("pending", "Pending"),
+    ("sent", "Sent"),
+    ("failed", "Failed"),
+)
+
+
+# Transactional outbox of emails, written with the order and sent by store.outbox
+class EmailOutbox(models.Model):
+    # Which email to render
+    kind = models.CharField(max_length=50, choices=OUTBOX_KIND)
+    # Order the email is about
+    order = models.ForeignKey(CartOrder, on_delete=models.CASCADE, related_name="outbox_emails")
+    # Recipient vendor (vendor emails only)
+    vendor = models.ForeignKey(Vendor, on_delete=models.SET_NULL, null=True, blank=True)
+    # Recipient address
+    to_email = models.CharField(max_length=255)
+    # One row per email, so retried webhooks cannot queue it twice
+    dedupe_key = models.CharField(max_length=255, unique=True)
+    status = models.CharField(max_length=20, choices=OUTBOX_STATUS, default="pending")
+    # Delivery attempts so far and when the next one is due
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True, default="")
+    date = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name_plural = "Email Outbox"
+        indexes = [
+            models.Index(fields=["status", "next_attempt_at"], name="store_outbox_due_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} -> {self.to_email}"
+
+RESERVATION_STATUS = (
+    ("held", "Held"),
+    ("committed", "Committed"),
+    ("released", "Released"),
+)
+
+
+# Stock held for an unpaid order until it is paid or the hold expires (see store.inventory)
+class StockReservation(models.Model):
+    order = models.ForeignKey(CartOrder, on_delete=models.CASCADE, related_name="reservations")
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="reservations")
+    # Units of the product across all of the order's lines
+    qty = models.PositiveIntegerField()
+    status = models.CharField(max_length=20, choices=RESERVATION_STATUS, default="held")
+    # A held reservation past this time is released by `manage.py release_reservations`
+    expires_at = models.DateTimeField()
+    date = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name_plural = "Stock Reservations"
+        constraints = [
+            models.UniqueConstraint(fields=["order", "product"], name="store_reservation_order_product_uniq"),
+        ]
+        indexes = [
+            models.Index(fields=["status", "expires_at"], name="store_reservation_due_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.order_id}: {self.qty} x {self.product_id} ({self.status})"
+
+
 # Define a model for Address
 class Address(models.Model):
     # A foreign key relationship to the User model with CASCADE deletion
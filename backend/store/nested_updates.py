@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+import re
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Any
+
+from django.db import models
+from django.db.models.fields.files import FieldFile
+from rest_framework.exceptions import ValidationError
+
+from api.cache import bump_version
+from store.models import Color, Gallery, Product, Size, Specification
+from store.serializers import ColorSerializer, GallerySerializer, SizeSerializer, SpecificationSerializer
+
+
+# What the edit form sends for a value it has not got (``String(null)``).
+MISSING_VALUES = ("null", "undefined")
+
+
+@dataclass(frozen=True)
+class NestedRelation:
+    prefix: str
+    model: type[models.Model]
+    serializer_class: type
+    fields: tuple[str, ...]
+    # Field matched on for rows sent without an id
+    key: str
+    image_field: str | None = None
+
+
+RELATIONS = (
+    NestedRelation("specifications", Specification, SpecificationSerializer, ("title", "content"), "title"),
+    NestedRelation("colors", Color, ColorSerializer, ("name", "color_code", "image"), "name", "image"),
+    NestedRelation("sizes", Size, SizeSerializer, ("name", "price"), "name"),
+    NestedRelation("gallery", Gallery, GallerySerializer, ("image",), "image", "image"),
+)
+
+
+@dataclass
+class SyncResult:
+    created: int = 0
+    updated: int = 0
+    deleted: int = 0
+
+    def as_dict(self) -> dict:
+        return {"created": self.created, "updated": self.updated, "deleted": self.deleted}
+
+
+def has_nested_payload(data) -> bool:
+    return any(key.startswith(relation.prefix) for key in data.keys() for relation in RELATIONS)
+
+
+def parse_indexed(data, prefix: str) -> list[tuple[int | None, dict]]:
+    """``(id, fields)`` of every ``prefix[<i>][<field>]`` group in ``data``, in index order."""
+    pattern = re.compile(rf"^{re.escape(prefix)}\[(\d+)\]\[(\w+)\]$")
+    groups: dict[int, dict] = defaultdict(dict)
+    for key in data.keys():
+        match = pattern.match(key)
+        if match:
+            groups[int(match.group(1))][match.group(2)] = data.get(key)
+
+    rows = []
+    for index in sorted(groups):
+        group = groups[index]
+        row_id = str(group.pop("id", "") or "")
+        rows.append((int(row_id) if row_id.isdigit() else None, group))
+    return rows
+
+
+def _current(obj: models.Model, field: str) -> Any:
+    value = getattr(obj, field)
+    if isinstance(value, FieldFile):
+        return value.name or None
+    return value
+
+
+def _validate(relation: NestedRelation, rows: list[tuple[int | None, dict]]) -> list[tuple[int | None, dict]]:
+    payload = []
+    for _, raw in rows:
+        values = {
+            field: None if raw[field] in MISSING_VALUES else raw[field]
+            for field in relation.fields if field in raw
+        }
+        image = relation.image_field
+        if image in values and not values[image]:
+            values[image] = None
+        payload.append(values)
+
+    # Only the relation's own fields are validated, so no per-row product lookups.
+    serializer = relation.serializer_class(data=payload, many=True)
+    if not serializer.is_valid():
+        raise ValidationError({relation.prefix: serializer.errors})
+    validated = [(row_id, dict(values)) for (row_id, _), values in zip(rows, serializer.validated_data)]
+    if relation.image_field == relation.key:
+        # A gallery row without an image carries nothing to keep.
+        validated = [(row_id, values) for row_id, values in validated if values.get(relation.key)]
+    return validated
+
+
+def _same_content(obj: models.Model, values: dict) -> bool:
+    return all(_current(obj, field) == value for field, value in values.items())
+
+
+def _same_key(relation: NestedRelation):
+    return lambda obj, values: _current(obj, relation.key) == values.get(relation.key)
+
+
+def _match(existing: dict[int, models.Model], incoming, relation: NestedRelation):
+    """Pair incoming rows with existing ones: by id, then identical content, then ``relation.key``.
+
+    Products have a handful of nested rows, so plain scans are cheaper than
+    building indexes.
+    """
+    unmatched = dict(existing)
+    pairs: list[tuple[models.Model | None, dict]] = []
+    pending = []
+    for row_id, values in incoming:
+        obj = unmatched.pop(row_id, None) if row_id is not None else None
+        if obj is None:
+            pending.append(values)
+        else:
+            pairs.append((obj, values))
+
+    for same in (_same_content, _same_key(relation)):
+        still_pending = []
+        for values in pending:
+            obj = next((obj for obj in unmatched.values() if same(obj, values)), None)
+            if obj is None:
+                still_pending.append(values)
+            else:
+                pairs.append((unmatched.pop(obj.pk), values))
+        pending = still_pending
+
+    pairs.extend((None, values) for values in pending)
+    return pairs, list(unmatched.values())
+
+
+def sync_relation(product: Product, relation: NestedRelation, rows: list[tuple[int | None, dict]]) -> SyncResult:
+    """Make ``product``'s rows of ``relation`` match ``rows`` with as few writes as possible.
+
+    Matched rows are updated only when a value differs (one bulk_update),
+    new rows are bulk-created and rows no longer sent are deleted in one
+    query. An image that stays on the product is never deleted from storage.
+    """
+    model = relation.model
+    incoming = _validate(relation, rows)
+    existing = {obj.pk: obj for obj in model.objects.filter(product=product)}
+    pairs, removed = _match(existing, incoming, relation)
+
+    result = SyncResult()
+    to_create, to_update, changed = [], [], set()
+    for obj, values in pairs:
+        if obj is None:
+            to_create.append(model(product=product, **values))
+            continue
+        diff = [field for field, value in values.items() if _current(obj, field) != value]
+        if diff:
+            for field in diff:
+                setattr(obj, field, values[field])
+            changed.update(diff)
+            to_update.append(obj)
+
+    if removed:
+        image = relation.image_field
+        if image:
+            # Detach files other rows still show, so the delete signal leaves them in storage.
+            kept = {values.get(image) for _, values in pairs} - {None}
+            shared = [obj.pk for obj in removed if _current(obj, image) in kept]
+            if shared:
+                model.objects.filter(pk__in=shared).update(**{image: ""})
+        result.deleted, _ = model.objects.filter(pk__in=[obj.pk for obj in removed]).delete()
+    if to_create:
+        model.objects.bulk_create(to_create)
+        result.created = len(to_create)
+    if to_update:
+        model.objects.bulk_update(to_update, sorted(changed))
+        result.updated = len(to_update)
+    if to_create or to_update:
+        # Bulk writes skip the signals that retire cached catalog responses.
+        bump_version(model)
+    return result
+
+
+def sync_nested(product: Product, data) -> dict[str, dict]:
+    """Apply the nested rows in form ``data`` to ``product``; an absent relation means none are kept."""
+    return {
+        relation.prefix: sync_relation(product, relation, parse_indexed(data, relation.prefix)).as_dict()
+        for relation in RELATIONS
+    }
@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from store.models import CartOrderItem, EmailOutbox, Notification
+
+
+logger = logging.getLogger(__name__)
+
+# Subject and template of each outbox kind.
+TEMPLATES = {
+    "customer_order_confirmation": ("Order Placed Successfully", "email/customer_order_confirmation"),
+    "vendor_order_sale": ("New Sale!", "email/vendor_order_sale"),
+}
+
+MAX_ATTEMPTS = getattr(settings, "OUTBOX_MAX_ATTEMPTS", 8)
+BACKOFF_BASE = getattr(settings, "OUTBOX_BACKOFF_BASE", 30)
+BACKOFF_MAX = getattr(settings, "OUTBOX_BACKOFF_MAX", 6 * 60 * 60)
+# A claimed row is retried after this long if its worker died mid-send.
+CLAIM_TIMEOUT = getattr(settings, "OUTBOX_CLAIM_TIMEOUT", 5 * 60)
+
+
+def backoff(attempts: int) -> timedelta:
+    """Delay before the next attempt: BACKOFF_BASE doubled per failure, capped at BACKOFF_MAX."""
+    return timedelta(seconds=min(BACKOFF_BASE * 2 ** max(attempts - 1, 0), BACKOFF_MAX))
+
+
+def create_order_notifications(order, order_items) -> None:
+    """Insert the buyer's notification and one per order item for its vendor in a single query."""
+    notifications = [
+        Notification(vendor_id=item.vendor_id, order=order, order_item=item)
+        for item in order_items
+    ]
+    if order.buyer_id is not None:
+        notifications.insert(0, Notification(user_id=order.buyer_id, order=order))
+    Notification.objects.bulk_create(notifications)
+
+
+def enqueue_order_emails(order, order_items) -> None:
+    """Queue the customer confirmation and one sale email per vendor of ``order``.
+
+    Runs inside the caller's transaction, so the emails exist exactly when the
+    payment does; nothing is rendered or sent here.
+    """
+    rows = []
+    if order.email:
+        rows.append(EmailOutbox(
+            kind="customer_order_confirmation",
+            order=order,
+            to_email=order.email,
+            dedupe_key=f"order:{order.oid}:customer",
+        ))
+
+    vendors = {}
+    for item in order_items:
+        if item.vendor_id is not None and item.vendor.email:
+            vendors.setdefault(item.vendor_id, item.vendor)
+    for vendor in vendors.values():
+        rows.append(EmailOutbox(
+            kind="vendor_order_sale",
+            order=order,
+            vendor=vendor,
+            to_email=vendor.email,
+            dedupe_key=f"order:{order.oid}:vendor:{vendor.pk}",
+        ))
+
+    if rows:
+        EmailOutbox.objects.bulk_create(rows, ignore_conflicts=True)
+        if getattr(settings, "OUTBOX_DRAIN_ON_COMMIT", True):
+            transaction.on_commit(schedule_drain)
+
+
+def build_message(entry: EmailOutbox) -> EmailMultiAlternatives:
+    subject, template = TEMPLATES[entry.kind]
+    order_items = CartOrderItem.objects.filter(order_id=entry.order_id).select_related("product", "vendor")
+    if entry.vendor_id is not None:
+        order_items = order_items.filter(vendor_id=entry.vendor_id)
+    merge_data = {
+        "order": entry.order,
+        "order_items": order_items,
+    }
+    msg = EmailMultiAlternatives(
+        subject=subject, from_email=settings.FROM_EMAIL,
+        to=[entry.to_email], body=render_to_string(f"{template}.txt", merge_data),
+    )
+    msg.attach_alternative(render_to_string(f"{template}.html", merge_data), "text/html")
+    return msg
+
+
+def claim(batch_size: int) -> list[EmailOutbox]:
+    """Lease up to ``batch_size`` due rows; concurrent workers skip rows another one holds."""
+    now = timezone.now()
+    with transaction.atomic():
+        entries = list(
+            EmailOutbox.objects.select_for_update(skip_locked=True)
+            .filter(status="pending", next_attempt_at__lte=now)
+            .order_by("next_attempt_at", "id")[:batch_size]
+        )
+        if entries:
+            EmailOutbox.objects.filter(pk__in=[e.pk for e in entries]).update(
+                attempts=F("attempts") + 1,
+                next_attempt_at=now + timedelta(seconds=CLAIM_TIMEOUT),
+            )
+    for entry in entries:
+        entry.attempts += 1
+    return entries
+
+
+def deliver(entry: EmailOutbox) -> bool:
+    try:
+        build_message(entry).send()
+    except Exception as exc:
+        failed = entry.attempts >= MAX_ATTEMPTS
+        logger.warning("Outbox email %s failed (attempt %s): %s", entry.pk, entry.attempts, exc)
+        EmailOutbox.objects.filter(pk=entry.pk).update(
+            status="failed" if failed else "pending",
+            next_attempt_at=timezone.now() + backoff(entry.attempts),
+            last_error=str(exc)[:2000],
+        )
+        return False
+
+    EmailOutbox.objects.filter(pk=entry.pk).update(status="sent", sent_at=timezone.now(), last_error="")
+    return True
+
+
+def drain(batch_size: int = 50, max_batches: int | None = None) -> tuple[int, int]:
+    """Send due emails until none are left; returns ``(sent, failed)`` attempt counts."""
+    sent = failed = batches = 0
+    while max_batches is None or batches < max_batches:
+        entries = claim(batch_size)
+        if not entries:
+            break
+        batches += 1
+        for entry in entries:
+            if deliver(entry):
+                sent += 1
+            else:
+                failed += 1
+    return sent, failed
+
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="outbox")
+_pending = threading.Event()
+
+
+def _drain_in_background() -> None:
+    _pending.clear()
+    try:
+        drain()
+    except Exception:
+        logger.exception("Outbox drain failed")
+    finally:
+        close_old_connections()
+
+
+def schedule_drain() -> None:
+    """Drain the outbox on a background thread, coalescing kicks that arrive while one is queued."""
+    if _pending.is_set():
+        return
+    _pending.set()
+    _executor.submit(_drain_in_background)
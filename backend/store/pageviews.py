@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+import atexit
+import logging
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+
+from store.models import Product, ProductStats
+from vendor.models import Vendor
+
+
+logger = logging.getLogger(__name__)
+
+# Buffered views are written this many seconds after the first one arrives, or
+# sooner once MAX_PENDING distinct pages are waiting; 0 writes on every view.
+FLUSH_INTERVAL = getattr(settings, "VIEW_COUNTER_FLUSH_INTERVAL", 10)
+MAX_PENDING = getattr(settings, "VIEW_COUNTER_MAX_PENDING", 5000)
+# Rows per UPDATE statement.
+BATCH_SIZE = 1000
+
+_lock = threading.Lock()
+_products: Counter[str] = Counter()
+_vendors: Counter[str] = Counter()
+# Whether a timer will flush the views buffered so far.
+_timer_armed = False
+
+
+def _arm_timer() -> None:
+    """Flush in FLUSH_INTERVAL seconds unless a timer already will; call with ``_lock`` held.
+
+    The timer fires whether or not more views arrive, so an idle worker does
+    not keep its counts until it exits.
+    """
+    global _timer_armed
+    if _timer_armed:
+        return
+    _timer_armed = True
+    timer = threading.Timer(FLUSH_INTERVAL, schedule_flush)
+    timer.daemon = True
+    timer.start()
+
+
+def _add(counter: Counter[str], slug: str | None) -> None:
+    if not slug:
+        return
+    with _lock:
+        counter[slug] += 1
+        full = FLUSH_INTERVAL <= 0 or len(_products) + len(_vendors) >= MAX_PENDING
+        if not full:
+            _arm_timer()
+    if full:
+        schedule_flush()
+
+
+def product_viewed(slug: str | None) -> None:
+    """Count a view of the product page ``slug``; no query is run on the request path."""
+    _add(_products, slug)
+
+
+def vendor_viewed(slug: str | None) -> None:
+    """Count a visit to the vendor storefront ``slug``."""
+    _add(_vendors, slug)
+
+
+def _add_counts(table: str, column: str, join: str, rows: list[tuple[str, int]], extra_from: str = "") -> None:
+    """``UPDATE table SET column = column + n FROM (VALUES (slug, n), ...)`` in BATCH_SIZE chunks.
+
+    ``join`` matches the target row to ``v.column1`` (the slug); ``v.column2``
+    is the number of views. VALUES columns are named the same on PostgreSQL and SQLite.
+    """
+    quote = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), BATCH_SIZE):
+            batch = rows[start:start + BATCH_SIZE]
+            values = ", ".join(["(%s, %s)"] * len(batch))
+            cursor.execute(
+                f"UPDATE {quote(table)} SET {quote(column)} = COALESCE({quote(column)}, 0) + v.column2 "
+                f"FROM (VALUES {values}) AS v{extra_from} WHERE {join}",
+                [param for row in batch for param in row],
+            )
+
+
+def write(products: dict[str, int], vendors: dict[str, int]) -> None:
+    """Add view counts keyed by slug to Product.views, ProductStats.view_count and Vendor.views."""
+    quote = connection.ops.quote_name
+    product_table = Product._meta.db_table
+    product_rows = sorted(products.items())
+    vendor_rows = sorted(vendors.items())
+    with transaction.atomic():
+        if product_rows:
+            _add_counts(product_table, "views", f"{quote(product_table)}.{quote('slug')} = v.column1", product_rows)
+            stats_table = ProductStats._meta.db_table
+            _add_counts(
+                stats_table,
+                "view_count",
+                f"p.{quote('slug')} = v.column1 AND {quote(stats_table)}.{quote('product_id')} = p.{quote('id')}",
+                product_rows,
+                extra_from=f", {quote(product_table)} AS p",
+            )
+        if vendor_rows:
+            vendor_table = Vendor._meta.db_table
+            _add_counts(vendor_table, "views", f"{quote(vendor_table)}.{quote('slug')} = v.column1", vendor_rows)
+
+
+def flush() -> int:
+    """Write every buffered view; returns how many.
+
+    Counts are put back if the write fails and retried FLUSH_INTERVAL seconds later.
+    """
+    global _timer_armed
+    with _lock:
+        products, vendors = dict(_products), dict(_vendors)
+        _products.clear()
+        _vendors.clear()
+        _timer_armed = False
+    if not products and not vendors:
+        return 0
+    try:
+        write(products, vendors)
+    except Exception:
+        with _lock:
+            _products.update(products)
+            _vendors.update(vendors)
+            if FLUSH_INTERVAL > 0:
+                _arm_timer()
+        raise
+    return sum(products.values()) + sum(vendors.values())
+
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="pageviews")
+_pending = threading.Event()
+
+
+def _flush_in_background() -> None:
+    _pending.clear()
+    try:
+        flush()
+    except Exception:
+        logger.exception("Page view flush failed")
+    finally:
+        close_old_connections()
+
+
+def schedule_flush() -> None:
+    """Flush on a background thread, coalescing requests that arrive while one is queued."""
+    if _pending.is_set():
+        return
+    _pending.set()
+    _executor.submit(_flush_in_background)
+
+
+@atexit.register
+def _flush_at_exit() -> None:
+    try:
+        flush()
+    except Exception:
+        logger.exception("Page view flush at exit failed")
@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Iterable, Sequence
+
+from addon.models import ConfigSettings, Tax
+from api.cache import bump_version, get_versions
+from store.models import Product, Size
+
+
+# Models the pricing config is loaded from; every process reloads it when one
+# of their versions (api.CacheVersion) moves.
+CONFIG_MODELS = (Tax, ConfigSettings)
+CENT = Decimal("0.01")
+ZERO = Decimal("0.00")
+
+
+def money(value) -> Decimal:
+    return Decimal(value or 0).quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+@dataclass(frozen=True)
+class PricingConfig:
+    tax_rates: dict[str, Decimal]
+    service_fee_charge_type: str = "percentage"
+    service_fee_percentage: Decimal = ZERO
+    service_fee_flat_rate: Decimal = ZERO
+
+    def tax_rate(self, country: str | None) -> Decimal:
+        """Tax rate of ``country`` as a fraction (5% -> 0.05)."""
+        return self.tax_rates.get(country or "", ZERO)
+
+    def service_fee(self, sub_total: Decimal) -> Decimal:
+        if self.service_fee_charge_type == "percentage":
+            return money(sub_total * self.service_fee_percentage)
+        return money(self.service_fee_flat_rate)
+
+
+@dataclass(frozen=True)
+class CartLine:
+    product: Product
+    qty: int
+    size: str | None = None
+    country: str | None = None
+
+
+@dataclass(frozen=True)
+class LinePrice:
+    price: Decimal
+    sub_total: Decimal
+    shipping_amount: Decimal
+    tax_fee: Decimal
+    service_fee: Decimal
+    total: Decimal
+
+    def as_dict(self) -> dict:
+        return {field: getattr(self, field) for field in self.__dataclass_fields__}
+
+
+def load_config() -> PricingConfig:
+    tax_rates: dict[str, Decimal] = {}
+    # The first row per country wins, as Tax.objects.filter(country=...).first()
+    # did; like it, inactive rows are not skipped.
+    for country, rate in Tax.objects.order_by("-id").values_list("country", "rate"):
+        tax_rates[country] = Decimal(rate) / Decimal("100")
+
+    settings = ConfigSettings.objects.first()
+    if settings is None:
+        return PricingConfig(tax_rates=tax_rates)
+    return PricingConfig(
+        tax_rates=tax_rates,
+        service_fee_charge_type=settings.service_fee_charge_type,
+        service_fee_percentage=Decimal(settings.service_fee_percentage) / Decimal("100"),
+        service_fee_flat_rate=Decimal(settings.service_fee_flat_rate),
+    )
+
+
+_config: PricingConfig | None = None
+_versions: list[int] | None = None
+_lock = threading.Lock()
+
+
+def get_config() -> PricingConfig:
+    """Return this process's pricing config, reloading it after any Tax/ConfigSettings change.
+
+    Another worker's change is seen within CACHE_VERSION_CHECK_INTERVAL seconds.
+    """
+    global _config, _versions
+    versions = get_versions(CONFIG_MODELS)
+    if _config is None or _versions != versions:
+        with _lock:
+            if _config is None or _versions != versions:
+                _config = load_config()
+                _versions = versions
+    return _config
+
+
+def invalidate() -> None:
+    """Make every process reload the config once the current transaction commits."""
+    bump_version(*CONFIG_MODELS)
+
+
+def size_prices(lines: Iterable[CartLine]) -> dict[tuple[int, str], Decimal]:
+    """``(product_id, size name) -> Size.price`` for every sized line, in one query."""
+    wanted = {(line.product.pk, line.size) for line in lines if line.size}
+    if not wanted:
+        return {}
+    rows = Size.objects.filter(
+        product_id__in={pk for pk, _ in wanted},
+        name__in={name for _, name in wanted},
+    ).values_list("product_id", "name", "price")
+    return {(pk, name): price for pk, name, price in rows if (pk, name) in wanted}
+
+
+def unit_price(line: CartLine, sizes: dict[tuple[int, str], Decimal]) -> Decimal:
+    # A size with its own price overrides the product price.
+    size_price = sizes.get((line.product.pk, line.size))
+    return money(size_price if size_price else line.product.price)
+
+
+def price_lines(lines: Sequence[CartLine], config: PricingConfig | None = None) -> list[LinePrice]:
+    """Price every line from the catalog: one Size query for the batch, no other lookups.
+
+    sub_total = unit price * qty, shipping = product shipping * qty,
+    tax = country rate * (sub_total + shipping), and the service fee follows
+    ConfigSettings (a percentage of sub_total or a flat rate per line).
+    """
+    config = config or get_config()
+    sizes = size_prices(lines)
+    prices = []
+    for line in lines:
+        price = unit_price(line, sizes)
+        sub_total = money(price * line.qty)
+        shipping_amount = money(Decimal(line.product.shipping_amount or 0) * line.qty)
+        tax_fee = money((sub_total + shipping_amount) * config.tax_rate(line.country))
+        service_fee = config.service_fee(sub_total)
+        prices.append(LinePrice(
+            price=price,
+            sub_total=sub_total,
+            shipping_amount=shipping_amount,
+            tax_fee=tax_fee,
+            service_fee=service_fee,
+            total=sub_total + shipping_amount + tax_fee + service_fee,
+        ))
+    return prices
+
+
+def price_line(line: CartLine, config: PricingConfig | None = None) -> LinePrice:
+    return price_lines([line], config)[0]
+
+
+def sum_lines(prices: Iterable[LinePrice]) -> dict[str, Decimal]:
+    """Exact Decimal totals of priced lines (``price`` is per unit and not summed)."""
+    totals = {field: ZERO for field in ("sub_total", "shipping_amount", "tax_fee", "service_fee", "total")}
+    for line in prices:
+        for field in totals:
+            totals[field] += getattr(line, field)
+    return totals
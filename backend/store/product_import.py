@@ -0,0 +1,237 @@
+from __future__ import annotations
+
+import csv
+import io
+import json
+import logging
+from dataclasses import dataclass, field
+from typing import IO, Iterator
+
+import shortuuid
+
+from django.db import IntegrityError, transaction
+from django.utils.text import slugify
+from rest_framework.exceptions import ValidationError
+
+from api.cache import bump_version
+from store import search, stats, suggest
+from store.models import Category, Color, Gallery, Product, Size, Specification
+from store.serializers import ProductImportSerializer
+
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ("csv", "jsonl")
+# Columns holding lists; CSV cells carry them as JSON arrays.
+NESTED_FIELDS = ("specifications", "sizes", "colors", "gallery")
+CHILD_MODELS = {
+    "specifications": Specification,
+    "sizes": Size,
+    "colors": Color,
+    "gallery": Gallery,
+}
+CHUNK_SIZE = 500
+MAX_REPORTED_ERRORS = 1000
+SLUG_BASE_LENGTH = 44
+MAX_ID_ROUNDS = 20
+
+
+@dataclass
+class ImportReport:
+    rows: int = 0
+    created: int = 0
+    failed: int = 0
+    errors: list[dict] = field(default_factory=list)
+
+    def add_error(self, line: int, errors) -> None:
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line, "errors": errors})
+
+    def as_dict(self) -> dict:
+        return {
+            "rows": self.rows,
+            "created": self.created,
+            "failed": self.failed,
+            "errors": self.errors,
+            "errors_truncated": self.failed > len(self.errors),
+        }
+
+
+def detect_format(name: str | None, content_type: str | None = None) -> str | None:
+    name = (name or "").lower()
+    if name.endswith(".csv") or content_type == "text/csv":
+        return "csv"
+    if name.endswith((".jsonl", ".ndjson")) or content_type in ("application/x-ndjson", "application/jsonl"):
+        return "jsonl"
+    return None
+
+
+def read_rows(stream: IO[bytes], fmt: str) -> Iterator[tuple[int, dict | None, str | None]]:
+    """Yield ``(line, row, parse_error)`` one record at a time; the file is never read whole."""
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    if fmt == "csv":
+        reader = csv.DictReader(text)
+        for row in reader:
+            # Blank cells fall back to the field defaults.
+            row = {key: value for key, value in row.items() if key and value not in (None, "")}
+            error = None
+            for name in NESTED_FIELDS:
+                if name in row:
+                    try:
+                        row[name] = json.loads(row[name])
+                    except ValueError:
+                        error = f"{name}: not a JSON array."
+            yield reader.line_num, (None if error else row), error
+        return
+
+    for line, raw in enumerate(text, start=1):
+        if not raw.strip():
+            continue
+        try:
+            row = json.loads(raw)
+        except ValueError:
+            yield line, None, "Not valid JSON."
+            continue
+        if not isinstance(row, dict):
+            yield line, None, "Each line must be a JSON object."
+            continue
+        yield line, row, None
+
+
+def category_lookup() -> dict[str, Category]:
+    """Categories by id, slug and lower-cased title, loaded once per import."""
+    lookup: dict[str, Category] = {}
+    for category in Category.objects.only("id", "title", "slug"):
+        lookup.setdefault((category.title or "").strip().lower(), category)
+        if category.slug:
+            lookup[category.slug.lower()] = category
+        lookup[str(category.pk)] = category
+    return lookup
+
+
+class IdentifierPool:
+    """Hands out ``sku``/``pid``/``slug`` values no product has or will get in this import.
+
+    Values already given out are kept in memory, so each batch costs one
+    lookup query per column rather than one per row.
+    """
+
+    def __init__(self):
+        self.taken: dict[str, set[str]] = {"sku": set(), "pid": set(), "slug": set()}
+        self.generators = {
+            "sku": Product._meta.get_field("sku")._generate_uuid,
+            "pid": Product._meta.get_field("pid")._generate_uuid,
+        }
+
+    def _slug(self, product: Product) -> str:
+        base = slugify(product.title)[:SLUG_BASE_LENGTH].strip("-") or "product"
+        return f"{base}-{shortuuid.uuid()[:4].lower()}"
+
+    def _candidate(self, name: str, product: Product) -> str:
+        taken = self.taken[name]
+        make = self._slug if name == "slug" else lambda p: self.generators[name]()
+        while True:
+            value = make(product)
+            if value not in taken:
+                taken.add(value)
+                return value
+
+    def assign(self, products: list[Product]) -> None:
+        for name in ("sku", "pid", "slug"):
+            pending = products
+            for _ in range(MAX_ID_ROUNDS):
+                for product in pending:
+                    setattr(product, name, self._candidate(name, product))
+                values = [getattr(product, name) for product in pending]
+                clashes = set(Product.objects.filter(**{f"{name}__in": values}).values_list(name, flat=True))
+                if not clashes:
+                    break
+                pending = [product for product in pending if getattr(product, name) in clashes]
+            else:
+                raise IntegrityError(f"Could not generate unique {name} values.")
+
+
+def build_product(vendor_id: int, data: dict) -> tuple[Product, dict[str, list]]:
+    children = {name: data.pop(name) for name in NESTED_FIELDS}
+    stock_qty = data.get("stock_qty") or 0
+    product = Product(vendor_id=vendor_id, in_stock=stock_qty > 0, **data)
+    return product, children
+
+
+def save_chunk(vendor_id: int, chunk: list[tuple[int, dict]], ids: IdentifierPool) -> list[Product]:
+    """Insert one chunk of validated rows and their children in a single transaction."""
+    built = [build_product(vendor_id, dict(data)) for _, data in chunk]
+    products = [product for product, _ in built]
+    with transaction.atomic():
+        ids.assign(products)
+        Product.objects.bulk_create(products)
+        for name, model in CHILD_MODELS.items():
+            rows = [
+                model(product=product, **child)
+                for product, children in built
+                for child in children[name]
+            ]
+            if rows:
+                model.objects.bulk_create(rows)
+    return products
+
+
+def after_import(products: list[Product]) -> None:
+    """What Product's post_save signals would have done for each row, batched."""
+    if not products:
+        return
+    stats.ensure_stats_rows(product.pk for product in products)
+    search.index_products(products)
+    suggest.products_changed(products)
+    bump_version(Product, *CHILD_MODELS.values())
+
+
+def _flush(vendor_id: int, chunk: list[tuple[int, dict]], ids: IdentifierPool, report: ImportReport) -> None:
+    if not chunk:
+        return
+    try:
+        products = save_chunk(vendor_id, chunk, ids)
+    except IntegrityError:
+        # A concurrent writer took one of the generated values; draw new ones once.
+        try:
+            products = save_chunk(vendor_id, chunk, ids)
+        except IntegrityError as exc:
+            logger.warning("Product import chunk failed: %s", exc)
+            for line, _ in chunk:
+                report.add_error(line, {"non_field_errors": ["Could not be saved, please retry."]})
+            return
+    after_import(products)
+    report.created += len(products)
+
+
+def import_products(vendor_id: int, stream: IO[bytes], fmt: str, chunk_size: int = CHUNK_SIZE) -> ImportReport:
+    """Validate rows as they are read and insert the valid ones ``chunk_size`` at a time.
+
+    Rows are checked without queries (categories are looked up in memory), and
+    each chunk is committed on its own: invalid rows and failed chunks end up
+    in the report while the rest of the file is still imported.
+    """
+    report = ImportReport()
+    # One validator for every row: building a serializer's fields per row costs more than validating it.
+    validator = ProductImportSerializer(context={"categories": category_lookup()})
+    ids = IdentifierPool()
+    chunk: list[tuple[int, dict]] = []
+
+    for line, row, error in read_rows(stream, fmt):
+        report.rows += 1
+        if error:
+            report.add_error(line, {"non_field_errors": [error]})
+            continue
+        try:
+            data = validator.run_validation(row)
+        except ValidationError as exc:
+            report.add_error(line, exc.detail)
+            continue
+        chunk.append((line, data))
+        if len(chunk) >= chunk_size:
+            _flush(vendor_id, chunk, ids, report)
+            chunk = []
+
+    _flush(vendor_id, chunk, ids, report)
+    return report
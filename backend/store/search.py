@@ -0,0 +1,240 @@
+from __future__ import annotations
+
+import base64
+import binascii
+import bisect
+import json
+import re
+import threading
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Iterable
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connection
+from django.db.models import F, FloatField, Q
+from django.db.models.functions import Cast
+from django.utils import timezone
+from django.utils.html import strip_tags
+
+from store.models import Product, ProductSearchDocument
+
+
+# Postgres text search configuration and per-field weights (A is strongest).
+SEARCH_CONFIG = "english"
+FIELD_WEIGHTS = {
+    "title": "A",
+    "tags": "B",
+    "brand": "B",
+    "category": "C",
+    "description": "D",
+}
+# Same defaults as Postgres ts_rank, used by the in-process fallback.
+WEIGHT_SCORES = {"A": 1.0, "B": 0.4, "C": 0.2, "D": 0.1}
+
+MAX_QUERY_TERMS = 8
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class SearchPage:
+    product_ids: list[int]
+    next_cursor: str | None
+
+
+def tokenize(text: str | None) -> list[str]:
+    return [token.lower() for token in TOKEN_RE.findall(text or "")]
+
+
+def use_postgres() -> bool:
+    return connection.vendor == "postgresql"
+
+
+def build_document(product: Product) -> dict[str, str]:
+    category = getattr(product, "category", None)
+    return {
+        "title": product.title or "",
+        "tags": (product.tags or "").replace(",", " "),
+        "brand": product.brand or "",
+        "category": getattr(category, "title", "") or "",
+        "description": strip_tags(product.description or ""),
+    }
+
+
+def document_vector() -> SearchVector:
+    vector = None
+    for field, weight in FIELD_WEIGHTS.items():
+        part = SearchVector(field, weight=weight, config=SEARCH_CONFIG)
+        vector = part if vector is None else vector + part
+    return vector
+
+
+class InvertedIndex:
+    """In-process weighted inverted index used when the database is not Postgres."""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._postings: dict[str, dict[int, float]] = defaultdict(dict)
+        self._terms_by_doc: dict[int, set[str]] = {}
+        self._sorted_terms: list[str] | None = None
+
+    def add(self, product_id: int, document: dict[str, str]) -> None:
+        scores: dict[str, float] = defaultdict(float)
+        for field, weight in FIELD_WEIGHTS.items():
+            for token in tokenize(document.get(field)):
+                scores[token] += WEIGHT_SCORES[weight]
+
+        with self._lock:
+            self._remove(product_id)
+            for token, score in scores.items():
+                self._postings[token][product_id] = score
+            self._terms_by_doc[product_id] = set(scores)
+            self._sorted_terms = None
+
+    def remove(self, product_id: int) -> None:
+        with self._lock:
+            self._remove(product_id)
+            self._sorted_terms = None
+
+    def _remove(self, product_id: int) -> None:
+        for token in self._terms_by_doc.pop(product_id, ()):
+            postings = self._postings.get(token)
+            if postings is None:
+                continue
+            postings.pop(product_id, None)
+            if not postings:
+                del self._postings[token]
+
+    def _expand(self, token: str, prefix: bool) -> list[str]:
+        if not prefix:
+            return [token] if token in self._postings else []
+        if self._sorted_terms is None:
+            self._sorted_terms = sorted(self._postings)
+        start = bisect.bisect_left(self._sorted_terms, token)
+        end = bisect.bisect_left(self._sorted_terms, token + "\uffff")
+        return self._sorted_terms[start:end]
+
+    def search(self, tokens: list[str], prefix: bool = False) -> list[tuple[float, int]]:
+        """Return ``(score, product_id)`` for documents matching every token, best first."""
+        with self._lock:
+            totals: dict[int, float] | None = None
+            for token in tokens:
+                matches: dict[int, float] = defaultdict(float)
+                for term in self._expand(token, prefix):
+                    for product_id, score in self._postings[term].items():
+                        matches[product_id] += score
+                if totals is None:
+                    totals = dict(matches)
+                else:
+                    totals = {pid: totals[pid] + score for pid, score in matches.items() if pid in totals}
+                if not totals:
+                    return []
+        return sorted(((score, pid) for pid, score in (totals or {}).items()), key=lambda r: (-r[0], -r[1]))
+
+
+_fallback_index: InvertedIndex | None = None
+_fallback_lock = threading.Lock()
+
+
+def get_fallback_index() -> InvertedIndex:
+    global _fallback_index
+    if _fallback_index is None:
+        with _fallback_lock:
+            if _fallback_index is None:
+                index = InvertedIndex()
+                for row in ProductSearchDocument.objects.values("product_id", *FIELD_WEIGHTS).iterator(chunk_size=2000):
+                    index.add(row["product_id"], row)
+                _fallback_index = index
+    return _fallback_index
+
+
+def index_products(products: Iterable[Product]) -> None:
+    """(Re)build the search documents of ``products``; unpublished products are dropped."""
+    products = list(products)
+    published = [p for p in products if p.status == "published"]
+    unpublished_ids = [p.pk for p in products if p.status != "published"]
+
+    if unpublished_ids:
+        ProductSearchDocument.objects.filter(product_id__in=unpublished_ids).delete()
+
+    documents = {p.pk: build_document(p) for p in published}
+    if documents:
+        now = timezone.now()
+        ProductSearchDocument.objects.bulk_create(
+            [ProductSearchDocument(product_id=pk, updated_at=now, **doc) for pk, doc in documents.items()],
+            update_conflicts=True,
+            unique_fields=["product"],
+            update_fields=[*FIELD_WEIGHTS, "updated_at"],
+        )
+        if use_postgres():
+            ProductSearchDocument.objects.filter(product_id__in=documents).update(vector=document_vector())
+
+    if not use_postgres() and _fallback_index is not None:
+        for pk in unpublished_ids:
+            _fallback_index.remove(pk)
+        for pk, doc in documents.items():
+            _fallback_index.add(pk, doc)
+
+
+def index_product(product: Product) -> None:
+    index_products([product])
+
+
+def remove_product(product_id: int) -> None:
+    ProductSearchDocument.objects.filter(product_id=product_id).delete()
+    if _fallback_index is not None:
+        _fallback_index.remove(product_id)
+
+
+def encode_cursor(rank: float, product_id: int) -> str:
+    raw = json.dumps([rank, product_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[float, int]:
+    try:
+        rank, product_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return float(rank), int(product_id)
+    except (TypeError, ValueError, binascii.Error):
+        raise InvalidCursor("Invalid cursor")
+
+
+def _tsquery(tokens: list[str], prefix: bool) -> SearchQuery:
+    terms = [f"{token}:*" if prefix else token for token in tokens]
+    return SearchQuery(" & ".join(terms), search_type="raw", config=SEARCH_CONFIG)
+
+
+def search_products(query: str, cursor: str | None = None, limit: int = 20, prefix: bool = False) -> SearchPage:
+    """Rank published products against ``query`` and return one keyset page of ids."""
+    tokens = tokenize(query)[:MAX_QUERY_TERMS]
+    if not tokens:
+        return SearchPage(product_ids=[], next_cursor=None)
+
+    after = decode_cursor(cursor) if cursor else None
+
+    if use_postgres():
+        tsquery = _tsquery(tokens, prefix)
+        rows = (
+            ProductSearchDocument.objects.filter(vector=tsquery)
+            # ts_rank returns float4, which doesn't survive the round trip
+            # through a Python float; compare cursors in float8.
+            .annotate(rank=Cast(SearchRank(F("vector"), tsquery), FloatField()))
+            .order_by("-rank", "-product_id")
+        )
+        if after:
+            rank, product_id = after
+            rows = rows.filter(Q(rank__lt=rank) | Q(rank=rank, product_id__lt=product_id))
+        ranked = [(row["rank"], row["product_id"]) for row in rows.values("rank", "product_id")[: limit + 1]]
+    else:
+        ranked = get_fallback_index().search(tokens, prefix=prefix)
+        if after:
+            rank, product_id = after
+            ranked = [r for r in ranked if r[0] < rank or (r[0] == rank and r[1] < product_id)]
+        ranked = ranked[: limit + 1]
+
+    next_cursor = encode_cursor(*ranked[limit - 1]) if len(ranked) > limit else None
+    return SearchPage(product_ids=[pid for _, pid in ranked[:limit]], next_cursor=next_cursor)
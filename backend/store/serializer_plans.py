@@ -0,0 +1,175 @@
+from __future__ import annotations
+
+import copy
+import threading
+from dataclasses import dataclass
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db import models
+from django.db.models import prefetch_related_objects
+from rest_framework import serializers
+from rest_framework.relations import ManyRelatedField
+
+
+READ = "read"
+WRITE = "write"
+
+
+@dataclass(frozen=True)
+class FieldPlan:
+    """Unbound field templates plus the relations a representation will touch."""
+
+    fields: dict
+    select_related: tuple[str, ...]
+    prefetch_related: tuple[str, ...]
+
+    def apply(self, instance):
+        """Load the plan's relations for ``instance`` (a queryset, a list or one object)."""
+        if not self.select_related and not self.prefetch_related:
+            return instance
+
+        if isinstance(instance, models.QuerySet):
+            if instance._result_cache is None and not instance.query.is_sliced:
+                return instance.select_related(*self.select_related).prefetch_related(*self.prefetch_related)
+            instance = list(instance)
+
+        objects = instance if isinstance(instance, (list, tuple)) else [instance]
+        objects = [obj for obj in objects if isinstance(obj, models.Model)]
+        if objects:
+            # Joins are not possible once rows are loaded; every path becomes one query per level.
+            prefetch_related_objects(objects, *self.select_related, *self.prefetch_related)
+        return instance
+
+
+_plans: dict[tuple[type, str], FieldPlan] = {}
+_plans_lock = threading.RLock()
+
+
+def _mode_for(context) -> str:
+    request = (context or {}).get("request")
+    return WRITE if request is not None and request.method == "POST" else READ
+
+
+def _field_source(name: str, field) -> str | None:
+    source = field.source or name
+    if source == "*" or "." in source:
+        return None
+    return source
+
+
+def _nested_paths(serializer, model, mode: str, prefix: str, in_prefetch: bool):
+    if isinstance(serializer, FieldPlanMixin):
+        # Reuse the nested serializer's own plan, including its declared extras.
+        plan = type(serializer).get_plan(mode)
+        select = [prefix + path for path in plan.select_related]
+        prefetch = [prefix + path for path in plan.prefetch_related]
+        return ([], select + prefetch) if in_prefetch else (select, prefetch)
+    return _relation_paths(serializer.get_fields(), model, mode, prefix, in_prefetch)
+
+
+def _relation_paths(fields: dict, model, mode: str, prefix: str = "", in_prefetch: bool = False):
+    """Walk a field tree and return the (select_related, prefetch_related) paths it reads.
+
+    Only fields sourced from real relations are followed; relations reached
+    through model methods (Product.gallery(), Review.profile(), ...) have to be
+    declared on the serializer.
+    """
+    select, prefetch = [], []
+    for name, field in fields.items():
+        if field.write_only:
+            continue
+        source = _field_source(name, field)
+        if source is None:
+            continue
+        try:
+            model_field = model._meta.get_field(source)
+        except FieldDoesNotExist:
+            continue
+        if not model_field.is_relation:
+            continue
+        if model_field.auto_created and not model_field.concrete and model_field.get_accessor_name() != source:
+            # A reverse relation shadowed by a model method of the same name (Product.gallery()).
+            continue
+
+        path = prefix + source
+        if isinstance(field, ManyRelatedField):
+            prefetch.append(path)
+        elif isinstance(field, serializers.BaseSerializer):
+            many = isinstance(field, serializers.ListSerializer) or model_field.many_to_many or model_field.one_to_many
+            nested = field.child if isinstance(field, serializers.ListSerializer) else field
+            (prefetch if in_prefetch or many else select).append(path)
+            nested_select, nested_prefetch = _nested_paths(
+                nested, model_field.related_model, mode, path + "__", in_prefetch or many
+            )
+            select += nested_select
+            prefetch += nested_prefetch
+    return select, prefetch
+
+
+def _dedupe(paths) -> tuple[str, ...]:
+    return tuple(dict.fromkeys(paths))
+
+
+class FieldPlanMixin:
+    """Build a ModelSerializer's fields once per class and request method.
+
+    ``read_depth`` / ``write_depth`` replace the old pattern of assigning
+    ``self.Meta.depth`` in ``__init__`` (which mutated the shared Meta class and
+    rebuilt the field tree on every instantiation). POST requests use the write
+    plan, everything else the read plan. Each plan also records the
+    ``select_related`` / ``prefetch_related`` paths its nested fields read; they
+    are applied to the instance or queryset handed to the serializer, so views
+    get them without listing them by hand. Relations reached through model
+    methods are declared in ``plan_select_related`` / ``plan_prefetch_related``.
+    """
+
+    read_depth = 0
+    write_depth = 0
+    plan_select_related: tuple[str, ...] = ()
+    plan_prefetch_related: tuple[str, ...] = ()
+
+    def __init__(self, instance=None, data=serializers.empty, **kwargs):
+        if instance is not None and data is serializers.empty and isinstance(instance, models.Model):
+            type(self).get_plan(_mode_for(kwargs.get("context"))).apply(instance)
+        super().__init__(instance, data, **kwargs)
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        instance = args[0] if args else kwargs.get("instance")
+        if instance is not None and "data" not in kwargs and len(args) < 2:
+            instance = cls.get_plan(_mode_for(kwargs.get("context"))).apply(instance)
+            if args:
+                args = (instance, *args[1:])
+            else:
+                kwargs["instance"] = instance
+        return super().many_init(*args, **kwargs)
+
+    @classmethod
+    def get_plan(cls, mode: str = READ) -> FieldPlan:
+        key = (cls, mode)
+        plan = _plans.get(key)
+        if plan is None:
+            with _plans_lock:
+                plan = _plans.get(key)
+                if plan is None:
+                    plan = cls._build_plan(mode)
+                    _plans[key] = plan
+        return plan
+
+    @classmethod
+    def _build_plan(cls, mode: str) -> FieldPlan:
+        builder = cls()
+        depth = cls.write_depth if mode == WRITE else cls.read_depth
+        # An instance attribute, so the class-level Meta is never touched.
+        builder.Meta = type("Meta", (cls.Meta,), {"depth": depth})
+        fields = serializers.ModelSerializer.get_fields(builder)
+
+        select, prefetch = _relation_paths(fields, cls.Meta.model, mode)
+        return FieldPlan(
+            fields=fields,
+            select_related=_dedupe([*select, *cls.plan_select_related]),
+            prefetch_related=_dedupe([*prefetch, *cls.plan_prefetch_related]),
+        )
+
+    def get_fields(self):
+        return copy.deepcopy(type(self).get_plan(_mode_for(self.context)).fields)
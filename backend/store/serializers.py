@@ -2,25 +2,36 @@ from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 from rest_framework import serializers
 from rest_framework.validators import UniqueValidator
 from django.conf import settings
-from urllib.parse import urlparse
+from urllib.parse import unquote, urlparse
+from django.db import models
 
 from store.models import CancelledOrder, Cart, CartOrderItem, Notification, CouponUsers, Product, Tag ,Category, DeliveryCouriers, CartOrder, Gallery, Brand, ProductFaq, Review,  Specification, Coupon, Color, Size, Address, Wishlist, Vendor
 from addon.models import ConfigSettings
 from store.models import Gallery
+from userauths.models import Profile
 from userauths.serializer import ProfileSerializer, UserSerializer
 
-from api.storage_s3 import presign_get, normalize_key
+from api.storage_s3 import presign_get, presign_get_many, normalize_key
+from store.serializer_plans import FieldPlanMixin
 
 
-def _maybe_presign(value: str | None) -> str | None:
+def _presign_key(value) -> str | None:
+    """The storage key ``_maybe_presign`` would sign for ``value``, or ``None`` if it is left as is."""
     if not value:
-        return value
+        return None
     if isinstance(value, str) and '://' in value:
         extracted = _maybe_extract_storage_key(value)
         if extracted and extracted != value:
-            return presign_get(str(extracted))
+            return str(extracted)
+        return None
+    return str(value)
+
+
+def _maybe_presign(value: str | None) -> str | None:
+    key = _presign_key(value)
+    if key is None:
         return value
-    return presign_get(str(value))
+    return presign_get(key)
 
 
 def _maybe_extract_storage_key(value: str | None) -> str | None:
@@ -32,7 +43,8 @@ def _maybe_extract_storage_key(value: str | None) -> str | None:
         return normalize_key(value)
 
     parsed = urlparse(value)
-    path = (parsed.path or '').lstrip('/')
+    # Presigned URLs carry the key percent-encoded.
+    path = unquote(parsed.path or '').lstrip('/')
     if not path:
         return ''
 
@@ -43,6 +55,22 @@ def _maybe_extract_storage_key(value: str | None) -> str | None:
         path = path[len(bucket) + 1:]
     return normalize_key(path)
 
+class PresignedImageListSerializer(serializers.ListSerializer):
+    """Presigns the ``image`` of every item in one batch before the items are rendered.
+
+    Each child still calls ``_maybe_presign`` on its own output, which then hits
+    the warm presign cache instead of signing one URL at a time.
+    """
+
+    def to_representation(self, data):
+        if isinstance(data, models.manager.BaseManager):
+            data = data.all()
+        keys = [key for key in (_presign_key(getattr(item, 'image', None)) for item in data) if key]
+        if keys:
+            presign_get_many(keys)
+        return super().to_representation(data)
+
+
 class ConfigSettingsSerializer(serializers.ModelSerializer):
 
     class Meta:
@@ -56,6 +84,7 @@ class CategorySerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Category
+        list_serializer_class = PresignedImageListSerializer
         fields = '__all__'
 
     def to_representation(self, instance):
@@ -79,6 +108,7 @@ class BrandSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Brand
+        list_serializer_class = PresignedImageListSerializer
         fields = '__all__'
 
     def to_representation(self, instance):
@@ -95,6 +125,7 @@ class GallerySerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Gallery
+        list_serializer_class = PresignedImageListSerializer
         fields = '__all__'
 
     def to_representation(self, instance):
@@ -125,6 +156,7 @@ class ColorSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Color
+        list_serializer_class = PresignedImageListSerializer
         fields = '__all__'
 
     def to_representation(self, instance):
@@ -137,7 +169,7 @@ class ColorSerializer(serializers.ModelSerializer):
 
 
 # Define a serializer for the Product model
-class ProductSerializer(serializers.ModelSerializer):
+class ProductSerializer(FieldPlanMixin, serializers.ModelSerializer):
     image = serializers.CharField(required=False, allow_blank=True, allow_null=True, max_length=500)
     product_rating = serializers.SerializerMethodField()
     rating_count = serializers.SerializerMethodField()
@@ -157,8 +189,14 @@ class ProductSerializer(serializers.ModelSerializer):
     # size = SizeSerializer(many=True, required=False)
     # gallery = GallerySerializer(many=True, required=False, read_only=True)
 
+    read_depth = 3
+    # Read through model methods / ProductStats rather than declared relations.
+    plan_select_related = ("stats",)
+    plan_prefetch_related = ("gallery_set", "specification_set", "size_set", "color_set")
+
     class Meta:
         model = Product
+        list_serializer_class = PresignedImageListSerializer
         fields = [
             "id",
             "title",
@@ -231,241 +269,147 @@ class ProductSerializer(serializers.ModelSerializer):
     def get_get_precentage(self, obj) -> float:
         return obj.get_precentage()
 
-    def __init__(self, *args, **kwargs):
-        super(ProductSerializer, self).__init__(*args, **kwargs)
-        # Customize serialization depth based on the request method.
-        request = self.context.get('request')
-        if request and request.method == 'POST':
-            # When creating a new product, set serialization depth to 0.
-            self.Meta.depth = 0
-        else:
-            # For other methods, set serialization depth to 3.
-            self.Meta.depth = 3
 
 
 
 
 # Define a serializer for the ProductFaq model
-class ProductFaqSerializer(serializers.ModelSerializer):
+class ProductFaqSerializer(FieldPlanMixin, serializers.ModelSerializer):
     # Serialize the related Product model
     product = ProductSerializer()
 
+    read_depth = 3
+
     class Meta:
         model = ProductFaq
         fields = '__all__'
 
-    def __init__(self, *args, **kwargs):
-        super(ProductFaqSerializer, self).__init__(*args, **kwargs)
-        # Customize serialization depth based on the request method.
-        request = self.context.get('request')
-        if request and request.method == 'POST':
-            # When creating a new product FAQ, set serialization depth to 0.
-            self.Meta.depth = 0
-        else:
-            # For other methods, set serialization depth to 3.
-            self.Meta.depth = 3
 
 # Define a serializer for the CartOrderItem model
-class CartSerializer(serializers.ModelSerializer):
+class CartSerializer(FieldPlanMixin, serializers.ModelSerializer):
     # Serialize the related Product model
     product = ProductSerializer()  
 
+    read_depth = 3
+
     class Meta:
         model = Cart
         fields = '__all__'
     
-    def __init__(self, *args, **kwargs):
-        super(CartSerializer, self).__init__(*args, **kwargs)
-        # Customize serialization depth based on the request method.
-        request = self.context.get('request')
-        if request and request.method == 'POST':
-            # When creating a new cart order item, set serialization depth to 0.
-            self.Meta.depth = 0
-        else:
-            # For other methods, set serialization depth to 3.
-            self.Meta.depth = 3
 
 # Define a serializer for the CartOrderItem model
-class CartOrderItemSerializer(serializers.ModelSerializer):
+class CartOrderItemSerializer(FieldPlanMixin, serializers.ModelSerializer):
     # Serialize the related Product model
     # product = ProductSerializer()  
 
+    read_depth = 3
+
     class Meta:
         model = CartOrderItem
         fields = '__all__'
     
-    def __init__(self, *args, **kwargs):
-        super(CartOrderItemSerializer, self).__init__(*args, **kwargs)
-        # Customize serialization depth based on the request method.
-        request = self.context.get('request')
-        if request and request.method == 'POST':
-            # When creating a new cart order item, set serialization depth to 0.
-            self.Meta.depth = 0
-        else:
-            # For other methods, set serialization depth to 3.
-            self.Meta.depth = 3
 
 # Define a serializer for the CartOrder model
-class CartOrderSerializer(serializers.ModelSerializer):
+class CartOrderSerializer(FieldPlanMixin, serializers.ModelSerializer):
     # Serialize related CartOrderItem models
     orderitem = CartOrderItemSerializer(many=True, read_only=True)
 
+    read_depth = 3
+
     class Meta:
         model = CartOrder
         fields = '__all__'
 
-    def __init__(self, *args, **kwargs):
-        super(CartOrderSerializer, self).__init__(*args, **kwargs)
-        # Customize serialization depth based on the request method.
-        request = self.context.get('request')
-        if request and request.method == 'POST':
-            # When creating a new cart order, set serialization depth to 0.
-            self.Meta.depth = 0
-        else:
-            # For other methods, set serialization depth to 3.
-            self.Meta.depth = 3
 
 
-class VendorSerializer(serializers.ModelSerializer):
+class VendorSerializer(FieldPlanMixin, serializers.ModelSerializer):
     # Serialize related CartOrderItem models
     user = UserSerializer(read_only=True)
 
     image = serializers.CharField(required=False, allow_blank=True, allow_null=True)
 
+    read_depth = 3
+
     class Meta:
         model = Vendor
+        list_serializer_class = PresignedImageListSerializer
         fields = '__all__'
+        read_only_fields = ['views']
 
     def to_representation(self, instance):
         data = super().to_representation(instance)
         data['image'] = _maybe_presign(data.get('image'))
         return data
 
-    def __init__(self, *args, **kwargs):
-        super(VendorSerializer, self).__init__(*args, **kwargs)
-        # Customize serialization depth based on the request method.
-        request = self.context.get('request')
-        if request and request.method == 'POST':
-            # When creating a new cart order, set serialization depth to 0.
-            self.Meta.depth = 0
-        else:
-            # For other methods, set serialization depth to 3.
-            self.Meta.depth = 3
 
 # Define a serializer for the Review model
-class ReviewSerializer(serializers.ModelSerializer):
+class ReviewSerializer(FieldPlanMixin, serializers.ModelSerializer):
     # Serialize the related Product model
     product = ProductSerializer()
     profile = ProfileSerializer()
     
+    read_depth = 3
+    # Review.profile() reads user.profile.
+    plan_select_related = ("user__profile",)
+
     class Meta:
         model = Review
         fields = '__all__'
 
-    def __init__(self, *args, **kwargs):
-        super(ReviewSerializer, self).__init__(*args, **kwargs)
-        # Customize serialization depth based on the request method.
-        request = self.context.get('request')
-        if request and request.method == 'POST':
-            # When creating a new review, set serialization depth to 0.
-            self.Meta.depth = 0
-        else:
-            # For other methods, set serialization depth to 3.
-            self.Meta.depth = 3
 
 # Define a serializer for the Wishlist model
-class WishlistSerializer(serializers.ModelSerializer):
+class WishlistSerializer(FieldPlanMixin, serializers.ModelSerializer):
     # Serialize the related Product model
     product = ProductSerializer()
 
+    read_depth = 3
+
     class Meta:
         model = Wishlist
         fields = '__all__'
 
-    def __init__(self, *args, **kwargs):
-        super(WishlistSerializer, self).__init__(*args, **kwargs)
-        # Customize serialization depth based on the request method.
-        request = self.context.get('request')
-        if request and request.method == 'POST':
-            # When creating a new wishlist item, set serialization depth to 0.
-            self.Meta.depth = 0
-        else:
-            # For other methods, set serialization depth to 3.
-            self.Meta.depth = 3
 
 # Define a serializer for the Address model
-class AddressSerializer(serializers.ModelSerializer):
+class AddressSerializer(FieldPlanMixin, serializers.ModelSerializer):
+
+    read_depth = 3
 
     class Meta:
         model = Address
         fields = '__all__'
 
-    def __init__(self, *args, **kwargs):
-        super(AddressSerializer, self).__init__(*args, **kwargs)
-        # Customize serialization depth based on the request method.
-        request = self.context.get('request')
-        if request and request.method == 'POST':
-            # When creating a new address, set serialization depth to 0.
-            self.Meta.depth = 0
-        else:
-            # For other methods, set serialization depth to 3.
-            self.Meta.depth = 3
 
 # Define a serializer for the CancelledOrder model
-class CancelledOrderSerializer(serializers.ModelSerializer):
+class CancelledOrderSerializer(FieldPlanMixin, serializers.ModelSerializer):
+
+    read_depth = 3
 
     class Meta:
         model = CancelledOrder
         fields = '__all__'
 
-    def __init__(self, *args, **kwargs):
-        super(CancelledOrderSerializer, self).__init__(*args, **kwargs)
-        # Customize serialization depth based on the request method.
-        request = self.context.get('request')
-        if request and request.method == 'POST':
-            # When creating a new cancelled order, set serialization depth to 0.
-            self.Meta.depth = 0
-        else:
-            # For other methods, set serialization depth to 3.
-            self.Meta.depth = 3
 
 # Define a serializer for the Coupon model
-class CouponSerializer(serializers.ModelSerializer):
+class CouponSerializer(FieldPlanMixin, serializers.ModelSerializer):
+
+    read_depth = 3
 
     class Meta:
         model = Coupon
         fields = '__all__'
 
-    def __init__(self, *args, **kwargs):
-        super(CouponSerializer, self).__init__(*args, **kwargs)
-        # Customize serialization depth based on the request method.
-        request = self.context.get('request')
-        if request and request.method == 'POST':
-            # When creating a new coupon, set serialization depth to 0.
-            self.Meta.depth = 0
-        else:
-            # For other methods, set serialization depth to 3.
-            self.Meta.depth = 3
 
 # Define a serializer for the CouponUsers model
-class CouponUsersSerializer(serializers.ModelSerializer):
+class CouponUsersSerializer(FieldPlanMixin, serializers.ModelSerializer):
     # Serialize the related Coupon model
     coupon =  CouponSerializer()
 
+    read_depth = 3
+
     class Meta:
         model = CouponUsers
         fields = '__all__'
 
-    def __init__(self, *args, **kwargs):
-        super(CouponUsersSerializer, self).__init__(*args, **kwargs)
-        # Customize serialization depth based on the request method.
-        request = self.context.get('request')
-        if request and request.method == 'POST':
-            # When creating a new coupon user, set serialization depth to 0.
-            self.Meta.depth = 0
-        else:
-            # For other methods, set serialization depth to 3.
-            self.Meta.depth = 3
 
 # Define a serializer for the DeliveryCouriers model
 class DeliveryCouriersSerializer(serializers.ModelSerializer):
@@ -475,22 +419,200 @@ class DeliveryCouriersSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
-class NotificationSerializer(serializers.ModelSerializer):
+class NotificationSerializer(FieldPlanMixin, serializers.ModelSerializer):
+
+    read_depth = 3
 
     class Meta:
         model = Notification
         fields = '__all__'
 
-    def __init__(self, *args, **kwargs):
-        super(NotificationSerializer, self).__init__(*args, **kwargs)
-        # Customize serialization depth based on the request method.
-        request = self.context.get('request')
-        if request and request.method == 'POST':
-            # When creating a new coupon user, set serialization depth to 0.
-            self.Meta.depth = 0
-        else:
-            # For other methods, set serialization depth to 3.
-            self.Meta.depth = 3
+
+
+# Lean serializers for the paginated list endpoints. They return flat fields and
+# small summaries of related objects instead of the depth-3 graphs used by the
+# detail views, so the page size alone bounds the response.
+class CategorySummarySerializer(FieldPlanMixin, serializers.ModelSerializer):
+
+    class Meta:
+        model = Category
+        fields = ["id", "title", "slug"]
+
+
+class VendorSummarySerializer(FieldPlanMixin, serializers.ModelSerializer):
+    image = serializers.CharField(read_only=True)
+
+    class Meta:
+        model = Vendor
+        list_serializer_class = PresignedImageListSerializer
+        fields = ["id", "name", "slug", "image"]
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        data['image'] = _maybe_presign(data.get('image'))
+        return data
+
+
+class ProfileSummarySerializer(serializers.ModelSerializer):
+    image = serializers.CharField(read_only=True)
+
+    class Meta:
+        model = Profile
+        list_serializer_class = PresignedImageListSerializer
+        fields = ["id", "full_name", "image"]
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        data['image'] = _maybe_presign(data.get('image'))
+        return data
+
+
+class ProductSummarySerializer(FieldPlanMixin, serializers.ModelSerializer):
+    image = serializers.CharField(read_only=True)
+
+    class Meta:
+        model = Product
+        list_serializer_class = PresignedImageListSerializer
+        fields = ["id", "title", "slug", "pid", "image", "brand", "price", "old_price", "shipping_amount"]
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        data['image'] = _maybe_presign(data.get('image'))
+        return data
+
+
+class ProductListSerializer(ProductSummarySerializer):
+    category = CategorySummarySerializer(read_only=True)
+    vendor = VendorSummarySerializer(read_only=True)
+    # Kept for the "add to cart" pickers on the product cards.
+    color = ColorSerializer(many=True, read_only=True)
+    size = SizeSerializer(many=True, read_only=True)
+    product_rating = serializers.SerializerMethodField()
+    rating_count = serializers.SerializerMethodField()
+    order_count = serializers.SerializerMethodField()
+    get_precentage = serializers.SerializerMethodField()
+
+    plan_select_related = ("stats",)
+    plan_prefetch_related = ("size_set", "color_set")
+
+    class Meta:
+        model = Product
+        list_serializer_class = PresignedImageListSerializer
+        fields = [
+            "id",
+            "title",
+            "slug",
+            "pid",
+            "sku",
+            "image",
+            "category",
+            "brand",
+            "price",
+            "old_price",
+            "shipping_amount",
+            "stock_qty",
+            "in_stock",
+            "status",
+            "featured",
+            "hot_deal",
+            "special_offer",
+            "vendor",
+            "date",
+            "size",
+            "color",
+            "product_rating",
+            "rating_count",
+            "order_count",
+            "get_precentage",
+        ]
+
+    def get_product_rating(self, obj) -> float:
+        return obj.product_rating()
+
+    def get_rating_count(self, obj) -> int:
+        return obj.rating_count()
+
+    def get_order_count(self, obj) -> int:
+        return obj.order_count()
+
+    def get_get_precentage(self, obj) -> float:
+        return obj.get_precentage()
+
+
+class CartOrderListSerializer(FieldPlanMixin, serializers.ModelSerializer):
+
+    class Meta:
+        model = CartOrder
+        fields = [
+            "id",
+            "oid",
+            "buyer",
+            "full_name",
+            "email",
+            "mobile",
+            "address",
+            "city",
+            "state",
+            "country",
+            "sub_total",
+            "shipping_amount",
+            "tax_fee",
+            "service_fee",
+            "total",
+            "initial_total",
+            "saved",
+            "payment_status",
+            "order_status",
+            "date",
+        ]
+
+
+class CartOrderItemSummarySerializer(FieldPlanMixin, serializers.ModelSerializer):
+    product = ProductSummarySerializer(read_only=True)
+
+    class Meta:
+        model = CartOrderItem
+        fields = ["id", "product", "qty", "color", "size", "price", "sub_total", "total", "delivery_status", "date"]
+
+
+class ReviewListSerializer(FieldPlanMixin, serializers.ModelSerializer):
+    product = ProductSummarySerializer(read_only=True)
+    profile = serializers.SerializerMethodField()
+
+    plan_select_related = ("user__profile",)
+
+    class Meta:
+        model = Review
+        fields = ["id", "user", "product", "profile", "review", "reply", "rating", "active", "date"]
+
+    def get_profile(self, obj) -> dict | None:
+        # Read through the select_related user instead of Review.profile()'s query.
+        profile = getattr(obj.user, "profile", None) if obj.user_id else None
+        return ProfileSummarySerializer(profile).data if profile else None
+
+
+class WishlistListSerializer(FieldPlanMixin, serializers.ModelSerializer):
+    product = ProductSummarySerializer(read_only=True)
+
+    class Meta:
+        model = Wishlist
+        fields = ["id", "user", "product", "date"]
+
+
+class NotificationListSerializer(FieldPlanMixin, serializers.ModelSerializer):
+    order = CartOrderListSerializer(read_only=True)
+    order_item = CartOrderItemSummarySerializer(read_only=True)
+
+    class Meta:
+        model = Notification
+        fields = ["id", "user", "vendor", "order", "order_item", "seen", "date"]
+
+
+class CouponListSerializer(FieldPlanMixin, serializers.ModelSerializer):
+
+    class Meta:
+        model = Coupon
+        fields = ["id", "vendor", "code", "discount", "active", "cid", "date"]
 
 
 class SummarySerializer(serializers.Serializer):
@@ -503,6 +625,17 @@ class EarningSummarySerializer(serializers.Serializer):
     total_revenue = serializers.DecimalField(max_digits=10, decimal_places=2)
 
 
+class MonthlySalesSerializer(serializers.Serializer):
+    year = serializers.IntegerField()
+    month = serializers.IntegerField()
+    orders = serializers.IntegerField(source="total_orders")
+    items = serializers.IntegerField(source="total_items")
+    qty = serializers.IntegerField(source="total_qty")
+    revenue = serializers.DecimalField(max_digits=14, decimal_places=2, source="total_revenue")
+    shipping = serializers.DecimalField(max_digits=14, decimal_places=2, source="total_shipping")
+    saved = serializers.DecimalField(max_digits=14, decimal_places=2, source="total_saved")
+
+
 class CouponSummarySerializer(serializers.Serializer):
     total_coupons = serializers.IntegerField(default=0)
     active_coupons = serializers.IntegerField(default=0)
@@ -511,4 +644,56 @@ class CouponSummarySerializer(serializers.Serializer):
 class NotificationSummarySerializer(serializers.Serializer):
     un_read_noti = serializers.IntegerField(default=0)
     read_noti = serializers.IntegerField(default=0)
-    all_noti = serializers.IntegerField(default=0)
\ No newline at end of file
+    all_noti = serializers.IntegerField(default=0)
+
+# Rows of a bulk product import (store.product_import); images are storage keys.
+class SpecificationImportSerializer(serializers.Serializer):
+    title = serializers.CharField(max_length=100)
+    content = serializers.CharField(max_length=1000, allow_blank=True, required=False, default="")
+
+
+class SizeImportSerializer(serializers.Serializer):
+    name = serializers.CharField(max_length=100)
+    price = serializers.DecimalField(max_digits=12, decimal_places=2, min_value=0, required=False, default=0)
+
+
+class ColorImportSerializer(serializers.Serializer):
+    name = serializers.CharField(max_length=100)
+    color_code = serializers.CharField(max_length=100, allow_blank=True, required=False, default="")
+    image = serializers.CharField(max_length=100, allow_blank=True, required=False, default="")
+
+
+class GalleryImportSerializer(serializers.Serializer):
+    image = serializers.CharField(max_length=100)
+
+
+class ProductImportSerializer(serializers.Serializer):
+    title = serializers.CharField(max_length=255)
+    description = serializers.CharField(allow_blank=True, required=False, default="")
+    # Category id, slug or title; resolved against context["categories"]
+    category = serializers.CharField(required=False, allow_blank=True, default="")
+    tags = serializers.CharField(max_length=1000, allow_blank=True, required=False, default="")
+    brand = serializers.CharField(max_length=255, allow_blank=True, required=False, default="")
+    image = serializers.CharField(max_length=500, required=False, default="product.jpg")
+    price = serializers.DecimalField(max_digits=12, decimal_places=2, min_value=0, required=False, default=0)
+    old_price = serializers.DecimalField(max_digits=12, decimal_places=2, min_value=0, required=False, default=0)
+    shipping_amount = serializers.DecimalField(max_digits=12, decimal_places=2, min_value=0, required=False, default=0)
+    stock_qty = serializers.IntegerField(min_value=0, required=False, default=0)
+    status = serializers.ChoiceField(choices=Product._meta.get_field("status").choices, required=False, default="published")
+    type = serializers.ChoiceField(choices=Product._meta.get_field("type").choices, required=False, default="regular")
+    featured = serializers.BooleanField(required=False, default=False)
+    hot_deal = serializers.BooleanField(required=False, default=False)
+    special_offer = serializers.BooleanField(required=False, default=False)
+    digital = serializers.BooleanField(required=False, default=False)
+    specifications = SpecificationImportSerializer(many=True, required=False, default=list)
+    sizes = SizeImportSerializer(many=True, required=False, default=list)
+    colors = ColorImportSerializer(many=True, required=False, default=list)
+    gallery = GalleryImportSerializer(many=True, required=False, default=list)
+
+    def validate_category(self, value):
+        if not value:
+            return None
+        category = self.context["categories"].get(value.strip().lower())
+        if category is None:
+            raise serializers.ValidationError("Unknown category.")
+        return category
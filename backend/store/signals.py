@@ -1,8 +1,12 @@
-from django.db.models.signals import post_delete
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
 
+from addon.models import ConfigSettings, Tax
+from api.cache import bump_version
 from backend.storage_utils import delete_field_file
-from store.models import Brand, Category, Color, Gallery, Product
+from store import carts, pricing, search, stats, suggest
+from store.models import Brand, Cart, Category, Color, Gallery, Product, Review, Size, Specification, Wishlist
+from vendor.models import Vendor
 
 
 @receiver(post_delete, sender=Category)
@@ -28,3 +32,128 @@ def delete_gallery_image_file(sender, instance: Gallery, **kwargs):
 @receiver(post_delete, sender=Color)
 def delete_color_image_file(sender, instance: Color, **kwargs):
     delete_field_file(instance, "image")
+
+
+@receiver(post_save, sender=Product)
+def create_product_stats(sender, instance: Product, created, raw=False, **kwargs):
+    if created and not raw:
+        stats.ensure_stats_rows([instance.pk])
+
+
+@receiver(post_save, sender=Product)
+def update_product_search_document(sender, instance: Product, raw=False, **kwargs):
+    if not raw:
+        search.index_product(instance)
+
+
+@receiver(post_delete, sender=Product)
+def remove_product_search_document(sender, instance: Product, **kwargs):
+    search.remove_product(instance.pk)
+
+
+@receiver(post_save, sender=Product)
+def update_product_suggestions(sender, instance: Product, raw=False, **kwargs):
+    if not raw:
+        suggest.product_changed(instance)
+
+
+@receiver(post_delete, sender=Product)
+def remove_product_suggestions(sender, instance: Product, **kwargs):
+    suggest.product_removed(instance.pk)
+
+
+@receiver(post_save, sender=Category)
+def update_category_suggestions(sender, instance: Category, raw=False, **kwargs):
+    if not raw:
+        suggest.category_changed(instance)
+
+
+@receiver(post_delete, sender=Category)
+def remove_category_suggestions(sender, instance: Category, **kwargs):
+    suggest.category_removed(instance.pk)
+
+
+@receiver(post_save, sender=Category)
+def reindex_category_products(sender, instance: Category, created, raw=False, **kwargs):
+    if created or raw:
+        return
+    products = Product.objects.filter(category=instance).select_related("category")
+    batch = []
+    for product in products.iterator(chunk_size=500):
+        batch.append(product)
+        if len(batch) >= 500:
+            search.index_products(batch)
+            batch = []
+    if batch:
+        search.index_products(batch)
+
+
+@receiver(pre_save, sender=Review)
+def remember_review_rating(sender, instance: Review, raw=False, **kwargs):
+    instance._stats_previous = None
+    if instance.pk and not raw:
+        instance._stats_previous = (
+            Review.objects.filter(pk=instance.pk).values_list("product_id", "rating").first()
+        )
+
+
+@receiver(post_save, sender=Review)
+def update_review_stats(sender, instance: Review, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous = None if created else getattr(instance, "_stats_previous", None)
+    stats.record_review_change(previous, (instance.product_id, instance.rating))
+
+
+@receiver(post_delete, sender=Review)
+def remove_review_stats(sender, instance: Review, **kwargs):
+    stats.record_review_change((instance.product_id, instance.rating), None)
+
+
+@receiver(post_save, sender=Wishlist)
+def add_wishlist_stats(sender, instance: Wishlist, created, raw=False, **kwargs):
+    if created and not raw:
+        stats.bump([instance.product_id], wishlist_count=1)
+
+
+@receiver(post_delete, sender=Wishlist)
+def remove_wishlist_stats(sender, instance: Wishlist, **kwargs):
+    stats.bump([instance.product_id], wishlist_count=-1)
+
+
+@receiver(post_save, sender=Tax)
+@receiver(post_delete, sender=Tax)
+@receiver(post_save, sender=ConfigSettings)
+@receiver(post_delete, sender=ConfigSettings)
+def invalidate_pricing_config(sender, **kwargs):
+    pricing.invalidate()
+
+
+@receiver(pre_save, sender=Cart)
+def remember_cart_owner(sender, instance: Cart, raw=False, **kwargs):
+    instance._summary_previous = None
+    if instance.pk and not raw:
+        instance._summary_previous = Cart.objects.filter(pk=instance.pk).values_list("cart_id", "user_id").first()
+
+
+@receiver(post_save, sender=Cart)
+@receiver(post_delete, sender=Cart)
+def invalidate_cart_summary(sender, instance: Cart, **kwargs):
+    previous = getattr(instance, "_summary_previous", None)
+    if previous and previous != (instance.cart_id, instance.user_id):
+        carts.invalidate_cart(*previous)
+    carts.invalidate_cart(instance.cart_id, instance.user_id)
+
+
+# Models whose rows are embedded in cached catalog responses (api.cache.CachedResponseMixin).
+# QuerySet.update() skips these signals; such changes show up once the cache times out.
+CATALOG_MODELS = (Product, Category, Brand, Vendor, Gallery, Specification, Size, Color, ConfigSettings)
+
+
+def bump_catalog_version(sender, **kwargs):
+    bump_version(sender)
+
+
+for _model in CATALOG_MODELS:
+    post_save.connect(bump_catalog_version, sender=_model, dispatch_uid=f"catalog-version-save-{_model._meta.label_lower}")
+    post_delete.connect(bump_catalog_version, sender=_model, dispatch_uid=f"catalog-version-delete-{_model._meta.label_lower}")
@@ -0,0 +1,229 @@
+from __future__ import annotations
+
+import hashlib
+from array import array
+from dataclasses import dataclass
+from typing import Iterable, Iterator
+
+import numpy as np
+from scipy import sparse
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Min
+
+from api.cache import bump_version
+from store.models import ProductSearchDocument, ProductSimilar, ProductSimilarState
+from store.search import FIELD_WEIGHTS, WEIGHT_SCORES, tokenize
+
+
+# Neighbours kept per product.
+NEIGHBOURS = getattr(settings, "SIMILAR_PRODUCTS_NEIGHBOURS", 20)
+# Bytes of dense scores computed at once; bounds memory whatever the catalog size.
+CHUNK_BYTES = getattr(settings, "SIMILAR_PRODUCTS_CHUNK_BYTES", 256 * 1024 * 1024)
+# Neighbours scoring below this are not worth showing.
+MIN_SCORE = 0.05
+# An incremental refresh touching more products than this share rebuilds everything.
+FULL_REBUILD_RATIO = 0.2
+BATCH_SIZE = 5000
+# Same fields and relative weights as search ranking.
+FIELDS = tuple(FIELD_WEIGHTS)
+
+
+def signature(document: dict[str, str]) -> str:
+    """Fingerprint of the text a product's vector is built from."""
+    text = "\x1f".join(document.get(field) or "" for field in FIELDS)
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def published_documents() -> Iterator[tuple[int, dict[str, str]]]:
+    """``(product_id, fields)`` of every published product, from its search document."""
+    rows = (
+        ProductSearchDocument.objects.filter(product__status="published")
+        .order_by("product_id")
+        .values_list("product_id", *FIELDS)
+        .iterator(chunk_size=BATCH_SIZE)
+    )
+    for product_id, *values in rows:
+        yield product_id, dict(zip(FIELDS, values))
+
+
+@dataclass
+class TfidfIndex:
+    # Product id of each row
+    ids: np.ndarray
+    # L2-normalised TF-IDF rows (products x terms), and the same matrix by column
+    rows: sparse.csr_matrix
+    columns: sparse.csc_matrix
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def positions(self) -> dict[int, int]:
+        return {int(product_id): i for i, product_id in enumerate(self.ids)}
+
+
+def vectorize(documents: Iterable[tuple[int, dict[str, str]]]) -> TfidfIndex:
+    """TF-IDF vectors of ``documents``, built in one pass.
+
+    A term's frequency is summed over the fields with the search weights
+    (title counts most), dampened with ``log1p`` and scaled by a smoothed IDF.
+    Rows are normalised, so a dot product is the cosine similarity.
+    """
+    vocabulary: dict[str, int] = {}
+    ids, indptr, indices, weights = array("q"), array("q", [0]), array("q"), array("f")
+    for product_id, document in documents:
+        terms: dict[int, float] = {}
+        for field in FIELDS:
+            weight = WEIGHT_SCORES[FIELD_WEIGHTS[field]]
+            for token in tokenize(document.get(field)):
+                column = vocabulary.setdefault(token, len(vocabulary))
+                terms[column] = terms.get(column, 0.0) + weight
+        ids.append(product_id)
+        indices.extend(terms.keys())
+        weights.extend(terms.values())
+        indptr.append(len(indices))
+
+    n = len(ids)
+    matrix = sparse.csr_matrix(
+        (np.array(weights, dtype=np.float32), np.array(indices, dtype=np.int64), np.array(indptr, dtype=np.int64)),
+        shape=(n, len(vocabulary)),
+    )
+    df = np.bincount(matrix.indices, minlength=len(vocabulary))
+    idf = (np.log((1 + n) / (1 + df)) + 1).astype(np.float32)
+    matrix.data = np.log1p(matrix.data) * idf[matrix.indices]
+
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    matrix = sparse.csr_matrix(sparse.diags(1 / norms).astype(np.float32) @ matrix)
+    return TfidfIndex(ids=np.array(ids, dtype=np.int64), rows=matrix, columns=matrix.tocsc())
+
+
+def score_blocks(index: TfidfIndex, rows: np.ndarray) -> Iterator[tuple[np.ndarray, np.ndarray]]:
+    """Yield ``(block, scores)``: the cosine of each product in ``block`` against every product.
+
+    Each block is a dense NumPy product of the block's rows, cut down to the
+    terms they use, with the matching columns of the whole matrix. Blocks are
+    sized so their scores (4 bytes a pair) and the ranking's argpartition
+    indices (8 bytes a pair) fit in CHUNK_BYTES. A product scores 0 against itself.
+    """
+    n = len(index)
+    chunk = max(1, CHUNK_BYTES // (12 * max(n, 1)))
+    for start in range(0, len(rows), chunk):
+        block = rows[start:start + chunk]
+        queries = index.rows[block]
+        terms = np.unique(queries.indices)
+        dense = queries[:, terms].toarray()
+        scores = np.asarray(index.columns[:, terms] @ dense.T).T
+        scores[np.arange(len(block)), block] = 0
+        yield block, scores
+
+
+def top_neighbours(index: TfidfIndex, rows: np.ndarray, k: int = NEIGHBOURS) -> Iterator[tuple[int, int, float]]:
+    """``(product_id, other_id, score)`` of the ``k`` best neighbours of each product in ``rows``."""
+    k = min(k, len(index) - 1)
+    if k <= 0:
+        return
+    for block, scores in score_blocks(index, rows):
+        top = np.argpartition(scores, -k, axis=1)[:, -k:]
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1, kind="stable")
+        for r, row in enumerate(block):
+            product_id = int(index.ids[row])
+            for position in order[r]:
+                score = float(top_scores[r, position])
+                if score < MIN_SCORE:
+                    break
+                yield product_id, int(index.ids[top[r, position]]), score
+
+
+def outranked(index: TfidfIndex, changed: np.ndarray, floors: np.ndarray) -> np.ndarray:
+    """Rows some ``changed`` product now scores above the row's ``floors`` (its k-th best score)."""
+    hit = np.zeros(len(index), dtype=bool)
+    for _, scores in score_blocks(index, changed):
+        hit |= ((scores > floors) & (scores >= MIN_SCORE)).any(axis=0)
+    return np.flatnonzero(hit)
+
+
+def _save(rows: Iterator[tuple[int, int, float]], batch_size: int = BATCH_SIZE) -> int:
+    created = 0
+    batch = []
+    for product_id, other_id, score in rows:
+        batch.append(ProductSimilar(product_id=product_id, other_id=other_id, score=score))
+        if len(batch) >= batch_size:
+            ProductSimilar.objects.bulk_create(batch)
+            created += len(batch)
+            batch = []
+    ProductSimilar.objects.bulk_create(batch)
+    return created + len(batch)
+
+
+def _save_signatures(signatures: dict[int, str]) -> None:
+    ProductSimilarState.objects.bulk_create(
+        [ProductSimilarState(product_id=product_id, signature=value) for product_id, value in signatures.items()],
+        update_conflicts=True,
+        unique_fields=["product"],
+        update_fields=["signature"],
+        batch_size=BATCH_SIZE,
+    )
+
+
+def _floors(index: TfidfIndex, positions: dict[int, int], k: int) -> np.ndarray:
+    """Each row's k-th best stored score; 0 while it has fewer than ``k`` neighbours."""
+    floors = np.zeros(len(index), dtype=np.float32)
+    stored = ProductSimilar.objects.values("product_id").annotate(lowest=Min("score"), kept=Count("id"))
+    for row in stored.order_by().iterator(chunk_size=BATCH_SIZE):
+        position = positions.get(row["product_id"])
+        if position is not None and row["kept"] >= k:
+            floors[position] = row["lowest"]
+    return floors
+
+
+def refresh(k: int = NEIGHBOURS, full: bool = False) -> tuple[int, bool]:
+    """Bring ProductSimilar up to date; returns ``(products recomputed, full rebuild)``.
+
+    Only products whose text changed since the last run are recomputed, along
+    with the products that listed one of them or that one of them now
+    outscores. Scores of untouched rows keep the IDF of the run that computed
+    them; pass ``full`` now and then to rescore everything.
+    """
+    state = dict(ProductSimilarState.objects.values_list("product_id", "signature").iterator(chunk_size=BATCH_SIZE))
+    signatures: dict[int, str] = {}
+
+    def documents():
+        for product_id, document in published_documents():
+            signatures[product_id] = signature(document)
+            yield product_id, document
+
+    index = vectorize(documents())
+    changed = [product_id for product_id, value in signatures.items() if state.get(product_id) != value]
+    removed = [product_id for product_id in state if product_id not in signatures]
+
+    if full or not state or len(changed) + len(removed) > FULL_REBUILD_RATIO * max(len(index), 1):
+        with transaction.atomic():
+            ProductSimilar.objects.all().delete()
+            ProductSimilarState.objects.all().delete()
+            _save(top_neighbours(index, np.arange(len(index)), k))
+            _save_signatures(signatures)
+        bump_version(ProductSimilar)
+        return len(index), True
+
+    if not changed and not removed:
+        return 0, False
+
+    positions = index.positions()
+    changed_rows = np.array([positions[product_id] for product_id in changed], dtype=np.int64)
+    affected = set(changed)
+    affected.update(ProductSimilar.objects.filter(other_id__in=[*changed, *removed]).values_list("product_id", flat=True))
+    if len(changed_rows):
+        affected.update(int(index.ids[row]) for row in outranked(index, changed_rows, _floors(index, positions, k)))
+    affected.difference_update(removed)
+    rows = np.array(sorted(positions[product_id] for product_id in affected if product_id in positions), dtype=np.int64)
+
+    with transaction.atomic():
+        ProductSimilar.objects.filter(product_id__in=[*affected, *removed]).delete()
+        ProductSimilarState.objects.filter(product_id__in=removed).delete()
+        _save(top_neighbours(index, rows, k))
+        _save_signatures({product_id: signatures[product_id] for product_id in changed})
+    bump_version(ProductSimilar)
+    return len(rows), False
@@ -0,0 +1,180 @@
+from __future__ import annotations
+
+from collections import Counter, defaultdict
+from datetime import date
+from decimal import Decimal
+from typing import Iterable
+
+from django.db import transaction
+from django.db.models import DecimalField, F, Q, Sum, Value
+from django.db.models.functions import Coalesce, ExtractMonth, ExtractYear, Greatest
+from django.utils import timezone
+
+from api.cache import bump_version
+from api.locks import advisory_lock
+from store.models import Product, ProductStats, Review, VendorDailyStats
+
+
+COUNTER_FIELDS = ("rating_sum", "rating_count", "order_count", "wishlist_count", "view_count")
+VENDOR_COUNTERS = ("orders", "items", "qty")
+VENDOR_AMOUNTS = ("revenue", "shipping", "saved")
+ZERO = Decimal("0.00")
+# Taken shared by record_vendor_sales and exclusive by `manage.py rebuild_vendor_stats`.
+VENDOR_STATS_LOCK = "store.vendor_stats"
+MONEY = DecimalField(max_digits=14, decimal_places=2)
+
+
+def ensure_stats_rows(product_ids: Iterable[int]) -> None:
+    """Create missing ProductStats rows (no-op for rows that already exist)."""
+    ids = {pid for pid in product_ids if pid}
+    if ids:
+        ProductStats.objects.bulk_create(
+            [ProductStats(product_id=pid) for pid in ids],
+            ignore_conflicts=True,
+        )
+
+
+def bump(product_ids: Iterable[int], **deltas: int) -> int:
+    """Atomically add ``deltas`` to the counters of every product in ``product_ids``.
+
+    Negative deltas are clamped so a counter never drops below zero. Rows are only
+    created for increments; a decrement never resurrects the row of a product that
+    is being deleted. F() updates send no signals, so the ProductStats cache
+    version is bumped here.
+    """
+    ids = [pid for pid in set(product_ids) if pid]
+    deltas = {name: value for name, value in deltas.items() if value}
+    if not ids or not deltas:
+        return 0
+
+    unknown = set(deltas) - set(COUNTER_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown product stats counters: {sorted(unknown)}")
+
+    if any(value > 0 for value in deltas.values()):
+        ensure_stats_rows(ids)
+    updates = {
+        name: F(name) + value if value > 0 else Greatest(F(name) + value, 0)
+        for name, value in deltas.items()
+    }
+    updated = ProductStats.objects.filter(product_id__in=ids).update(updated_at=timezone.now(), **updates)
+    bump_version(ProductStats)
+    return updated
+
+
+def sync_product_rating(product_ids: Iterable[int]) -> None:
+    """Copy the average rating from ProductStats onto the legacy ``Product.rating`` column."""
+    ids = {pid for pid in product_ids if pid}
+    for stats in ProductStats.objects.filter(product_id__in=ids).only("product_id", "rating_sum", "rating_count"):
+        Product.objects.filter(pk=stats.product_id).update(rating=int(stats.rating_average()))
+
+
+def record_review_change(old: tuple[int | None, int | None] | None, new: tuple[int | None, int | None] | None) -> None:
+    """Apply a review insert/update/delete given ``(product_id, rating)`` before and after."""
+    bump_version(Review)
+    old_product, old_rating = old or (None, None)
+    new_product, new_rating = new or (None, None)
+    old_rating = old_rating or 0
+    new_rating = new_rating or 0
+
+    if old_product == new_product:
+        if old_product and old_rating != new_rating:
+            bump([old_product], rating_sum=new_rating - old_rating)
+            sync_product_rating([old_product])
+        return
+
+    if old_product:
+        bump([old_product], rating_sum=-old_rating, rating_count=-1)
+    if new_product:
+        bump([new_product], rating_sum=new_rating, rating_count=1)
+    sync_product_rating([old_product, new_product])
+
+
+def record_paid_order_items(order_items) -> None:
+    """Count the items of a newly paid order, one UPDATE per distinct quantity."""
+    per_product = Counter(item.product_id for item in order_items if item.product_id)
+    by_delta: dict[int, list[int]] = defaultdict(list)
+    for product_id, count in per_product.items():
+        by_delta[count].append(product_id)
+    for count, product_ids in by_delta.items():
+        bump(product_ids, order_count=count)
+
+
+def vendor_sales(order_items) -> dict[int, dict]:
+    """Per-vendor counters and amounts of one order's items."""
+    sales: dict[int, dict] = {}
+    for item in order_items:
+        if item.vendor_id is None:
+            continue
+        row = sales.setdefault(item.vendor_id, {"orders": 1, "items": 0, "qty": 0, "revenue": ZERO, "shipping": ZERO, "saved": ZERO})
+        row["items"] += 1
+        row["qty"] += item.qty or 0
+        row["revenue"] += Decimal(item.sub_total or 0) + Decimal(item.shipping_amount or 0)
+        row["shipping"] += Decimal(item.shipping_amount or 0)
+        row["saved"] += Decimal(item.saved or 0)
+    return sales
+
+
+def record_vendor_sales(order, order_items) -> None:
+    """Add a newly paid order to the day it was placed on, one UPDATE per vendor in it.
+
+    Call it in the transaction that marks the order paid: it holds
+    VENDOR_STATS_LOCK shared until that commits, so a rebuild never reads the
+    orders between the payment and its increments.
+    """
+    sales = vendor_sales(order_items)
+    if not sales:
+        return
+
+    day = timezone.localdate(order.date)
+    with transaction.atomic():
+        advisory_lock(VENDOR_STATS_LOCK, shared=True)
+        VendorDailyStats.objects.bulk_create(
+            [VendorDailyStats(vendor_id=vendor_id, day=day) for vendor_id in sorted(sales)],
+            ignore_conflicts=True,
+        )
+        now = timezone.now()
+        for vendor_id, row in sorted(sales.items()):
+            VendorDailyStats.objects.filter(vendor_id=vendor_id, day=day).update(
+                updated_at=now,
+                **{name: F(name) + value for name, value in row.items()},
+            )
+
+
+def _vendor_sums(prefix: str = "", recent_since: date | None = None) -> dict:
+    sums = {prefix + name: Coalesce(Sum(name), 0) for name in VENDOR_COUNTERS}
+    sums.update({prefix + name: Coalesce(Sum(name), Value(ZERO), output_field=MONEY) for name in VENDOR_AMOUNTS})
+    if recent_since is not None:
+        sums["recent_revenue"] = Coalesce(
+            Sum("revenue", filter=Q(day__gte=recent_since)), Value(ZERO), output_field=MONEY
+        )
+    return sums
+
+
+def vendor_totals(vendor_id: int, recent_since: date | None = None) -> dict:
+    """Lifetime ``total_<column>`` sums of a vendor in one query over its daily rows.
+
+    With ``recent_since`` the result also holds ``recent_revenue``, the revenue
+    of the days from that date on.
+    """
+    sums = _vendor_sums("total_", recent_since)
+    return VendorDailyStats.objects.filter(vendor_id=vendor_id).aggregate(**sums)
+
+
+def vendor_monthly(vendor_id: int, year: int | None = None, recent_since: date | None = None):
+    """Totals of a vendor per calendar month, oldest first.
+
+    Rows carry ``year`` and ``month`` and the sums as ``total_<column>``, since
+    aggregates may not reuse the column names; ``recent_since`` adds
+    ``recent_revenue`` as in ``vendor_totals``.
+    """
+    rows = VendorDailyStats.objects.filter(vendor_id=vendor_id)
+    if year is not None:
+        rows = rows.filter(day__year=year)
+    return (
+        rows.annotate(year=ExtractYear("day"), month=ExtractMonth("day"))
+        .order_by()
+        .values("year", "month")
+        .annotate(**_vendor_sums("total_", recent_since))
+        .order_by("year", "month")
+    )
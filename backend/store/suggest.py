@@ -0,0 +1,265 @@
+from __future__ import annotations
+
+import bisect
+import heapq
+import re
+import threading
+from dataclasses import asdict, dataclass
+from typing import Iterable
+
+from django.db import transaction
+
+from api.cache import get_versions, incr_versions
+from store.models import Category, Product
+
+
+# Shared generation (an api.CacheVersion row); every process rebuilds its index when it moves.
+GENERATION_NAME = "store.suggest"
+WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+@dataclass(frozen=True)
+class Suggestion:
+    type: str
+    id: int | None
+    slug: str | None
+    title: str
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+
+def normalize(text: str | None) -> str:
+    return " ".join(WORD_RE.findall((text or "").lower()))
+
+
+def _keys_for(title: str) -> list[str]:
+    # Every word-suffix of the title, so "iphone 15 pro" matches "15" and "pro" too.
+    # The first key is the whole title.
+    words = normalize(title).split(" ")
+    return [" ".join(words[i:]) for i in range(len(words)) if words[i]]
+
+
+def _rank(suggestion: Suggestion) -> tuple:
+    return len(suggestion.title), suggestion.title
+
+
+def _prefix_range(keys: list[tuple[str, tuple]], prefix: str) -> tuple[int, int]:
+    """Bounds of the ``keys`` that start with ``prefix``."""
+    return bisect.bisect_left(keys, (prefix,)), bisect.bisect_left(keys, (prefix + "\U0010ffff",))
+
+
+class SuggestIndex:
+    """Sorted arrays of title keys answered with binary search.
+
+    Whole titles are kept apart from their later word-suffixes, in one array
+    per title length, so the shortest titles that start with the prefix are
+    found first however many other words match it.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._titles: dict[int, list[tuple[str, tuple]]] = {}
+        self._suffixes: list[tuple[str, tuple]] = []
+        self._entries: dict[tuple, Suggestion] = {}
+        self._product_brands: dict[int, str] = {}
+        self._brand_refs: dict[str, int] = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    @classmethod
+    def build(cls, products: Iterable[tuple], categories: Iterable[tuple]) -> "SuggestIndex":
+        """Index ``(id, slug, title, brand)`` products and ``(id, slug, title)`` categories.
+
+        Every key is collected first and sorted once, instead of inserted one
+        at a time into the sorted list.
+        """
+        index = cls()
+        entries = index._entries
+        for product_id, slug, title, brand in products:
+            entries[("product", product_id)] = Suggestion("product", product_id, slug, title)
+            name = normalize(brand)
+            if name:
+                index._product_brands[product_id] = name
+                index._brand_refs[name] = index._brand_refs.get(name, 0) + 1
+                if index._brand_refs[name] == 1:
+                    entries[("brand", name)] = Suggestion("brand", None, None, brand.strip())
+        for category_id, slug, title in categories:
+            entries[("category", category_id)] = Suggestion("category", category_id, slug, title)
+        for entry_key, suggestion in entries.items():
+            for array, key in index._placed(suggestion.title):
+                array.append((key, entry_key))
+        for array in index._titles.values():
+            array.sort()
+        index._suffixes.sort()
+        return index
+
+    def _placed(self, title: str) -> list[tuple[list, str]]:
+        """``(array, key)`` for every key of ``title``: the whole title, then its suffixes."""
+        keys = _keys_for(title)
+        titles = self._titles.setdefault(len(title), [])
+        return [(titles, key) for key in keys[:1]] + [(self._suffixes, key) for key in keys[1:]]
+
+    def _add_entry(self, entry_key: tuple, suggestion: Suggestion) -> None:
+        self._remove_entry(entry_key)
+        self._entries[entry_key] = suggestion
+        for array, key in self._placed(suggestion.title):
+            bisect.insort(array, (key, entry_key))
+
+    def _remove_entry(self, entry_key: tuple) -> None:
+        suggestion = self._entries.pop(entry_key, None)
+        if suggestion is None:
+            return
+        for array, key in self._placed(suggestion.title):
+            i = bisect.bisect_left(array, (key, entry_key))
+            if i < len(array) and array[i] == (key, entry_key):
+                del array[i]
+        if not self._titles[len(suggestion.title)]:
+            del self._titles[len(suggestion.title)]
+
+    def _set_product_brand(self, product_id: int, brand: str | None) -> None:
+        old = self._product_brands.pop(product_id, None)
+        if old:
+            self._brand_refs[old] -= 1
+            if not self._brand_refs[old]:
+                del self._brand_refs[old]
+                self._remove_entry(("brand", old))
+        new = normalize(brand)
+        if new:
+            self._product_brands[product_id] = new
+            self._brand_refs[new] = self._brand_refs.get(new, 0) + 1
+            if self._brand_refs[new] == 1:
+                self._add_entry(("brand", new), Suggestion("brand", None, None, brand.strip()))
+
+    def put_product(self, product_id: int, slug: str | None, title: str, brand: str | None) -> None:
+        with self._lock:
+            self._add_entry(("product", product_id), Suggestion("product", product_id, slug, title))
+            self._set_product_brand(product_id, brand)
+
+    def remove_product(self, product_id: int) -> None:
+        with self._lock:
+            self._remove_entry(("product", product_id))
+            self._set_product_brand(product_id, None)
+
+    def put_category(self, category_id: int, slug: str | None, title: str) -> None:
+        with self._lock:
+            self._add_entry(("category", category_id), Suggestion("category", category_id, slug, title))
+
+    def remove_category(self, category_id: int) -> None:
+        with self._lock:
+            self._remove_entry(("category", category_id))
+
+    def lookup(self, prefix: str, limit: int = 8) -> list[Suggestion]:
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+
+        with self._lock:
+            # Titles that start with the prefix, shortest first: one binary search
+            # per title length until enough are found.
+            found: list[Suggestion] = []
+            for length in sorted(self._titles):
+                titles = self._titles[length]
+                lo, hi = _prefix_range(titles, prefix)
+                found += heapq.nsmallest(
+                    limit - len(found), (self._entries[entry_key] for _, entry_key in titles[lo:hi]), key=_rank
+                )
+                if len(found) == limit:
+                    return found
+
+            # Then titles with a later word that starts with it, from a bounded
+            # window so very short prefixes stay cheap.
+            lo, hi = _prefix_range(self._suffixes, prefix)
+            others = {entry_key: self._entries[entry_key] for _, entry_key in self._suffixes[lo:min(hi, lo + limit * 5)]}
+        rest = [s for s in sorted(others.values(), key=_rank) if s not in found]
+        return found + rest[:limit - len(found)]
+
+
+_index: SuggestIndex | None = None
+_generation: int | None = None
+_state_lock = threading.Lock()
+
+
+def _shared_generation() -> int:
+    return get_versions([GENERATION_NAME])[0]
+
+
+def build_index() -> SuggestIndex:
+    products = Product.objects.filter(status="published").values_list("id", "slug", "title", "brand")
+    categories = Category.objects.filter(active=True).values_list("id", "slug", "title")
+    return SuggestIndex.build(products.iterator(chunk_size=2000), categories)
+
+
+def get_index() -> SuggestIndex:
+    """Return this process's index, rebuilding it when another process changed the catalog."""
+    global _index, _generation
+    generation = _shared_generation()
+    if _index is None or _generation != generation:
+        with _state_lock:
+            if _index is None or _generation != generation:
+                _index = build_index()
+                _generation = generation
+    return _index
+
+
+def _publish_change(apply) -> None:
+    """Once the transaction commits, ``apply`` the change to this process's index and bump the generation.
+
+    Nothing is applied or published for a transaction that rolls back, and
+    other processes only rebuild from committed rows. This process adopts the
+    new generation only if no other process moved it meanwhile.
+    """
+
+    def run():
+        global _generation
+        if _index is not None:
+            apply(_index)
+        generation = incr_versions([GENERATION_NAME])[GENERATION_NAME]
+        with _state_lock:
+            if _generation is not None and generation == _generation + 1:
+                _generation = generation
+
+    transaction.on_commit(run, robust=True)
+
+
+def products_changed(products: Iterable[Product]) -> None:
+    """Update the index for ``products`` and tell other processes once for the whole batch."""
+    changes = [(product.pk, product.status == "published", product.slug, product.title, product.brand) for product in products]
+
+    def apply(index: SuggestIndex) -> None:
+        for product_id, published, slug, title, brand in changes:
+            if published:
+                index.put_product(product_id, slug, title, brand)
+            else:
+                index.remove_product(product_id)
+
+    _publish_change(apply)
+
+
+def product_changed(product: Product) -> None:
+    products_changed([product])
+
+
+def product_removed(product_id: int) -> None:
+    _publish_change(lambda index: index.remove_product(product_id))
+
+
+def category_changed(category: Category) -> None:
+    category_id, active, slug, title = category.pk, category.active, category.slug, category.title
+
+    def apply(index: SuggestIndex) -> None:
+        if active:
+            index.put_category(category_id, slug, title)
+        else:
+            index.remove_category(category_id)
+
+    _publish_change(apply)
+
+
+def category_removed(category_id: int) -> None:
+    _publish_change(lambda index: index.remove_category(category_id))
+
+
+def suggest(prefix: str, limit: int = 8) -> list[dict]:
+    return [s.as_dict() for s in get_index().lookup(prefix, limit=limit)]
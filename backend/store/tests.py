@@ -1,3 +1,1010 @@
-from django.test import TestCase
+import importlib
+import json
+import threading
+import time
+import unittest
+from datetime import timedelta
+from decimal import Decimal
+from io import BytesIO, StringIO
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+
+from django.apps import apps
+from django.core import mail
+from django.core.cache import cache
+from django.core.files.storage import FileSystemStorage
+from django.core.mail import EmailMultiAlternatives
+from django.core.management import call_command
+from django.db import DatabaseError, connection, transaction
+from django.db.models import Count, Sum
+from django.forms import modelform_factory
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from addon.models import ConfigSettings, Tax
+from store import (
+    carts, copurchase, inventory, nested_updates, outbox, pageviews, pricing, product_import, similar, stats,
+    suggest,
+)
+from store.search import search_products
+from store.models import (
+    Cart, CartOrder, CartOrderItem, Category, EmailOutbox, Gallery, Product, ProductCoPurchase,
+    ProductSearchDocument, ProductSimilar, ProductStats, Review, Size, StockReservation, VendorDailyStats,
+    Wishlist,
+)
+from store.serializers import CartOrderItemSerializer, CartOrderSerializer
+from store.stats import record_vendor_sales
+from store.views import finalize_order_payment
+from userauths.models import User
+from vendor.models import Vendor
+
+
+# Product images are serialized as presigned URLs; sign them with fixed test credentials.
+S3_SETTINGS = {
+    "AWS_S3_ENDPOINT_URL": "https://abc.supabase.co/storage/v1/s3",
+    "AWS_STORAGE_BUCKET_NAME": "media",
+    "AWS_S3_REGION_NAME": "us-east-1",
+    "AWS_ACCESS_KEY_ID": "AKIDEXAMPLE",
+    "AWS_SECRET_ACCESS_KEY": "wJalrXUtnFEMI/K7MDENG+bPxRfiCYEXAMPLEKEY",
+}
+
+
+@override_settings(**S3_SETTINGS)
+class BrowsePaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create(email="vendor@example.com", username="vendor")
+        vendor = Vendor.objects.create(user=user, name="Shop", email="vendor@example.com")
+        category = Category.objects.create(title="Phones")
+        # More ties on the sort key than DRF's CursorPagination can offset past (1000).
+        Product.objects.bulk_create(
+            Product(
+                title=f"Phone {i}", slug=f"phone-{i}", sku=f"SKU{i:05d}", vendor=vendor, category=category,
+                price=Decimal("10.00"), views=0, rating=0, status="published",
+            )
+            for i in range(1150)
+        )
+        Product.objects.filter(slug="phone-7").update(price=None, views=None, rating=None)
+
+    def setUp(self):
+        cache.clear()
+
+    def pages(self, sort):
+        ids = []
+        url = f"/api/v1/browse/?sort={sort}&page_size=100"
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            ids.extend(row["id"] for row in response.data["results"])
+            url = response.data["next"]
+            self.assertLessEqual(len(ids), 1150)
+        return ids
+
+    def test_pages_through_ties(self):
+        # A NULL price sorts as 0; NULL views tie with the other products' 0.
+        rows = list(Product.objects.values_list("id", "price"))
+        expected = {
+            "price": [pk for pk, price in sorted(rows, key=lambda row: (row[1] or 0, row[0]))],
+            "-price": [pk for pk, price in sorted(rows, key=lambda row: (-(row[1] or 0), -row[0]))],
+            "popular": sorted((pk for pk, _ in rows), reverse=True),
+        }
+        for sort, ids in expected.items():
+            with self.subTest(sort=sort):
+                self.assertEqual(self.pages(sort), ids)
+
+    def test_invalid_cursor(self):
+        response = self.client.get("/api/v1/browse/?sort=price&cursor=bm9wZQ")
+        self.assertEqual(response.status_code, 404)
+
+
+@override_settings(**S3_SETTINGS, CACHE_VERSION_CHECK_INTERVAL=0)
+class ProductDetailCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(email="buyer@example.com", username="buyer")
+        cls.product = Product.objects.create(title="Phone", slug="phone", status="published")
+
+    def setUp(self):
+        cache.clear()
+        # Views would be flushed from another thread, outside the test transaction.
+        patcher = mock.patch.object(pageviews, "product_viewed")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def get(self, etag=None):
+        headers = {"HTTP_IF_NONE_MATCH": etag} if etag else {}
+        return self.client.get("/api/v1/products/phone/", **headers)
+
+    def test_unchanged_product_answers_304(self):
+        etag = self.get()["ETag"]
+        response = self.get(etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+
+    def test_review_changes_invalidate_the_etag(self):
+        first = self.get()
+        self.assertEqual(first.data["rating_count"], 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            review = Review.objects.create(user=self.user, product=self.product, rating=4, review="Good")
+        second = self.get(first["ETag"])
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual((second.data["rating_count"], second.data["product_rating"]), (1, 4))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            review.rating = 2
+            review.save()
+        third = self.get(second["ETag"])
+        self.assertEqual(third.status_code, 200)
+        self.assertEqual(third.data["product_rating"], 2)
+
+
+@override_settings(CACHE_VERSION_CHECK_INTERVAL=0)
+class PricingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        ConfigSettings.objects.create(service_fee_charge_type="percentage", service_fee_percentage=5)
+        Tax.objects.create(country="US", rate=10)
+        cls.product = Product.objects.create(
+            title="Phone", price=Decimal("20.00"), shipping_amount=Decimal("3.00"), stock_qty=10, status="published",
+        )
+        Size.objects.create(product=cls.product, name="XL", price=Decimal("25.00"))
+
+    def quote(self, **line):
+        return pricing.price_line(pricing.CartLine(product=self.product, **line))
+
+    def test_taxes_sub_total_and_shipping(self):
+        # sub_total 40.00, shipping 6.00, tax 10% of 46.00, service fee 5% of 40.00
+        quote = self.quote(qty=2, country="US")
+        self.assertEqual(quote.as_dict(), {
+            "price": Decimal("20.00"), "sub_total": Decimal("40.00"), "shipping_amount": Decimal("6.00"),
+            "tax_fee": Decimal("4.60"), "service_fee": Decimal("2.00"), "total": Decimal("52.60"),
+        })
+
+    def test_size_price_and_untaxed_country(self):
+        quote = self.quote(qty=1, size="XL", country="FR")
+        self.assertEqual((quote.price, quote.tax_fee, quote.total), (Decimal("25.00"), Decimal("0.00"), Decimal("29.25")))
+
+    def test_config_changes_reload_the_config(self):
+        self.assertEqual(self.quote(qty=1, country="US").tax_fee, Decimal("2.30"))
+        with self.captureOnCommitCallbacks(execute=True):
+            tax = Tax.objects.get(country="US")
+            tax.rate = 20
+            tax.save()
+            config = ConfigSettings.objects.get()
+            config.service_fee_charge_type = "flat"
+            config.service_fee_flat_rate = Decimal("1.50")
+            config.save()
+        quote = self.quote(qty=1, country="US")
+        self.assertEqual((quote.tax_fee, quote.service_fee), (Decimal("4.60"), Decimal("1.50")))
+
+    def test_cart_ignores_client_prices(self):
+        payload = {
+            "product": self.product.id, "qty": 2, "country": "US", "size": "No Size", "color": "No Color",
+            "cart_id": "abc", "price": "0.01", "shipping_amount": "0.00",
+        }
+        self.assertEqual(self.client.post("/api/v1/cart-view/", payload).status_code, 201)
+        cart = Cart.objects.get(cart_id="abc")
+        self.assertEqual(
+            (cart.price, cart.sub_total, cart.shipping_amount, cart.tax_fee, cart.service_fee, cart.total),
+            (Decimal("20.00"), Decimal("40.00"), Decimal("6.00"), Decimal("4.60"), Decimal("2.00"), Decimal("52.60")),
+        )
+
+        payload.update(qty=1, price="999.00")
+        self.assertEqual(self.client.post("/api/v1/cart-view/", payload).status_code, 200)
+        cart.refresh_from_db()
+        self.assertEqual((cart.price, cart.total), (Decimal("20.00"), Decimal("26.30")))
+        self.assertEqual(Cart.objects.filter(cart_id="abc").count(), 1)
+
+
+class SuggestIndexTests(SimpleTestCase):
+    def titles(self, index, prefix, limit=8):
+        return [s.title for s in index.lookup(prefix, limit=limit)]
+
+    def test_titles_starting_with_the_prefix_come_first(self):
+        # Many titles with a later word matching "ap" sort ahead of "apple watch".
+        products = [(n, f"case-{n}", f"Case for Apple {n}", None) for n in range(200)]
+        products += [(1000, "apple-watch", "Apple Watch", "Apple"), (1001, "apricot", "Apricot jam", None)]
+        index = suggest.SuggestIndex.build(products, [(1, "apparel", "Apparel")])
+
+        self.assertEqual(
+            self.titles(index, "ap", limit=6),
+            ["Apple", "Apparel", "Apple Watch", "Apricot jam", "Case for Apple 0", "Case for Apple 1"],
+        )
+        self.assertEqual(self.titles(index, "watch"), ["Apple Watch"])
+        self.assertEqual(self.titles(index, "  "), [])
+
+    def test_incremental_changes_match_a_rebuild(self):
+        index = suggest.SuggestIndex.build([(1, "a", "Alpha phone", "Acme")], [])
+        index.put_product(2, "b", "Alpha", "Acme")
+        index.put_product(1, "a", "Beta phone", "Bolt")
+        index.remove_product(2)
+
+        rebuilt = suggest.SuggestIndex.build([(1, "a", "Beta phone", "Bolt")], [])
+        for prefix in ("a", "b", "ph"):
+            self.assertEqual(index.lookup(prefix), rebuilt.lookup(prefix))
+
+    def test_short_prefix_lookup_is_fast(self):
+        words = ["alpha", "apex", "amber", "atlas", "bolt", "core", "delta", "echo", "flux", "nova", "pro", "max"]
+        products = [
+            (n, f"p-{n}", f"{words[n % 12]} {words[n // 12 % 12]} {words[n // 144 % 12]} {n}", words[n % 7])
+            for n in range(20000)
+        ]
+        index = suggest.SuggestIndex.build(products, [])
+        for prefix in ("a", "al", "p", "max"):
+            timings = []
+            for _ in range(5):
+                started = time.perf_counter()
+                index.lookup(prefix)
+                timings.append(time.perf_counter() - started)
+            self.assertLess(min(timings), 0.005, prefix)
+
+
+class NestedUpdateTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.product = Product.objects.create(title="Phone")
+        cls.sizes = [Size.objects.create(product=cls.product, name=name, price=price) for name, price in (("S", 1), ("M", 2))]
+        cls.gallery = [Gallery.objects.create(product=cls.product, image=f"products/{name}.jpg") for name in "ab"]
+
+    def sync(self, prefix, rows):
+        relation = next(relation for relation in nested_updates.RELATIONS if relation.prefix == prefix)
+        data = {f"{prefix}[{i}][{field}]": value for i, row in enumerate(rows) for field, value in row.items()}
+        return nested_updates.sync_relation(self.product, relation, nested_updates.parse_indexed(data, prefix)).as_dict()
+
+    def size_rows(self):
+        return list(Size.objects.filter(product=self.product).order_by("pk").values_list("pk", "name", "price"))
+
+    def test_unchanged_rows_are_not_written(self):
+        rows = [{"id": str(size.pk), "name": size.name, "price": str(size.price)} for size in self.sizes]
+        with CaptureQueriesContext(connection) as queries:
+            result = self.sync("sizes", rows)
+        self.assertEqual(result, {"created": 0, "updated": 0, "deleted": 0})
+        self.assertEqual([q["sql"].split()[0] for q in queries], ["SELECT"])
+
+    def test_renamed_row_is_updated_in_place(self):
+        small, medium = self.sizes
+        result = self.sync("sizes", [
+            {"id": str(small.pk), "name": "Small", "price": "1.00"},
+            {"name": "M", "price": "2.00"},
+        ])
+        self.assertEqual(result, {"created": 0, "updated": 1, "deleted": 0})
+        self.assertEqual(self.size_rows(), [(small.pk, "Small", Decimal("1.00")), (medium.pk, "M", Decimal("2.00"))])
+
+    def test_rows_not_sent_are_deleted(self):
+        result = self.sync("sizes", [{"name": "M", "price": "3.00"}, {"name": "L", "price": "4.00"}])
+        self.assertEqual(result, {"created": 1, "updated": 1, "deleted": 1})
+        self.assertEqual([row[1:] for row in self.size_rows()], [("M", Decimal("3.00")), ("L", Decimal("4.00"))])
+
+    def test_images_still_shown_stay_in_storage(self):
+        first, second = self.gallery
+        with mock.patch.object(FileSystemStorage, "delete") as delete:
+            # The first row takes the second row's image; only "a.jpg" leaves the product.
+            result = self.sync("gallery", [{"id": str(first.pk), "image": "products/b.jpg"}])
+        self.assertEqual(result, {"created": 0, "updated": 1, "deleted": 1})
+        delete.assert_not_called()
+
+        with mock.patch.object(FileSystemStorage, "delete") as delete:
+            result = self.sync("gallery", [{"image": "products/c.jpg"}])
+        self.assertEqual(result, {"created": 1, "updated": 0, "deleted": 1})
+        delete.assert_called_once_with("products/b.jpg")
+
+
+@override_settings(CACHE_VERSION_CHECK_INTERVAL=0)
+class ProductImportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create(email="vendor@example.com", username="vendor")
+        cls.vendor = Vendor.objects.create(user=user, name="Shop", email="vendor@example.com")
+        cls.category = Category.objects.create(title="Lighting", slug="lighting")
+
+    def run_import(self, text, fmt):
+        with self.captureOnCommitCallbacks(execute=True):
+            return product_import.import_products(self.vendor.id, BytesIO(text.encode()), fmt, chunk_size=2).as_dict()
+
+    def test_csv_reports_each_rejected_line(self):
+        report = self.run_import(
+            "title,price,category,sizes\n"
+            'Desk Lamp,12.50,lighting,"[{""name"": ""S"", ""price"": ""1""}]"\n'
+            "Floor Lamp,-1,,\n"
+            "Wall Lamp,5,Garden,\n"
+            "Bulb,2,Lighting,not json\n"
+            ",3,,\n"
+            "Night Lamp,4,,\n",
+            "csv",
+        )
+        self.assertEqual((report["rows"], report["created"], report["failed"]), (6, 2, 4))
+        self.assertEqual(
+            [(error["line"], sorted(error["errors"])) for error in report["errors"]],
+            [(3, ["price"]), (4, ["category"]), (5, ["non_field_errors"]), (6, ["title"])],
+        )
+        lamp = Product.objects.get(title="Desk Lamp")
+        self.assertEqual((lamp.vendor_id, lamp.category_id, lamp.price), (self.vendor.id, self.category.id, Decimal("12.50")))
+        self.assertEqual(list(lamp.size_set.values_list("name", "price")), [("S", Decimal("1.00"))])
+
+    def test_jsonl_rows_get_what_post_save_would_give_them(self):
+        rows = [
+            {"title": "Desk Lamp", "brand": "Lumo", "specifications": [{"title": "Watts", "content": "40"}],
+             "gallery": [{"image": "products/lamp.jpg"}], "colors": [{"name": "Red"}]},
+            {"title": "Draft Lamp", "status": "draft"},
+            {"title": "Night Lamp", "stock_qty": 3},
+        ]
+        text = "\n".join(json.dumps(row) for row in rows) + "\n{broken\n[1]\n"
+        report = self.run_import(text, "jsonl")
+        self.assertEqual((report["rows"], report["created"], report["failed"]), (5, 3, 2))
+        self.assertEqual([error["line"] for error in report["errors"]], [4, 5])
+
+        products = {p.title: p for p in Product.objects.filter(vendor=self.vendor)}
+        self.assertEqual(len({(p.sku, p.pid, p.slug) for p in products.values()}), 3)
+        self.assertTrue(products["Night Lamp"].in_stock)
+        self.assertEqual(ProductStats.objects.filter(product__in=products.values()).count(), 3)
+        self.assertEqual(
+            set(ProductSearchDocument.objects.values_list("product__title", flat=True)), {"Desk Lamp", "Night Lamp"}
+        )
+        lamp = products["Desk Lamp"]
+        self.assertEqual(
+            (lamp.specification_set.get().content, lamp.gallery_set.get().image.name, lamp.color_set.get().name),
+            ("40", "products/lamp.jpg", "Red"),
+        )
+        titles = [s["title"] for s in suggest.suggest("lamp")]
+        self.assertIn("Desk Lamp", titles)
+        self.assertNotIn("Draft Lamp", titles)
+        self.assertIn("Lumo", [s["title"] for s in suggest.suggest("lu")])
+
+    def test_identifiers_are_redrawn_on_collision(self):
+        Product.objects.create(title="Lamp", slug="lamp-aaaa")
+        products = [Product(title="Lamp"), Product(title="Lamp")]
+        # The first draw clashes with the saved product, the redraw with the second row.
+        draws = ["lamp-aaaa", "lamp-bbbb", "lamp-bbbb", "lamp-cccc"]
+        with mock.patch.object(product_import.IdentifierPool, "_slug", side_effect=draws):
+            product_import.IdentifierPool().assign(products)
+        self.assertEqual([p.slug for p in products], ["lamp-cccc", "lamp-bbbb"])
+        self.assertEqual(len({p.sku for p in products} | {p.pid for p in products}), 4)
+
+
+@override_settings(OUTBOX_DRAIN_ON_COMMIT=False)
+class OutboxTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.vendors, items = [], []
+        cls.order = CartOrder.objects.create(payment_status="paid", full_name="Buyer", email="buyer@example.com")
+        for name in ("Lamp", "Chair"):
+            user = User.objects.create(email=f"{name}@example.com", username=name)
+            vendor = Vendor.objects.create(user=user, name=f"{name} Shop", email=f"{name}@example.com")
+            product = Product.objects.create(title=f"{name} Deluxe", vendor=vendor)
+            items.append(CartOrderItem.objects.create(order=cls.order, product=product, vendor=vendor, qty=1))
+            cls.vendors.append(vendor)
+        cls.items = items
+
+    def enqueue(self):
+        outbox.enqueue_order_emails(self.order, CartOrderItem.objects.filter(order=self.order).select_related("vendor"))
+
+    def test_a_retried_payment_queues_each_email_once(self):
+        self.enqueue()
+        self.enqueue()
+        self.assertEqual(
+            sorted(EmailOutbox.objects.values_list("kind", "to_email")),
+            [("customer_order_confirmation", "buyer@example.com"),
+             ("vendor_order_sale", "Chair@example.com"), ("vendor_order_sale", "Lamp@example.com")],
+        )
+
+    def test_each_vendor_is_sent_only_its_own_items(self):
+        self.enqueue()
+        self.assertEqual(outbox.drain(), (3, 0))
+        self.assertEqual(set(EmailOutbox.objects.values_list("status", flat=True)), {"sent"})
+
+        html = {message.to[0]: message.alternatives[0][0] for message in mail.outbox}
+        self.assertIn("Lamp Deluxe", html["Lamp@example.com"])
+        self.assertNotIn("Chair Deluxe", html["Lamp@example.com"])
+        self.assertIn("Chair Deluxe", html["Chair@example.com"])
+        self.assertNotIn("Lamp Deluxe", html["Chair@example.com"])
+        self.assertIn("Lamp Deluxe", html["buyer@example.com"])
+        self.assertIn("Chair Deluxe", html["buyer@example.com"])
+
+    def test_claimed_rows_are_leased(self):
+        self.enqueue()
+        self.assertEqual(len(outbox.claim(2)), 2)
+        self.assertEqual(len(outbox.claim(2)), 1)
+        self.assertEqual(outbox.claim(2), [])
+
+    def test_failures_back_off_exponentially_then_give_up(self):
+        self.assertEqual(
+            [outbox.backoff(n).total_seconds() for n in (1, 2, 3, 4)],
+            [outbox.BACKOFF_BASE * factor for factor in (1, 2, 4, 8)],
+        )
+        self.assertEqual(outbox.backoff(100).total_seconds(), outbox.BACKOFF_MAX)
+
+        self.enqueue()
+        EmailOutbox.objects.exclude(kind="customer_order_confirmation").delete()
+        with mock.patch.object(EmailMultiAlternatives, "send", side_effect=OSError("SMTP down")), \
+                self.assertLogs("store.outbox", "WARNING"):
+            started = timezone.now()
+            self.assertEqual(outbox.drain(), (0, 1))
+            entry = EmailOutbox.objects.get()
+            self.assertEqual((entry.status, entry.attempts, entry.last_error), ("pending", 1, "SMTP down"))
+            self.assertGreaterEqual(entry.next_attempt_at, started + outbox.backoff(1))
+            # Not due yet, so nothing is claimed.
+            self.assertEqual(outbox.drain(), (0, 0))
+
+            EmailOutbox.objects.update(attempts=outbox.MAX_ATTEMPTS - 1, next_attempt_at=timezone.now())
+            self.assertEqual(outbox.drain(), (0, 1))
+        self.assertEqual(EmailOutbox.objects.get().status, "failed")
+        self.assertEqual(mail.outbox, [])
+
+
+@unittest.skipUnless(connection.vendor == "postgresql", "needs SKIP LOCKED")
+class ConcurrentOutboxTests(TransactionTestCase):
+    def test_claim_skips_rows_another_worker_holds(self):
+        order = CartOrder.objects.create(full_name="Buyer")
+        entries = [
+            EmailOutbox.objects.create(kind="customer_order_confirmation", order=order, to_email="b@example.com", dedupe_key=key)
+            for key in "abc"
+        ]
+        claimed = []
+
+        def other_worker():
+            try:
+                claimed.extend(entry.pk for entry in outbox.claim(10))
+            finally:
+                connection.close()
+
+        with transaction.atomic():
+            EmailOutbox.objects.select_for_update().filter(pk=entries[0].pk).get()
+            worker = threading.Thread(target=other_worker)
+            worker.start()
+            worker.join(5)
+            self.assertFalse(worker.is_alive())
+
+        self.assertEqual(sorted(claimed), [entries[1].pk, entries[2].pk])
+
+
+class PageViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create(email="vendor@example.com", username="vendor")
+        cls.vendor = Vendor.objects.create(user=user, name="Shop", email="vendor@example.com", slug="shop")
+        for title in ("Lamp", "Chair"):
+            Product.objects.create(title=title, slug=title.lower(), vendor=cls.vendor)
+
+    def views(self):
+        products = Product.objects.order_by("pk").values_list("slug", "views", "stats__view_count")
+        return list(products), Vendor.objects.get().views
+
+    def test_write_adds_to_products_stats_and_vendors(self):
+        pageviews.write({"lamp": 3, "chair": 2, "gone": 5}, {"shop": 4})
+        pageviews.write({"lamp": 1}, {})
+        self.assertEqual(self.views(), ([("lamp", 4, 4), ("chair", 2, 2)], 4))
+
+    def test_buffered_views_are_written_once(self):
+        for slug in ("lamp", "lamp", "chair", None):
+            pageviews.product_viewed(slug)
+        pageviews.vendor_viewed("shop")
+        self.assertEqual(pageviews.flush(), 4)
+        self.assertEqual(pageviews.flush(), 0)
+        self.assertEqual(self.views(), ([("lamp", 2, 2), ("chair", 1, 1)], 1))
+
+    def test_failed_writes_are_buffered_again(self):
+        pageviews.product_viewed("lamp")
+        with mock.patch.object(pageviews, "write", side_effect=DatabaseError("down")), \
+                mock.patch.object(pageviews, "_arm_timer") as arm:
+            with self.assertRaises(DatabaseError):
+                pageviews.flush()
+        arm.assert_called_once_with()
+        pageviews.product_viewed("lamp")
+        self.assertEqual(pageviews.flush(), 2)
+        self.assertEqual(self.views()[0][0], ("lamp", 2, 2))
+
+    def test_idle_worker_flushes_after_the_interval(self):
+        flushed = threading.Event()
+        with mock.patch.object(pageviews, "FLUSH_INTERVAL", 0.05), \
+                mock.patch.object(pageviews, "schedule_flush", side_effect=flushed.set):
+            pageviews.product_viewed("lamp")
+            pageviews.product_viewed("chair")
+            # No further views arrive; the timer armed by the first one still fires.
+            self.assertTrue(flushed.wait(2))
+        self.assertEqual(pageviews.flush(), 2)
+
+
+class SimilarProductsTests(TestCase):
+    def neighbours(self):
+        rows = ProductSimilar.objects.order_by("product_id", "-score", "other_id").values_list("product_id", "other_id")
+        found = {}
+        for product_id, other_id in rows:
+            found.setdefault(product_id, []).append(other_id)
+        return found
+
+    def test_neighbours_are_ranked_by_shared_terms(self):
+        index = similar.vectorize([
+            (1, {"title": "red wool scarf"}),
+            (2, {"title": "red wool hat"}),
+            (3, {"title": "red cotton shirt", "description": "scarf"}),
+            (4, {"title": "steel kettle"}),
+        ])
+        found = {}
+        for product_id, other_id, score in similar.top_neighbours(index, np.arange(len(index)), k=3):
+            found.setdefault(product_id, []).append((other_id, round(score, 4)))
+        self.assertEqual([other for other, _ in found[1]], [2, 3])
+        self.assertEqual([other for other, _ in found[2]], [1, 3])
+        self.assertNotIn(4, found)
+        # Cosine similarity is symmetric.
+        self.assertEqual(dict(found[1])[2], dict(found[2])[1])
+
+    def test_incremental_refresh_matches_a_full_rebuild(self):
+        words = ["oak", "pine", "desk", "chair", "lamp", "shelf", "table", "stool"]
+        products = [
+            Product.objects.create(title=f"{words[n % 8]} {words[(n * 3 + 1) % 8]} {words[(n * 5 + 2) % 8]}")
+            for n in range(12)
+        ]
+        self.assertEqual(similar.refresh(k=3, full=True), (12, True))
+
+        products[4].title = "pine shelf lamp"
+        products[4].save()
+        count, full = similar.refresh(k=3)
+        self.assertFalse(full)
+        self.assertLess(count, 12)
+        incremental = self.neighbours()
+
+        similar.refresh(k=3, full=True)
+        self.assertEqual(incremental, self.neighbours())
+        self.assertEqual(similar.refresh(k=3), (0, False))
+
+
+class FieldPlanTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.order = CartOrder.objects.create(full_name="Buyer")
+        for n in range(4):
+            user = User.objects.create(email=f"vendor{n}@example.com", username=f"vendor{n}")
+            vendor = Vendor.objects.create(user=user, name=f"Shop {n}", email=user.email)
+            category = Category.objects.create(title=f"Category {n}")
+            product = Product.objects.create(title=f"Product {n}", vendor=vendor, category=category)
+            CartOrderItem.objects.create(order=cls.order, product=product, vendor=vendor, qty=1)
+        cls.small_order = CartOrder.objects.create(full_name="Buyer")
+        CartOrderItem.objects.create(order=cls.small_order, product=product, vendor=vendor, qty=1)
+
+    def context(self, method):
+        return {"request": Request(getattr(APIRequestFactory(), method.lower())("/"))}
+
+    def test_plans_leave_meta_alone(self):
+        for method in ("GET", "POST"):
+            CartOrderItemSerializer(CartOrderItem.objects.first(), context=self.context(method)).data
+        self.assertNotIn("depth", vars(CartOrderItemSerializer.Meta))
+        self.assertNotIn("depth", vars(CartOrderSerializer.Meta))
+
+    def test_post_requests_get_the_flat_write_plan(self):
+        read = CartOrderItemSerializer(context=self.context("GET")).fields
+        write = CartOrderItemSerializer(context=self.context("POST")).fields
+        self.assertIsInstance(read["product"], serializers.ModelSerializer)
+        self.assertIsInstance(read["product"].fields["vendor"], serializers.ModelSerializer)
+        self.assertIsInstance(write["product"], serializers.PrimaryKeyRelatedField)
+
+        plan = CartOrderItemSerializer.get_plan()
+        self.assertTrue({"order", "product", "product__vendor", "product__category", "vendor"} <= set(plan.select_related))
+        self.assertEqual(CartOrderItemSerializer.get_plan("write").select_related, ())
+
+    def test_queries_do_not_grow_with_the_rows(self):
+        def queries(serializer_class, instance, **kwargs):
+            with CaptureQueriesContext(connection) as captured:
+                serializer_class(instance, context=self.context("GET"), **kwargs).data
+            return len(captured)
+
+        # A queryset gets the plan's joins and prefetches, whatever its length.
+        self.assertEqual(
+            queries(CartOrderItemSerializer, CartOrderItem.objects.filter(order=self.small_order), many=True),
+            queries(CartOrderItemSerializer, CartOrderItem.objects.filter(order=self.order), many=True),
+        )
+        # A loaded object gets one query per relation level, whatever the number of rows.
+        self.assertEqual(
+            queries(CartOrderSerializer, CartOrder.objects.get(pk=self.small_order.pk)),
+            queries(CartOrderSerializer, CartOrder.objects.get(pk=self.order.pk)),
+        )
+
+
+class ProductStatsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        vendor = Vendor.objects.create(name="Shop")
+        category = Category.objects.create(title="Phones")
+        cls.products = [
+            Product.objects.create(title=f"Phone {n}", vendor=vendor, category=category, views=10 * n)
+            for n in range(3)
+        ]
+        cls.users = [User.objects.create(email=f"u{n}@example.com", username=f"u{n}") for n in range(3)]
+
+    def expected(self):
+        """Recompute every product's counters from the source tables."""
+        ratings = {
+            row["product_id"]: (row["rating_sum"], row["rating_count"])
+            for row in Review.objects.order_by().values("product_id")
+            .annotate(rating_sum=Sum("rating"), rating_count=Count("id"))
+        }
+        orders = dict(
+            CartOrderItem.objects.filter(order__payment_status="paid").order_by().values("product_id")
+            .annotate(count=Count("id")).values_list("product_id", "count")
+        )
+        wishlists = dict(
+            Wishlist.objects.order_by().values("product_id")
+            .annotate(count=Count("id")).values_list("product_id", "count")
+        )
+        return {
+            product.pk: (
+                *ratings.get(product.pk, (0, 0)),
+                orders.get(product.pk, 0),
+                wishlists.get(product.pk, 0),
+            )
+            for product in self.products
+        }
+
+    def counters(self):
+        return {
+            row[0]: row[1:]
+            for row in ProductStats.objects.filter(product__in=self.products)
+            .values_list("product_id", "rating_sum", "rating_count", "order_count", "wishlist_count")
+        }
+
+    def make_changes(self):
+        first, second, third = self.products
+        reviews = [
+            Review.objects.create(user=user, product=first, review="ok", rating=rating)
+            for user, rating in zip(self.users, (5, 3, 1))
+        ]
+        reviews[0].rating = 2
+        reviews[0].save()
+        reviews[1].product = second
+        reviews[1].save()
+        reviews[2].delete()
+
+        for user in self.users:
+            Wishlist.objects.create(user=user, product=first)
+        Wishlist.objects.create(user=self.users[0], product=third)
+        Wishlist.objects.filter(product=first, user=self.users[1]).delete()
+
+        order = CartOrder.objects.create(full_name="Buyer", payment_status="paid")
+        items = [
+            CartOrderItem.objects.create(order=order, product=product, vendor=product.vendor, qty=1)
+            for product in (first, first, third)
+        ]
+        stats.record_paid_order_items(items)
+        # Unpaid orders count neither here nor in the backfill.
+        CartOrderItem.objects.create(order=CartOrder.objects.create(full_name="Buyer"), product=second, qty=1)
+
+    def test_counters_match_the_source_tables(self):
+        self.make_changes()
+        expected = self.expected()
+        self.assertEqual(expected[self.products[0].pk], (2, 1, 2, 2))
+        self.assertEqual(self.counters(), expected)
+        ratings = dict(Product.objects.filter(pk__in=expected).values_list("pk", "rating"))
+        self.assertEqual(ratings, {self.products[0].pk: 2, self.products[1].pk: 3, self.products[2].pk: 0})
+
+    def test_backfill_recomputes_the_counters(self):
+        self.make_changes()
+        expected = self.expected()
+        ProductStats.objects.update(rating_sum=99, rating_count=7, order_count=5, wishlist_count=4, view_count=0)
+
+        migration = importlib.import_module("store.migrations.0042_backfill_product_stats")
+        migration.backfill_product_stats(apps, None)
+
+        self.assertEqual(self.counters(), expected)
+        self.assertEqual(
+            dict(ProductStats.objects.filter(product__in=self.products).values_list("product_id", "view_count")),
+            {product.pk: product.views for product in self.products},
+        )
+
+
+class InventoryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create(email="vendor@example.com", username="vendor")
+        cls.vendor = Vendor.objects.create(user=user, name="Shop", email="vendor@example.com")
+        cls.products = [
+            Product.objects.create(
+                title=f"Phone {i}", vendor=cls.vendor, price=Decimal("10.00"),
+                shipping_amount=Decimal("0.00"), stock_qty=5, status="published",
+            )
+            for i in range(2)
+        ]
+
+    def checkout(self, cart_id, *qtys):
+        for product, qty in zip(self.products, qtys):
+            Cart.objects.create(cart_id=cart_id, product=product, qty=qty, price=product.price)
+        return self.client.post("/api/v1/create-order/", {
+            "full_name": "Buyer", "email": "buyer@example.com", "mobile": "1", "address": "a",
+            "city": "c", "state": "s", "country": "US", "cart_id": cart_id, "user_id": "0",
+        })
+
+    def stock(self):
+        return list(
+            Product.objects.filter(pk__in=[p.pk for p in self.products]).order_by("pk").values_list("stock_qty", "reserved_qty")
+        )
+
+    def test_checkout_holds_and_payment_commits(self):
+        response = self.checkout("a", 3, 2)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.stock(), [(5, 3), (5, 2)])
+
+        order = CartOrder.objects.get(oid=response.data["order_oid"])
+        finalize_order_payment(order)
+        self.assertEqual(self.stock(), [(2, 0), (3, 0)])
+        self.assertEqual(set(order.reservations.values_list("status", flat=True)), {"committed"})
+
+    @override_settings(CACHE_VERSION_CHECK_INTERVAL=60)
+    def test_checkout_reuses_the_products_loaded_with_the_cart(self):
+        for product, qty in zip(self.products, (1, 2)):
+            Cart.objects.create(cart_id="a", product=product, qty=qty, price=product.price)
+        pricing.get_config()
+        # buyer, cart with products, order, items, vendors, stock check, hold,
+        # reservations and the savepoints around the order and the hold.
+        with self.assertNumQueries(12):
+            response = self.client.post("/api/v1/create-order/", {
+                "full_name": "Buyer", "email": "buyer@example.com", "mobile": "1", "address": "a",
+                "city": "c", "state": "s", "country": "US", "cart_id": "a", "user_id": "0",
+            })
+        self.assertEqual(response.status_code, 201)
+
+    def test_checkout_short_of_unreserved_stock_is_rolled_back(self):
+        self.assertEqual(self.checkout("a", 4, 0).status_code, 201)
+        orders = CartOrder.objects.count()
+
+        response = self.checkout("b", 2, 1)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual([error["reason"] for error in response.data["errors"]], ["out_of_stock"])
+        self.assertEqual(CartOrder.objects.count(), orders)
+        self.assertEqual(self.stock(), [(5, 4), (5, 0)])
+
+    def test_sweeper_releases_expired_holds(self):
+        response = self.checkout("a", 3, 1)
+        order = CartOrder.objects.get(oid=response.data["order_oid"])
+        StockReservation.objects.filter(order=order).update(expires_at=timezone.now() - timedelta(seconds=1))
+
+        call_command("release_reservations", stdout=StringIO())
+        self.assertEqual(self.stock(), [(5, 0), (5, 0)])
+        self.assertEqual(set(order.reservations.values_list("status", flat=True)), {"released"})
+
+        # Paid after its hold expired: the units are still sold.
+        finalize_order_payment(order)
+        self.assertEqual(self.stock(), [(2, 0), (4, 0)])
+
+    def test_counters_are_not_form_fields(self):
+        # Holds and views change only through F() updates, never from a submitted form.
+        self.assertFalse({"reserved_qty", "views"} & set(modelform_factory(Product, fields="__all__").base_fields))
+        self.assertNotIn("views", modelform_factory(Vendor, fields="__all__").base_fields)
+
+
+@unittest.skipUnless(connection.vendor == "postgresql", "needs row locks")
+class ConcurrentHoldTests(TransactionTestCase):
+    def test_only_one_of_two_overlapping_holds_gets_the_last_units(self):
+        user = User.objects.create(email="vendor@example.com", username="vendor")
+        vendor = Vendor.objects.create(user=user, name="Shop", email="vendor@example.com")
+        product = Product.objects.create(title="Phone", vendor=vendor, price=Decimal("10.00"), stock_qty=3)
+        orders = [CartOrder.objects.create(full_name=name) for name in "ab"]
+        lines = [SimpleNamespace(product_id=product.pk, qty=2)]
+        results = {}
+        first_holds = threading.Event()
+
+        def hold(order, linger):
+            try:
+                with transaction.atomic():
+                    results[order.full_name] = inventory.reserve(order, lines)
+                    if linger:
+                        first_holds.set()
+                        time.sleep(0.5)
+            finally:
+                connection.close()
+
+        first = threading.Thread(target=hold, args=(orders[0], True))
+        first.start()
+        first_holds.wait(5)
+        second = threading.Thread(target=hold, args=(orders[1], False))
+        second.start()
+        first.join()
+        second.join()
+
+        self.assertEqual(results, {"a": [], "b": [product.pk]})
+        product.refresh_from_db()
+        self.assertEqual(product.reserved_qty, 2)
+        self.assertEqual(StockReservation.objects.filter(status="held").count(), 1)
+
+
+class CartPurgeTests(TestCase):
+    def test_last_purge_is_read_from_the_database(self):
+        self.assertIsNone(carts.cart_metrics()["last_purge"])
+        product = Product.objects.create(title="Phone")
+        for cart_id in "abc":
+            Cart.objects.create(cart_id=cart_id, product=product, qty=1)
+        Cart.objects.filter(cart_id__in="ab").update(expires_at=timezone.now() - timedelta(seconds=1))
+
+        carts.purge_expired(batch_size=1)
+        # Another worker's cache never held it.
+        cache.clear()
+        metrics = carts.cart_metrics()
+        self.assertEqual((metrics["rows"], metrics["expired_rows"]), (1, 0))
+        self.assertEqual(
+            {key: metrics["last_purge"][key] for key in ("deleted", "batches")}, {"deleted": 2, "batches": 2}
+        )
+
+
+class CoPurchaseTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.products = [Product.objects.create(title=f"Phone {i}", status="published") for i in range(4)]
+        a, b, c, d = cls.products
+        for basket in ([a, b], [a, b, c], [a, c], [a, d], [b, d], [c]):
+            order = CartOrder.objects.create(payment_status="paid")
+            CartOrderItem.objects.bulk_create(CartOrderItem(order=order, product=product) for product in basket)
+        unpaid = CartOrder.objects.create(payment_status="processing")
+        CartOrderItem.objects.bulk_create(CartOrderItem(order=unpaid, product=product) for product in (c, d))
+
+    def pairs(self):
+        position = {product.pk: i for i, product in enumerate(self.products)}
+        return {
+            (position[product_id], position[other_id]): count
+            for product_id, other_id, count in ProductCoPurchase.objects.values_list("product_id", "other_id", "count")
+        }
+
+    def test_rebuild_keeps_the_top_k_with_ties_to_the_lower_id(self):
+        self.assertEqual(copurchase.rebuild(k=2), 8)
+        self.assertEqual(self.pairs(), {
+            (0, 1): 2, (0, 2): 2, (1, 0): 2, (1, 2): 1, (2, 0): 2, (2, 1): 1, (3, 0): 1, (3, 1): 1,
+        })
+
+    def test_record_order_adds_to_the_rebuilt_counts(self):
+        copurchase.rebuild(k=2)
+        copurchase.record_order([self.products[3].pk, self.products[2].pk, self.products[3].pk])
+        pairs = self.pairs()
+        self.assertEqual((pairs[(2, 3)], pairs[(3, 2)]), (1, 1))
+        self.assertEqual(pairs[(0, 1)], 2)
+
+
+@unittest.skipUnless(connection.vendor == "postgresql", "needs row and advisory locks")
+class ConcurrentCoPurchaseTests(TransactionTestCase):
+    def setUp(self):
+        self.products = [Product.objects.create(title=f"Phone {i}") for i in range(4)]
+
+    def test_overlapping_orders_keep_every_count(self):
+        ids = [p.pk for p in self.products]
+        errors = []
+
+        def pay(basket):
+            try:
+                for _ in range(10):
+                    copurchase.record_order(basket)
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=pay, args=(ids[::step],)) for step in (1, -1, 1, -1)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(set(ProductCoPurchase.objects.values_list("count", flat=True)), {40})
+
+    def test_rebuild_waits_for_a_payment_recording_its_pairs(self):
+        a, b = self.products[:2]
+        order = CartOrder.objects.create(payment_status="processing")
+        CartOrderItem.objects.bulk_create(CartOrderItem(order=order, product=product) for product in (a, b))
+        recorded = threading.Event()
+
+        def pay():
+            try:
+                with transaction.atomic():
+                    CartOrder.objects.filter(pk=order.pk).update(payment_status="paid")
+                    copurchase.record_order([a.pk, b.pk])
+                    recorded.set()
+                    time.sleep(0.5)
+            finally:
+                connection.close()
+
+        payment = threading.Thread(target=pay)
+        payment.start()
+        recorded.wait(5)
+        copurchase.rebuild()
+        payment.join()
+
+        self.assertEqual(dict(ProductCoPurchase.objects.values_list("product_id", "count")), {a.pk: 1, b.pk: 1})
+
+
+class VendorStatsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create(email="vendor@example.com", username="vendor")
+        cls.vendor = Vendor.objects.create(user=user, name="Shop", email="vendor@example.com")
+        cls.product = Product.objects.create(title="Phone", vendor=cls.vendor)
+
+    def pay(self, qty, status="paid"):
+        order = CartOrder.objects.create(payment_status=status)
+        CartOrderItem.objects.create(
+            order=order, product=self.product, vendor=self.vendor, qty=qty,
+            sub_total=Decimal("10.00") * qty, shipping_amount=Decimal("1.00"),
+        )
+        return order
+
+    def days(self):
+        return list(VendorDailyStats.objects.order_by("day").values_list("day", "orders", "qty", "revenue"))
+
+    def test_rebuild_upserts_and_drops_days_without_orders(self):
+        self.pay(2)
+        self.pay(1)
+        today = timezone.localdate()
+        VendorDailyStats.objects.create(vendor=self.vendor, day=today, orders=1, qty=1)
+        stale = VendorDailyStats.objects.create(vendor=self.vendor, day=today - timedelta(days=3), orders=4)
+        row = VendorDailyStats.objects.get(day=today).pk
+
+        call_command("rebuild_vendor_stats", stdout=StringIO())
+        self.assertEqual(self.days(), [(today, 2, 3, Decimal("32.00"))])
+        self.assertEqual(VendorDailyStats.objects.get().pk, row)
+        self.assertFalse(VendorDailyStats.objects.filter(pk=stale.pk).exists())
+
+    def test_payment_adds_to_the_rebuilt_day(self):
+        self.pay(2)
+        call_command("rebuild_vendor_stats", stdout=StringIO())
+        order = self.pay(1, status="processing")
+        with transaction.atomic():
+            record_vendor_sales(order, list(order.orderitem.all()))
+        self.assertEqual(self.days(), [(timezone.localdate(), 2, 3, Decimal("32.00"))])
+
+    def test_order_chart_counts_paid_orders(self):
+        self.pay(2)
+        self.pay(1, status="processing")
+        call_command("rebuild_vendor_stats", stdout=StringIO())
+
+        today = timezone.localdate()
+        response = self.client.get(f"/api/v1/vendor-orders-report-chart/{self.vendor.id}/")
+        self.assertEqual(response.json(), [{"year": today.year, "month": today.month, "orders": 1}])
+
+
+@unittest.skipUnless(connection.vendor == "postgresql", "needs advisory locks")
+class ConcurrentVendorStatsTests(TransactionTestCase):
+    def test_rebuild_waits_for_a_payment_recording_its_sales(self):
+        user = User.objects.create(email="vendor@example.com", username="vendor")
+        vendor = Vendor.objects.create(user=user, name="Shop", email="vendor@example.com")
+        product = Product.objects.create(title="Phone", vendor=vendor)
+        earlier = CartOrder.objects.create(payment_status="paid")
+        CartOrderItem.objects.create(order=earlier, product=product, vendor=vendor, qty=1)
+        call_command("rebuild_vendor_stats", stdout=StringIO())
+        order = CartOrder.objects.create(payment_status="processing")
+        items = [CartOrderItem.objects.create(order=order, product=product, vendor=vendor, qty=2)]
+        recorded = threading.Event()
+
+        def pay():
+            try:
+                with transaction.atomic():
+                    CartOrder.objects.filter(pk=order.pk).update(payment_status="paid")
+                    record_vendor_sales(order, items)
+                    recorded.set()
+                    time.sleep(0.5)
+            finally:
+                connection.close()
+
+        payment = threading.Thread(target=pay)
+        payment.start()
+        recorded.wait(5)
+        call_command("rebuild_vendor_stats", stdout=StringIO())
+        payment.join()
+
+        self.assertEqual(list(VendorDailyStats.objects.values_list("orders", "qty")), [(2, 3)])
+
+
+@unittest.skipUnless(connection.vendor == "postgresql", "ranks with Postgres full-text search")
+class SearchCursorTests(TestCase):
+    def test_pages_through_products_tied_on_rank(self):
+        for _ in range(25):
+            Product.objects.create(title="Alpha widget", status="published")
+        ids, cursor = [], None
+        for _ in range(5):
+            page = search_products("alpha", cursor=cursor, limit=10)
+            ids.extend(page.product_ids)
+            cursor = page.next_cursor
+            if not cursor:
+                break
+        self.assertEqual(sorted(ids, reverse=True), ids)
+        self.assertEqual(len(set(ids)), 25)
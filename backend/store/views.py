@@ -8,8 +8,6 @@ from django.db.models import Q
 from django.db import transaction
 from django.urls import reverse
 from django.conf import settings
-from django.core.mail import EmailMultiAlternatives, send_mail
-from django.template.loader import render_to_string
 
 
 # Restframework Packages
@@ -17,22 +15,33 @@ from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from rest_framework_simplejwt.views import TokenObtainPairView
 from rest_framework import generics
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.views import APIView
 from rest_framework import status
+from rest_framework import serializers
+from rest_framework.exceptions import NotFound
+from rest_framework.utils.urls import replace_query_param
 
 # Serializers
 from userauths.serializer import MyTokenObtainPairSerializer, RegisterSerializer
-from store.serializers import CancelledOrderSerializer, CartSerializer, CartOrderItemSerializer, CouponUsersSerializer, ProductSerializer, TagSerializer ,CategorySerializer, DeliveryCouriersSerializer, CartOrderSerializer, GallerySerializer, BrandSerializer, ProductFaqSerializer, ReviewSerializer,  SpecificationSerializer, CouponSerializer, ColorSerializer, SizeSerializer, AddressSerializer, WishlistSerializer, ConfigSettingsSerializer
+from store.serializers import CancelledOrderSerializer, CartSerializer, CartOrderItemSerializer, CouponUsersSerializer, ProductSerializer, TagSerializer ,CategorySerializer, DeliveryCouriersSerializer, CartOrderSerializer, GallerySerializer, BrandSerializer, ProductFaqSerializer, ReviewSerializer,  SpecificationSerializer, CouponSerializer, ColorSerializer, SizeSerializer, AddressSerializer, WishlistSerializer, ConfigSettingsSerializer, ProductListSerializer, ReviewListSerializer
+from api.pagination import DateCursorPagination, IdCursorPagination, KeysetCursorPagination
 
 # Models
 from userauths.models import User
-from store.models import CancelledOrder, CartOrderItem, CouponUsers, Cart, Notification, Product, Tag ,Category, DeliveryCouriers, CartOrder, Gallery, Brand, ProductFaq, Review,  Specification, Coupon, Color, Size, Address, Wishlist
+from store.models import CancelledOrder, CartOrderItem, CouponUsers, Cart, Product, Tag ,Category, DeliveryCouriers, CartOrder, Gallery, Brand, ProductFaq, Review,  Specification, Coupon, Color, Size, Address, Wishlist, ProductCoPurchase, ProductSimilar, ProductStats
 from addon.models import ConfigSettings, Tax
 from vendor.models import Vendor
+from store.stats import record_paid_order_items, record_vendor_sales
+from store.search import InvalidCursor, search_products
+from store.suggest import suggest
+from store.outbox import create_order_notifications, enqueue_order_emails
+from store import browse, carts, copurchase, inventory, pageviews, pricing
+from api.cache import CachedResponseMixin
 
 # Others Packages
+from drf_spectacular.utils import extend_schema, inline_serializer
 import json
 from decimal import Decimal
 import stripe
@@ -40,16 +49,10 @@ import stripe
 stripe.api_key = settings.STRIPE_SECRET_KEY
 
 
-def send_notification(user=None, vendor=None, order=None, order_item=None):
-    Notification.objects.create(
-        user=user,
-        vendor=vendor,
-        order=order,
-        order_item=order_item,
-    )
-
-class ConfigSettingsDetailView(generics.RetrieveAPIView):
+class ConfigSettingsDetailView(CachedResponseMixin, generics.RetrieveAPIView):
     serializer_class = ConfigSettingsSerializer
+    cache_name = "catalog:settings"
+    cache_depends_on = (ConfigSettings,)
 
     def get_object(self):
         # Use the get method to retrieve the first ConfigSettings object
@@ -57,35 +60,105 @@ class ConfigSettingsDetailView(generics.RetrieveAPIView):
 
     permission_classes = (AllowAny,)
 
-class CategoryListView(generics.ListAPIView):
+class CategoryListView(CachedResponseMixin, generics.ListAPIView):
     serializer_class = CategorySerializer
     queryset = Category.objects.filter(active=True)
     permission_classes = (AllowAny,)
+    cache_name = "catalog:categories"
+    cache_depends_on = (Category,)
 
 
-class BrandListView(generics.ListAPIView):
+class BrandListView(CachedResponseMixin, generics.ListAPIView):
     serializer_class = BrandSerializer
     queryset = Brand.objects.filter(active=True)
     permission_classes = (AllowAny,)
+    cache_name = "catalog:brands"
+    cache_depends_on = (Brand,)
 
-class FeaturedProductListView(generics.ListAPIView):
-    serializer_class = ProductSerializer
-    queryset = Product.objects.filter(status="published", featured=True)[:3]
+class FeaturedProductListView(CachedResponseMixin, generics.ListAPIView):
+    serializer_class = ProductListSerializer
+    queryset = Product.objects.filter(status="published", featured=True).for_listing()[:3]
     permission_classes = (AllowAny,)
+    cache_name = "catalog:featured"
+    cache_depends_on = (Product, ProductStats, Category, Vendor, Size, Color)
 
-class ProductListView(generics.ListAPIView):
-    serializer_class = ProductSerializer
-    queryset = Product.objects.filter(status="published")
+class ProductListView(CachedResponseMixin, generics.ListAPIView):
+    serializer_class = ProductListSerializer
+    queryset = Product.objects.filter(status="published").for_listing()
+    permission_classes = (AllowAny,)
+    pagination_class = IdCursorPagination
+    # The home page list: one cached body per cursor page
+    cache_name = "catalog:products"
+    cache_depends_on = (Product, ProductStats, Category, Vendor, Size, Color)
+
+class BrowseProductsAPIView(CachedResponseMixin, generics.ListAPIView):
+    # Filter by category slug, brand, price range, rating and stock; every page
+    # carries the facet counts of the whole result (see store.browse).
+    serializer_class = ProductListSerializer
     permission_classes = (AllowAny,)
+    pagination_class = KeysetCursorPagination
+    cache_name = "catalog:browse"
+    cache_depends_on = (Product, ProductStats, Category, Vendor, Size, Color)
 
-class ProductDetailView(generics.RetrieveAPIView):
+    def get_queryset(self):
+        self.filters = browse.BrowseFilters.from_query(self.request.query_params)
+        self.cursor_ordering = browse.SORTS[self.filters.sort]
+        return browse.products(self.filters).for_listing()
+
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        response.data['facets'] = browse.facets(self.filters)
+        return response
+
+class ProductDetailView(CachedResponseMixin, generics.RetrieveAPIView):
     serializer_class = ProductSerializer
+    cache_name = "catalog:product"
+    cache_depends_on = (Product, ProductStats, Review, Category, Vendor, Gallery, Specification, Size, Color)
+
+    def get(self, request, *args, **kwargs):
+        response = super().get(request, *args, **kwargs)
+        # Counted in memory and written in batches, cached responses included.
+        if response.status_code in (200, 304):
+            pageviews.product_viewed(self.kwargs.get('slug'))
+        return response
 
     def get_object(self):
         # Retrieve the product using the provided slug from the URL
         slug = self.kwargs.get('slug')
         return Product.objects.get(slug=slug)
     
+class ProductBoughtTogetherView(CachedResponseMixin, generics.ListAPIView):
+    serializer_class = ProductListSerializer
+    permission_classes = (AllowAny,)
+    pagination_class = None
+    cache_name = "catalog:bought-together"
+    cache_depends_on = (Product, ProductStats, Category, Vendor, Size, Color, ProductCoPurchase)
+    default_limit = 3
+    max_limit = copurchase.NEIGHBOURS
+
+    def recommend(self, product, limit):
+        return product.frequently_bought_together(limit=limit)
+
+    def get_queryset(self):
+        product = get_object_or_404(Product, slug=self.kwargs['slug'])
+        try:
+            limit = int(self.request.query_params.get('limit', self.default_limit))
+        except ValueError:
+            limit = self.default_limit
+        return self.recommend(product, max(1, min(limit, self.max_limit))).for_listing()
+
+
+class ProductSimilarView(ProductBoughtTogetherView):
+    cache_name = "catalog:similar"
+    cache_depends_on = (Product, ProductStats, Category, Vendor, Size, Color, ProductSimilar)
+    default_limit = 4
+    # Read from settings so the web process never imports NumPy/SciPy (store.similar).
+    max_limit = getattr(settings, "SIMILAR_PRODUCTS_NEIGHBOURS", 20)
+
+    def recommend(self, product, limit):
+        return product.similar_products(limit=limit)
+
+    
 class CartApiView(generics.ListCreateAPIView):
     serializer_class = CartSerializer
     queryset = Cart.objects.all()
@@ -97,8 +170,6 @@ class CartApiView(generics.ListCreateAPIView):
         required_fields = [
             "product",
             "qty",
-            "price",
-            "shipping_amount",
             "country",
             "size",
             "color",
@@ -114,8 +185,6 @@ class CartApiView(generics.ListCreateAPIView):
         product_id = payload.get("product")
         user_id = payload.get("user")
         qty_raw = payload.get("qty")
-        price_raw = payload.get("price")
-        shipping_amount_raw = payload.get("shipping_amount")
         country = payload.get("country")
         size = payload.get("size")
         color = payload.get("color")
@@ -136,80 +205,28 @@ class CartApiView(generics.ListCreateAPIView):
         except Exception:
             return Response({"message": "Invalid qty"}, status=status.HTTP_400_BAD_REQUEST)
 
-        try:
-            price = Decimal(str(price_raw))
-            shipping_amount = Decimal(str(shipping_amount_raw))
-        except Exception:
-            return Response({"message": "Invalid price/shipping_amount"}, status=status.HTTP_400_BAD_REQUEST)
-        
-        tax = Tax.objects.filter(country=country).first()
-        if tax:
-            tax_rate = tax.rate / 100
-            
-        else:
-            tax_rate = 0
+        # Prices come from the catalog; the client's price/shipping_amount are ignored.
+        line_price = pricing.price_line(pricing.CartLine(product=product, qty=qty, size=size, country=country))
 
         cart = Cart.objects.filter(cart_id=cart_id, product=product).first()
-
-        if cart:
-            cart.product = product
-            cart.user = user
-            cart.qty = qty
-            cart.price = price
-            cart.sub_total = price * qty
-            cart.shipping_amount = shipping_amount * qty
-            cart.size = size
-            cart.tax_fee = qty * Decimal(tax_rate)
-            cart.color = color
-            cart.country = country
-            cart.cart_id = cart_id
-
-            config_settings = ConfigSettings.objects.first()
-
-            service_fee_charge_type = getattr(config_settings, "service_fee_charge_type", "percentage")
-            service_fee_percentage_value = getattr(config_settings, "service_fee_percentage", 0)
-            service_fee_flat_rate_value = getattr(config_settings, "service_fee_flat_rate", Decimal("0"))
-
-            if service_fee_charge_type == "percentage":
-                service_fee_percentage = Decimal(service_fee_percentage_value) / Decimal("100")
-                cart.service_fee = service_fee_percentage * cart.sub_total
-            else:
-                cart.service_fee = Decimal(service_fee_flat_rate_value)
-
-            cart.total = cart.sub_total + cart.shipping_amount + cart.service_fee + cart.tax_fee
-            cart.save()
-
-            return Response({"message": "Cart updated successfully"}, status=status.HTTP_200_OK)
-        else:
+        created = cart is None
+        if created:
             cart = Cart()
-            cart.product = product
-            cart.user = user
-            cart.qty = qty
-            cart.price = price
-            cart.sub_total = price * qty
-            cart.shipping_amount = shipping_amount * qty
-            cart.size = size
-            cart.tax_fee = qty * Decimal(tax_rate)
-            cart.color = color
-            cart.country = country
-            cart.cart_id = cart_id
-
-            config_settings = ConfigSettings.objects.first()
-
-            service_fee_charge_type = getattr(config_settings, "service_fee_charge_type", "percentage")
-            service_fee_percentage_value = getattr(config_settings, "service_fee_percentage", 0)
-            service_fee_flat_rate_value = getattr(config_settings, "service_fee_flat_rate", Decimal("0"))
-
-            if service_fee_charge_type == "percentage":
-                service_fee_percentage = Decimal(service_fee_percentage_value) / Decimal("100")
-                cart.service_fee = service_fee_percentage * cart.sub_total
-            else:
-                cart.service_fee = Decimal(service_fee_flat_rate_value)
-
-            cart.total = cart.sub_total + cart.shipping_amount + cart.service_fee + cart.tax_fee
-            cart.save()
 
+        cart.product = product
+        cart.user = user
+        cart.qty = qty
+        cart.size = size
+        cart.color = color
+        cart.country = country
+        cart.cart_id = cart_id
+        for field, value in line_price.as_dict().items():
+            setattr(cart, field, value)
+        cart.save()
+
+        if created:
             return Response( {"message": "Cart Created Successfully"}, status=status.HTTP_201_CREATED)
+        return Response({"message": "Cart updated successfully"}, status=status.HTTP_200_OK)
 
 
 class CartListView(generics.ListAPIView):
@@ -274,62 +291,9 @@ class CartDetailView(generics.RetrieveAPIView):
         return queryset
 
     def get(self, request, *args, **kwargs):
-        # Get the queryset of cart items based on 'cart_id' and 'user_id' (if provided)
-        queryset = self.get_queryset()
-
-        # Initialize sums for various cart item attributes
-        total_shipping = 0.0
-        total_tax = 0.0
-        total_service_fee = 0.0
-        total_sub_total = 0.0
-        total_total = 0.0
-
-        # Iterate over the queryset of cart items to calculate cumulative sums
-        for cart_item in queryset:
-            # Calculate the cumulative shipping, tax, service_fee, and total values
-            total_shipping += float(self.calculate_shipping(cart_item))
-            total_tax += float(self.calculate_tax(cart_item))
-            total_service_fee += float(self.calculate_service_fee(cart_item))
-            total_sub_total += float(self.calculate_sub_total(cart_item))
-            total_total += round(float(self.calculate_total(cart_item)), 2)
-
-        # Create a data dictionary to store the cumulative values
-        data = {
-            'shipping': round(total_shipping, 2),
-            'tax': total_tax,
-            'service_fee': total_service_fee,
-            'sub_total': total_sub_total,
-            'total': total_total,
-        }
-
-        # Return the data in the response
-        return Response(data)
-
-    def calculate_shipping(self, cart_item):
-        # Implement your shipping calculation logic here for a single cart item
-        # Example: Calculate based on weight, destination, etc.
-        return cart_item.shipping_amount
-
-    def calculate_tax(self, cart_item):
-        # Implement your tax calculation logic here for a single cart item
-        # Example: Calculate based on tax rate, product type, etc.
-        return cart_item.tax_fee
-
-    def calculate_service_fee(self, cart_item):
-        # Implement your service fee calculation logic here for a single cart item
-        # Example: Calculate based on service type, cart total, etc.
-        return cart_item.service_fee
-
-    def calculate_sub_total(self, cart_item):
-        # Implement your service fee calculation logic here for a single cart item
-        # Example: Calculate based on service type, cart total, etc.
-        return cart_item.sub_total
-
-    def calculate_total(self, cart_item):
-        # Implement your total calculation logic here for a single cart item
-        # Example: Sum of sub_total, shipping, tax, and service_fee
-        return cart_item.total
-    
+        # Exact Decimal sums from one aggregate() query, cached until the cart changes
+        summary = carts.cart_summary(self.kwargs['cart_id'], self.kwargs.get('user_id'))
+        return Response(summary)
 
 
 class CartItemDeleteView(generics.DestroyAPIView):
@@ -350,6 +314,25 @@ class CartItemDeleteView(generics.DestroyAPIView):
         return cart
     
 
+class CartMetricsView(generics.GenericAPIView):
+    permission_classes = (IsAdminUser,)
+
+    @extend_schema(
+        responses=inline_serializer(
+            name="CartMetricsResponse",
+            fields={
+                "rows": serializers.IntegerField(),
+                "anonymous_rows": serializers.IntegerField(),
+                "carts": serializers.IntegerField(),
+                "expired_rows": serializers.IntegerField(),
+                "last_purge": serializers.DictField(allow_null=True),
+            },
+        )
+    )
+    def get(self, request, *args, **kwargs):
+        return Response(carts.cart_metrics())
+
+
 class CreateOrderView(generics.CreateAPIView):
     serializer_class = CartOrderSerializer
     queryset = CartOrder.objects.all()
@@ -368,29 +351,33 @@ class CreateOrderView(generics.CreateAPIView):
         cart_id = payload['cart_id']
         user_id = payload['user_id']
 
-        print("user_id ===============", user_id)
-
         if user_id != 0:
             user = User.objects.filter(id=user_id).first()
         else:
             user = None
 
-        cart_items = Cart.objects.filter(cart_id=cart_id)
-
-        total_shipping = Decimal(0.0)
-        total_tax = Decimal(0.0)
-        total_service_fee = Decimal(0.0)
-        total_sub_total = Decimal(0.0)
-        total_initial_total = Decimal(0.0)
-        total_total = Decimal(0.0)
-
         with transaction.atomic():
+            cart_items = list(Cart.objects.filter(cart_id=cart_id).select_related('product__vendor'))
+            if not cart_items:
+                return Response({"message": "Cart is empty"}, status=status.HTTP_400_BAD_REQUEST)
+
+            # Price every line from the products loaded with the cart, taxed for the delivery
+            # country. Nothing is locked yet: the stock hold at the end is the only locking step.
+            products = {c.product_id: c.product for c in cart_items}
+            quotes = pricing.price_lines([
+                pricing.CartLine(product=c.product, qty=c.qty, size=c.size, country=country)
+                for c in cart_items
+            ])
+            errors = cart_line_errors(cart_items, products, quotes)
+            if errors:
+                return Response(
+                    {"message": "Some cart items changed, please review your cart", "errors": errors},
+                    status=status.HTTP_409_CONFLICT,
+                )
+
+            totals = pricing.sum_lines(quotes)
 
             order = CartOrder.objects.create(
-                # sub_total=total_sub_total,
-                # shipping_amount=total_shipping,
-                # tax_fee=total_tax,
-                # service_fee=total_service_fee,
                 buyer=user,
                 payment_status="processing",
                 full_name=full_name,
@@ -399,50 +386,64 @@ class CreateOrderView(generics.CreateAPIView):
                 address=address,
                 city=city,
                 state=state,
-                country=country
+                country=country,
+                initial_total=totals["total"],
+                **totals,
             )
 
-            for c in cart_items:
-                CartOrderItem.objects.create(
+            CartOrderItem.objects.bulk_create([
+                CartOrderItem(
                     order=order,
                     product=c.product,
                     qty=c.qty,
                     color=c.color,
                     size=c.size,
-                    price=c.price,
-                    sub_total=c.sub_total,
-                    shipping_amount=c.shipping_amount,
-                    tax_fee=c.tax_fee,
-                    service_fee=c.service_fee,
-                    total=c.total,
-                    initial_total=c.total,
-                    vendor=c.product.vendor
+                    initial_total=quote.total,
+                    vendor=c.product.vendor,
+                    **quote.as_dict(),
                 )
+                for c, quote in zip(cart_items, quotes)
+            ])
 
-                total_shipping += Decimal(c.shipping_amount)
-                total_tax += Decimal(c.tax_fee)
-                total_service_fee += Decimal(c.service_fee)
-                total_sub_total += Decimal(c.sub_total)
-                total_initial_total += Decimal(c.total)
-                total_total += Decimal(c.total)
-
-                order.vendor.add(c.product.vendor)
-
-                
-
-            order.sub_total=total_sub_total
-            order.shipping_amount=total_shipping
-            order.tax_fee=total_tax
-            order.service_fee=total_service_fee
-            order.initial_total=total_initial_total
-            order.total=total_total
+            vendor_ids = {c.product.vendor_id for c in cart_items if c.product.vendor_id}
+            CartOrder.vendor.through.objects.bulk_create(
+                [CartOrder.vendor.through(cartorder_id=order.pk, vendor_id=vendor_id) for vendor_id in vendor_ids]
+            )
 
-            
-            order.save()
+            # Hold the stock until the order is paid or the hold expires; the product
+            # rows stay locked only for the rest of this transaction.
+            short = set(inventory.reserve(order, cart_items))
+            if short:
+                transaction.set_rollback(True)
+                return Response(
+                    {
+                        "message": "Some cart items changed, please review your cart",
+                        "errors": [
+                            {"cart_id": c.id, "product": c.product_id, "reason": "out_of_stock"}
+                            for c in cart_items if c.product_id in short
+                        ],
+                    },
+                    status=status.HTTP_409_CONFLICT,
+                )
 
         return Response( {"message": "Order Created Successfully", 'order_oid':order.oid}, status=status.HTTP_201_CREATED)
 
 
+def cart_line_errors(cart_items, products, quotes):
+    """Cart lines whose product is gone, out of stock or priced differently than when it was added."""
+    errors = []
+    for c, quote in zip(cart_items, quotes):
+        product = products.get(c.product_id)
+        if product is None or product.status != "published":
+            reason = "unavailable"
+        elif c.price != quote.price:
+            reason = "price_changed"
+        elif product.stock_qty - product.reserved_qty < c.qty:
+            reason = "out_of_stock"
+        else:
+            continue
+        errors.append({"cart_id": c.id, "product": c.product_id, "reason": reason})
+    return errors
 
 
 class CheckoutView(generics.RetrieveAPIView):
@@ -546,53 +547,23 @@ class StripeCheckoutView(generics.CreateAPIView):
 
 @transaction.atomic
 def finalize_order_payment(order):
-    order_items = CartOrderItem.objects.select_related('vendor').filter(order=order)
-
     if order.payment_status != "processing":
         return
 
+    order_items = list(CartOrderItem.objects.select_related('vendor').filter(order=order))
+
     order.payment_status = "paid"
     order.save()
 
-    try:
-        if order.buyer != None:
-            send_notification(user=order.buyer, order=order)
-
-        for o in order_items:
-            send_notification(vendor=o.vendor, order=order, order_item=o)
-    except Exception:
-        pass
-
-    try:
-        merge_data = {
-            'order': order,
-            'order_items': order_items,
-        }
+    inventory.commit(order, order_items)
+    record_paid_order_items(order_items)
+    record_vendor_sales(order, order_items)
+    copurchase.record_paid_order(order_items)
 
-        subject = f"Order Placed Successfully"
-        text_body = render_to_string("email/customer_order_confirmation.txt", merge_data)
-        html_body = render_to_string("email/customer_order_confirmation.html", merge_data)
-
-        msg = EmailMultiAlternatives(
-            subject=subject, from_email=settings.FROM_EMAIL,
-            to=[order.email], body=text_body
-        )
-        msg.attach_alternative(html_body, "text/html")
-        msg.send()
-
-        for o in order_items:
-            subject = f"New Sale!"
-            text_body = render_to_string("email/vendor_order_sale.txt", merge_data)
-            html_body = render_to_string("email/vendor_order_sale.html", merge_data)
-
-            msg = EmailMultiAlternatives(
-                subject=subject, from_email=settings.FROM_EMAIL,
-                to=[o.vendor.email], body=text_body
-            )
-            msg.attach_alternative(html_body, "text/html")
-            msg.send()
-    except Exception:
-        pass
+    # Notifications are one bulk INSERT; emails go through the outbox and are
+    # sent after commit, so the order's row lock never waits on SMTP.
+    create_order_notifications(order, order_items)
+    enqueue_order_emails(order, order_items)
 
 
 @method_decorator(csrf_exempt, name='dispatch')
@@ -627,6 +598,12 @@ class StripeWebhookView(View):
                             order = CartOrder.objects.select_for_update().filter(stripe_session_id=session.get('id')).first()
                         if order and order.payment_status == 'processing':
                             finalize_order_payment(order)
+            elif event_type == 'checkout.session.expired':
+                session = event['data']['object']
+                order_oid = (session.get('metadata') or {}).get('order_oid')
+                order = CartOrder.objects.filter(oid=order_oid).first() if order_oid else None
+                if order and order.payment_status == 'processing':
+                    inventory.release(order)
         except Exception:
             return HttpResponse(status=200)
 
@@ -680,8 +657,9 @@ class ReviewRatingAPIView(generics.CreateAPIView):
 
 
 class ReviewListView(generics.ListAPIView):
-    serializer_class = ReviewSerializer
+    serializer_class = ReviewListSerializer
     permission_classes = (AllowAny, )
+    pagination_class = DateCursorPagination
 
     def get_queryset(self):
         product_id = self.kwargs['product_id']
@@ -689,16 +667,74 @@ class ReviewListView(generics.ListAPIView):
         from django.shortcuts import get_object_or_404
 
         product = get_object_or_404(Product, id=product_id)
-        return Review.objects.filter(product=product)
+        return Review.objects.filter(product=product).select_related('product', 'user__profile')
     
 class SearchProductsAPIView(generics.ListAPIView):
-    serializer_class = ProductSerializer
+    serializer_class = ProductListSerializer
     permission_classes = (AllowAny,)
+    page_size = 20
+    max_page_size = 100
 
-    def get_queryset(self):
-        query = self.request.GET.get('query')
-        print("query =======", query)
+    def get_page_size(self):
+        try:
+            page_size = int(self.request.GET.get('page_size', self.page_size))
+        except (TypeError, ValueError):
+            page_size = self.page_size
+        return max(1, min(page_size, self.max_page_size))
+
+    def list(self, request, *args, **kwargs):
+        query = request.GET.get('query') or ''
+        prefix = request.GET.get('prefix') in ('1', 'true', 'True')
+
+        try:
+            page = search_products(
+                query,
+                cursor=request.GET.get('cursor'),
+                limit=self.get_page_size(),
+                prefix=prefix,
+            )
+        except InvalidCursor:
+            raise NotFound("Invalid cursor")
+
+        # Keep the relevance order returned by the search engine.
+        products = Product.objects.filter(pk__in=page.product_ids).for_listing().in_bulk()
+        ordered = [products[pk] for pk in page.product_ids if pk in products]
+
+        next_link = None
+        if page.next_cursor:
+            next_link = replace_query_param(request.build_absolute_uri(), 'cursor', page.next_cursor)
+
+        serializer = self.get_serializer(ordered, many=True)
+        return Response({'next': next_link, 'previous': None, 'results': serializer.data})
+       
+
+
+class SearchSuggestAPIView(APIView):
+    # Typeahead: answered from the per-process index in store.suggest, no
+    # serializer and no authentication work on the hot path.
+    permission_classes = (AllowAny,)
+    authentication_classes = ()
+    default_limit = 8
+    max_limit = 20
+
+    @extend_schema(
+        responses=inline_serializer(
+            name="SearchSuggestion",
+            fields={
+                "type": serializers.CharField(),
+                "id": serializers.IntegerField(allow_null=True),
+                "slug": serializers.CharField(allow_null=True),
+                "title": serializers.CharField(),
+            },
+            many=True,
+        )
+    )
+    def get(self, request, *args, **kwargs):
+        query = request.GET.get('query') or request.GET.get('q') or ''
+        try:
+            limit = int(request.GET.get('limit', self.default_limit))
+        except (TypeError, ValueError):
+            limit = self.default_limit
+        limit = max(1, min(limit, self.max_limit))
 
-        products = Product.objects.filter(status="published", title__icontains=query)
-        return products
-       
\ No newline at end of file
+        return Response(suggest(query, limit=limit))
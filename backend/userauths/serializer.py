@@ -74,6 +74,9 @@ class MyTokenObtainPairSerializer(TokenObtainPairSerializer):
     token['full_name'] = user.full_name, token['email'] = user.email, token['username'] = user.username: This code is customizing the token by adding extra information to it. For example, it's putting the user's full name, email, and username into the token. These are like special notes attached to the key.
     return token: Finally, the customized token is given back to the user. Now, when this token is used, it not only lets the user in but also carries their full name, email, and username as extra information, which the website can use as needed.
     '''
+    # The browser's anonymous cart, merged into the user's cart on login
+    cart_id = serializers.CharField(required=False, allow_blank=True, write_only=True)
+
     @classmethod
     # Define a custom method to get the token for a user
     def get_token(cls, user):
@@ -136,6 +139,16 @@ class MyTokenObtainPairSerializer(TokenObtainPairSerializer):
                 user.locked_at = None
                 user.save(update_fields=["failed_login_attempts", "is_locked", "locked_at"])
 
+        cart_id = attrs.get("cart_id")
+        if cart_id:
+            # Imported here: store depends on userauths, not the other way around.
+            from store.carts import merge_anonymous_cart
+
+            try:
+                merge_anonymous_cart(cart_id, self.user)
+            except Exception:
+                logger.exception("Cart merge on login failed")
+
         return data
 
 # Define a serializer for user registration, which inherits from serializers.ModelSerializer
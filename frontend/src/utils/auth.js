@@ -29,6 +29,8 @@ export const login = async (email, password) => {
         const { data, status } = await axios.post('user/token/', {
             email,
             password,
+            // Lets the backend merge this browser's anonymous cart into the user's cart
+            cart_id: localStorage.getItem('randomString') || '',
         });
 
         // If the request is successful (status code 200), set authentication user and display success toast
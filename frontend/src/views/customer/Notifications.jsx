@@ -3,11 +3,13 @@ import Sidebar from './Sidebar'
 import apiInstance from '../../utils/axios';
 import UserData from '../plugin/UserData';
 import moment from 'moment';
+import LoadMore from '../plugin/LoadMore';
 
 
 function Notifications() {
 
     const [notifications, setNotifications] = useState([])
+    const [next, setNext] = useState(null)
     const [loading, setLoading] = useState(true)
 
     const axios = apiInstance
@@ -15,7 +17,8 @@ function Notifications() {
 
     useEffect(() => {
         axios.get(`customer/notification/${userData?.user_id}/`).then((res) => {
-            setNotifications(res.data);
+            setNotifications(res.data.results);
+            setNext(res.data.next);
             if (notifications) {
                 setLoading(false)
             }
@@ -62,6 +65,11 @@ function Notifications() {
                                                         <h6>No notifications yet</h6>
                                                     }
 
+                                                    <LoadMore next={next} onLoad={(data) => {
+                                                        setNotifications((prev) => [...prev, ...data.results])
+                                                        setNext(data.next)
+                                                    }} />
+
                                                 </div>
                                             </section>
                                             {/* Section: Summary */}
@@ -4,9 +4,11 @@ import apiInstance from '../../utils/axios';
 import UserData from '../plugin/UserData';
 import moment from 'moment';
 import { Link } from 'react-router-dom';
+import LoadMore from '../plugin/LoadMore';
 
 function Orders() {
     const [orders, setOrders] = useState([])
+    const [next, setNext] = useState(null)
 
     const axios = apiInstance
     const userData = UserData()
@@ -15,12 +17,15 @@ function Orders() {
     useEffect(() => {
         if (!userData?.user_id) return;
         axios.get(`customer/orders/${userData?.user_id}/`).then((res) => {
-            setOrders(res.data)
+            setOrders(res.data.results)
+            setNext(res.data.next)
         })
     }, [userData?.user_id])
 
     const pendingDeliveryCount = orders.filter((o) => o.order_status === "Pending").length;
     const fulfilledOrdersCount = orders.filter((o) => o.order_status === "Fulfilled").length;
+    // Counts cover the pages loaded so far; "+" marks that more orders exist.
+    const more = next ? "+" : "";
 
     console.log(orders);
 
@@ -50,7 +55,7 @@ function Orders() {
                                                         <div className="">
                                                             <p className="mb-1">Orders</p>
                                                             <h2 className="mb-0">
-                                                                {orders.length}
+                                                                {orders.length}{more}
                                                                 <span
                                                                     className=""
                                                                     style={{ fontSize: "0.875rem" }}
@@ -79,7 +84,7 @@ function Orders() {
                                                         <div className="">
                                                             <p className="mb-1">Pending Delivery</p>
                                                             <h2 className="mb-0">
-                                                                {pendingDeliveryCount}
+                                                                {pendingDeliveryCount}{more}
                                                                 <span
                                                                     className=""
                                                                     style={{ fontSize: "0.875rem" }}
@@ -108,7 +113,7 @@ function Orders() {
                                                         <div className="">
                                                             <p className="mb-1">Fulfilled Orders</p>
                                                             <h2 className="mb-0">
-                                                                {fulfilledOrdersCount}
+                                                                {fulfilledOrdersCount}{more}
                                                                 <span
                                                                     className=""
                                                                     style={{ fontSize: "0.875rem" }}
@@ -170,6 +175,10 @@ function Orders() {
 
                                                 </tbody>
                                             </table>
+                                            <LoadMore next={next} onLoad={(data) => {
+                                                setOrders((prev) => [...prev, ...data.results])
+                                                setNext(data.next)
+                                            }} />
                                         </div>
                                         <canvas id="myChart" style={{ width: "100%" }} />
                                     </div>
@@ -4,6 +4,12 @@ import UseProfileData from '../plugin/UseProfileData'
 import apiInstance from '../../utils/axios';
 
 
+// List endpoints return one cursor page ({ next, results }); append "+" when more pages exist.
+const pageCount = (data) => {
+    const results = Array.isArray(data?.results) ? data.results : [];
+    return data?.next ? `${results.length}+` : results.length;
+};
+
 function Sidebar() {
 
     const userProfile = UseProfileData()
@@ -32,9 +38,9 @@ function Sidebar() {
             axios.get(`customer/notification/${userId}/`),
         ]).then(([ordersRes, wishlistRes, notificationsRes]) => {
             setCounts({
-                orders: Array.isArray(ordersRes.data) ? ordersRes.data.length : 0,
-                wishlist: Array.isArray(wishlistRes.data) ? wishlistRes.data.length : 0,
-                notifications: Array.isArray(notificationsRes.data) ? notificationsRes.data.length : 0,
+                orders: pageCount(ordersRes.data),
+                wishlist: pageCount(wishlistRes.data),
+                notifications: pageCount(notificationsRes.data),
             });
         }).catch((err) => {
             console.log(err);
@@ -5,9 +5,11 @@ import UserData from '../plugin/UserData';
 import moment from 'moment';
 import { Link } from 'react-router-dom';
 import { addToWishlist } from '../plugin/addToWishlist';
+import LoadMore from '../plugin/LoadMore';
 
 function Wishlist() {
     const [wishlist, setWishlist] = useState([])
+    const [next, setNext] = useState(null)
 
     const axios = apiInstance
     const userData = UserData()
@@ -16,7 +18,8 @@ function Wishlist() {
     const fetchWishlist = async () => {
         try {
             const response = await axios.get(`customer/wishlist/${userData?.user_id}/`);
-            setWishlist(response.data);
+            setWishlist(response.data.results);
+            setNext(response.data.next);
         } catch (error) {
             console.log(error);
         }
@@ -109,6 +112,11 @@ function Wishlist() {
                                                         <h6 className='container'>Your wishlist is Empty </h6>
                                                     }
 
+                                                    <LoadMore next={next} onLoad={(data) => {
+                                                        setWishlist((prev) => [...prev, ...data.results])
+                                                        setNext(data.next)
+                                                    }} />
+
                                                 </div>
                                             </section>
                                             {/* Section: Summary */}
@@ -0,0 +1,34 @@
+import React, { useState } from 'react'
+import apiInstance from '../../utils/axios';
+
+// Paginated list endpoints return { next, previous, results }. This button fetches
+// the page at `next` (an absolute URL, so the axios baseURL is not applied) and
+// hands the response data to `onLoad`, which appends the results to the list.
+function LoadMore({ next, onLoad }) {
+    const [loading, setLoading] = useState(false)
+
+    if (!next) {
+        return null
+    }
+
+    const handleLoadMore = async () => {
+        setLoading(true)
+        try {
+            const response = await apiInstance.get(next)
+            onLoad(response.data)
+        } catch (error) {
+            console.log(error);
+        }
+        setLoading(false)
+    }
+
+    return (
+        <div className="text-center my-3">
+            <button type="button" className="btn btn-outline-primary btn-sm" onClick={handleLoadMore} disabled={loading}>
+                {loading ? "Loading..." : "Load more"}
+            </button>
+        </div>
+    )
+}
+
+export default LoadMore
@@ -137,7 +137,7 @@ function ProductDetail() {
         if (!product?.id) return;
 
         axios.get(`reviews/${product.id}/`).then((res) => {
-            setReviews(res.data);
+            setReviews(res.data.results);
         }).catch((err) => {
             console.error('Error fetching reviews:', err);
         })
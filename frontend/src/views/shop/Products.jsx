@@ -93,7 +93,7 @@ function Products() {
     // Use the useEffect hook to execute code when the component mounts (empty dependency array).
     useEffect(() => {
         // Fetch and set the 'products' data by calling fetchData with the 'products/' endpoint.
-        fetchData('products/', setProducts);
+        fetchData('products/?page_size=100', (data) => setProducts(data.results));
 
     }, []);
 
@@ -64,7 +64,7 @@ function Search() {
 
     useEffect(() => {
         // Fetch and set the 'products' data by calling fetchData with the 'products/' endpoint.
-        fetchData(`search/?query=${query}`, setProducts);
+        fetchData(`search/?query=${query}`, (data) => setProducts(data.results));
 
     }, [query]);
 